@@ -0,0 +1,156 @@
+"""
+Pipelines de agregación de MongoDB para las estadísticas de eventos.
+
+Todo el conteo se hace en el servidor ($match/$group/$facet) y solo viajan
+los buckets finales; nunca se materializan los eventos en Python.
+Los usuarios únicos se cuentan agrupando por usuario_id y contando grupos,
+sin acumular arrays con $addToSet.
+"""
+from .models import EventoUsuario
+
+
+def _agregar(pipeline):
+    coleccion = EventoUsuario._get_collection()
+    return list(coleccion.aggregate(pipeline, allowDiskUse=True))
+
+
+def _match_fechas(desde, hasta=None, **filtros):
+    fecha = {'$gte': desde}
+    if hasta is not None:
+        fecha['$lt'] = hasta
+    return {'$match': {'fecha_hora': fecha, **filtros}}
+
+
+# ----------------------------------------------------------------------
+# Facetas reutilizables
+# ----------------------------------------------------------------------
+
+def faceta_total():
+    return [{'$count': 'total'}]
+
+
+def faceta_usuarios_unicos():
+    return [{'$group': {'_id': '$usuario_id'}}, {'$count': 'total'}]
+
+
+def faceta_por_tipo():
+    return [{'$group': {'_id': '$tipo_evento', 'total': {'$sum': 1}}}]
+
+
+def faceta_por_dia():
+    return [
+        {'$group': {
+            '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$fecha_hora'}},
+            'total': {'$sum': 1},
+        }},
+        {'$sort': {'_id': 1}},
+    ]
+
+
+def faceta_cursos_top(limite, tipo_evento=None):
+    match = {'curso_id': {'$ne': None}}
+    if tipo_evento:
+        match['tipo_evento'] = tipo_evento
+    return [
+        {'$match': match},
+        {'$group': {'_id': '$curso_id', 'total': {'$sum': 1}}},
+        {'$sort': {'total': -1, '_id': 1}},
+        {'$limit': limite},
+    ]
+
+
+def _escalar(resultado, faceta):
+    filas = resultado.get(faceta) or []
+    return filas[0]['total'] if filas else 0
+
+
+def _diccionario(resultado, faceta):
+    return {fila['_id']: fila['total'] for fila in resultado.get(faceta) or []}
+
+
+def _facetas(match, facetas):
+    resultado = _agregar([match, {'$facet': facetas}])
+    return resultado[0] if resultado else {}
+
+
+# ----------------------------------------------------------------------
+# Consultas por endpoint
+# ----------------------------------------------------------------------
+
+def estadisticas_actividad(inicio_hoy, inicio_semana, inicio_mes, limite_cursos=5):
+    """Conteos de hoy/semana/mes, usuarios activos, tipos y cursos más vistos del mes"""
+    resultado = _facetas(_match_fechas(inicio_mes), {
+        'conteos': [{'$group': {
+            '_id': None,
+            'mes': {'$sum': 1},
+            'semana': {'$sum': {'$cond': [{'$gte': ['$fecha_hora', inicio_semana]}, 1, 0]}},
+            'hoy': {'$sum': {'$cond': [{'$gte': ['$fecha_hora', inicio_hoy]}, 1, 0]}},
+        }}],
+        'usuarios': faceta_usuarios_unicos(),
+        'por_tipo': faceta_por_tipo(),
+        'cursos': faceta_cursos_top(limite_cursos, tipo_evento='curso_view'),
+    })
+    conteos = (resultado.get('conteos') or [{}])[0]
+    return {
+        'eventos_hoy': conteos.get('hoy', 0),
+        'eventos_semana': conteos.get('semana', 0),
+        'eventos_mes': conteos.get('mes', 0),
+        'usuarios_activos': _escalar(resultado, 'usuarios'),
+        'eventos_por_tipo': _diccionario(resultado, 'por_tipo'),
+        'cursos_top': [(fila['_id'], fila['total']) for fila in resultado.get('cursos') or []],
+    }
+
+
+def estadisticas_periodo(desde, hasta=None):
+    """Totales, usuarios activos, eventos por tipo y por día en un periodo"""
+    resultado = _facetas(_match_fechas(desde, hasta), {
+        'total': faceta_total(),
+        'usuarios': faceta_usuarios_unicos(),
+        'por_tipo': faceta_por_tipo(),
+        'por_dia': faceta_por_dia(),
+    })
+    return {
+        'total_eventos': _escalar(resultado, 'total'),
+        'usuarios_activos': _escalar(resultado, 'usuarios'),
+        'eventos_por_tipo': _diccionario(resultado, 'por_tipo'),
+        'eventos_por_dia': _diccionario(resultado, 'por_dia'),
+    }
+
+
+def estadisticas_usuario(usuario_id, limite_cursos=5):
+    """Total de eventos, eventos por tipo y cursos más visitados de un usuario"""
+    resultado = _facetas({'$match': {'usuario_id': usuario_id}}, {
+        'total': faceta_total(),
+        'por_tipo': faceta_por_tipo(),
+        'cursos': faceta_cursos_top(limite_cursos),
+    })
+    return {
+        'total_eventos': _escalar(resultado, 'total'),
+        'eventos_por_tipo': _diccionario(resultado, 'por_tipo'),
+        'cursos_top': [(fila['_id'], fila['total']) for fila in resultado.get('cursos') or []],
+    }
+
+
+def cursos_populares(desde, limite=10):
+    """
+    Vistas y usuarios únicos por curso. Primero se agrupa por (curso, usuario)
+    y luego por curso: el número de grupos es el de usuarios únicos.
+    """
+    filas = _agregar([
+        _match_fechas(desde, tipo_evento='curso_view', curso_id={'$ne': None}),
+        {'$group': {
+            '_id': {'curso_id': '$curso_id', 'usuario_id': '$usuario_id'},
+            'vistas': {'$sum': 1},
+        }},
+        {'$group': {
+            '_id': '$_id.curso_id',
+            'vistas': {'$sum': '$vistas'},
+            'usuarios_unicos': {'$sum': 1},
+        }},
+        {'$sort': {'vistas': -1, '_id': 1}},
+        {'$limit': limite},
+    ])
+    return [
+        {'curso_id': fila['_id'], 'vistas': fila['vistas'], 'usuarios_unicos': fila['usuarios_unicos']}
+        for fila in filas
+    ]
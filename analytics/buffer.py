@@ -0,0 +1,186 @@
+"""
+Escritor en segundo plano de eventos de usuario.
+
+Con ANALYTICS_BUFFER_ACTIVO la creación de eventos solo encola el documento
+(con su ObjectId ya asignado) y un hilo del proceso lo escribe en lotes con
+insert_many cuando se alcanza ANALYTICS_BUFFER_LOTE eventos o pasan
+ANALYTICS_BUFFER_INTERVALO segundos. La cola está acotada: si está llena se
+espera como mucho ANALYTICS_BUFFER_ESPERA segundos y después el evento se
+descarta y se cuenta. Al terminar el proceso se vacía lo pendiente.
+
+Los eventos encolados se pierden si el proceso muere de forma abrupta; es
+un compromiso aceptable para datos de analítica. Los descartes sí se
+notifican al cliente (503) y se exponen en GET /api/analytics/eventos/buffer/.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from bson import ObjectId
+from django.conf import settings
+
+logger = logging.getLogger('analytics')
+
+# Marca para despertar al hilo al detenerlo
+_FIN = object()
+
+
+class BufferLleno(Exception):
+    """El evento se descartó porque la cola de escritura está llena"""
+
+
+class BufferEventos:
+    """Cola acotada de documentos EventoUsuario con un hilo que los escribe en lotes"""
+
+    def __init__(self, capacidad=10000, tamano_lote=500, intervalo=1.0, espera=0.0, escribir=None):
+        self.capacidad = capacidad
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.espera = espera
+        self._escribir = escribir
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._cola = queue.Queue(maxsize=self.capacidad)
+        self._detener = threading.Event()
+        self._hilo = None
+        self.escritos = 0
+        self.fallidos = 0
+        self.descartados = 0
+
+    # ------------------------------------------------------------------
+    # Productor
+    # ------------------------------------------------------------------
+
+    def encolar(self, evento):
+        """Encola el documento sin guardarlo. Devuelve False si se descartó."""
+        self._asegurar_hilo()
+        if evento.id is None:
+            evento.id = ObjectId()
+        try:
+            if self.espera:
+                self._cola.put(evento, timeout=self.espera)
+            else:
+                self._cola.put_nowait(evento)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+                descartados = self.descartados
+            # Un aviso por cada potencia de 10 para no saturar el log
+            if str(descartados).rstrip('0') == '1':
+                logger.warning(f"Buffer de eventos lleno: {descartados} eventos descartados")
+            return False
+        return True
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (fork): la cola y el hilo heredados no sirven
+                self._reiniciar()
+            if self._hilo is None:
+                self._hilo = threading.Thread(
+                    target=self._ejecutar, name='analytics-buffer', daemon=True
+                )
+                self._hilo.start()
+
+    # ------------------------------------------------------------------
+    # Consumidor
+    # ------------------------------------------------------------------
+
+    def _siguiente_lote(self):
+        """Espera hasta completar un lote o agotar el intervalo; al detenerse no espera"""
+        lote = []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote:
+            try:
+                if self._detener.is_set():
+                    evento = self._cola.get_nowait()
+                else:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    evento = self._cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            if evento is not _FIN:
+                lote.append(evento)
+        return lote
+
+    def _ejecutar(self):
+        while True:
+            self._escribir_lote(self._siguiente_lote())
+            if self._detener.is_set() and self._cola.empty():
+                break
+
+    def _escribir_lote(self, lote):
+        if not lote:
+            return
+        escribir = self._escribir
+        if escribir is None:
+            from .ingesta import insertar_eventos as escribir
+        try:
+            _, errores = escribir(lote)
+        except Exception as e:
+            logger.error(f"Error al escribir {len(lote)} eventos de analytics: {str(e)}")
+            errores = dict.fromkeys(range(len(lote)))
+        with self._lock:
+            self.escritos += len(lote) - len(errores)
+            self.fallidos += len(errores)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def vaciar(self, timeout=10):
+        """Detiene el hilo tras escribir todo lo pendiente"""
+        hilo = self._hilo
+        if hilo is None or self._pid != os.getpid():
+            return
+        self._detener.set()
+        try:
+            # Despierta al hilo si está esperando con la cola vacía
+            self._cola.put_nowait(_FIN)
+        except queue.Full:
+            pass
+        hilo.join(timeout)
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def estadisticas(self):
+        """Contadores del proceso actual (cada worker tiene su propio buffer)"""
+        return {
+            'pid': self._pid,
+            'capacidad': self.capacidad,
+            'pendientes': self._cola.qsize(),
+            'escritos': self.escritos,
+            'fallidos': self.fallidos,
+            'descartados': self.descartados,
+        }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def obtener_buffer():
+    """Buffer del proceso, o None si ANALYTICS_BUFFER_ACTIVO está desactivado"""
+    global _buffer
+    if not settings.ANALYTICS_BUFFER_ACTIVO:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferEventos(
+                    capacidad=settings.ANALYTICS_BUFFER_CAPACIDAD,
+                    tamano_lote=settings.ANALYTICS_BUFFER_LOTE,
+                    intervalo=settings.ANALYTICS_BUFFER_INTERVALO,
+                    espera=settings.ANALYTICS_BUFFER_ESPERA,
+                )
+                atexit.register(_buffer.vaciar)
+    return _buffer
@@ -0,0 +1,48 @@
+"""
+Escritura en bloque de eventos de usuario.
+
+Los documentos se validan con MongoEngine y se insertan con un único
+insert_many sin orden, de modo que un documento rechazado no impide
+insertar los demás.
+"""
+from mongoengine.errors import ValidationError
+from pymongo.errors import BulkWriteError
+from .models import EventoUsuario
+
+
+def insertar_eventos(eventos):
+    """
+    Inserta los documentos EventoUsuario (sin guardar) en una sola operación.
+    Devuelve (ids, errores): los ids asignados por posición (None si falló)
+    y un diccionario {posición: mensaje} con los rechazados.
+    """
+    ids = [None] * len(eventos)
+    errores = {}
+    documentos = []
+    posiciones = []
+    for posicion, evento in enumerate(eventos):
+        try:
+            evento.validate()
+        except ValidationError as exc:
+            errores[posicion] = exc.to_dict() or str(exc)
+            continue
+        documentos.append(evento.to_mongo().to_dict())
+        posiciones.append(posicion)
+
+    if not documentos:
+        return ids, errores
+
+    fallidos = set()
+    try:
+        EventoUsuario._get_collection().insert_many(documentos, ordered=False)
+    except BulkWriteError as exc:
+        for error in exc.details.get('writeErrors', []):
+            fallidos.add(error['index'])
+            errores[posiciones[error['index']]] = error.get('errmsg', 'Error de escritura')
+
+    # insert_many asigna _id a cada diccionario antes de enviarlo
+    for indice, (posicion, documento) in enumerate(zip(posiciones, documentos)):
+        if indice not in fallidos:
+            ids[posicion] = documento['_id']
+            eventos[posicion].id = documento['_id']
+    return ids, errores
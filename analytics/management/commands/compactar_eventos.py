@@ -0,0 +1,31 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from analytics import resumenes
+
+
+class Command(BaseCommand):
+    help = 'Compacta los eventos de las horas cerradas en resúmenes por hora y por día (para ejecutar desde cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Fecha ISO (UTC) desde la que empezar en la primera ejecución o al reconstruir'
+        )
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Descarta la marca de agua y vuelve a compactar desde --desde o el primer evento'
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = datetime.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError('--desde debe ser una fecha ISO, por ejemplo 2025-01-01T00:00')
+
+        horas, dias = resumenes.compactar(desde=desde, reconstruir=options['reconstruir'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Compactación completada ({horas} horas, {dias} días)'
+        ))
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from analytics.models import EventoUsuario
+from analytics.models.evento import COLECCION_EVENTOS, COLECCION_EVENTOS_TIMESERIES, _ttl_eventos
+
+# Índices que el modelo ya no declara (los cubren fecha_hora_1 y los compuestos)
+INDICES_OBSOLETOS = ['usuario_id_1', 'tipo_evento_1', 'fecha_hora_-1']
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica la configuración de almacenamiento de eventos_usuario: elimina índices '
+        'redundantes, ajusta la retención (TTL) y, con ANALYTICS_EVENTOS_TIMESERIES, '
+        'copia los eventos a la colección de series temporales'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Eventos por insert_many al copiar a la colección de series temporales'
+        )
+
+    def handle(self, *args, **options):
+        # Se trabaja sobre las colecciones de pymongo para no disparar
+        # ensure_indexes con la configuración nueva antes de migrar
+        db = EventoUsuario._get_db()
+        ttl = _ttl_eventos()
+        plana = db[COLECCION_EVENTOS]
+
+        self._eliminar_indices_obsoletos(plana)
+        self._ajustar_ttl_plana(db, plana, ttl)
+
+        if settings.ANALYTICS_EVENTOS_TIMESERIES:
+            serie = self._coleccion_timeseries(db, ttl)
+            copiados = self._copiar(plana, serie, options['lote'])
+            self.stdout.write(f'  {copiados} eventos copiados a {COLECCION_EVENTOS_TIMESERIES}')
+            self.stdout.write(
+                f'  Cuando se haya verificado la copia, {COLECCION_EVENTOS} puede eliminarse'
+            )
+
+        EventoUsuario._collection = None
+        EventoUsuario.ensure_indexes()
+        self.stdout.write(self.style.SUCCESS('✓ Almacenamiento de eventos actualizado'))
+
+    def _eliminar_indices_obsoletos(self, coleccion):
+        existentes = coleccion.index_information()
+        for nombre in INDICES_OBSOLETOS:
+            if nombre in existentes:
+                coleccion.drop_index(nombre)
+                self.stdout.write(f'  Índice {nombre} eliminado')
+
+    def _ajustar_ttl_plana(self, db, coleccion, ttl):
+        indice = coleccion.index_information().get('fecha_hora_1')
+        if indice is None:
+            return
+        actual = indice.get('expireAfterSeconds')
+        if actual == ttl:
+            return
+        if ttl and actual is not None:
+            db.command('collMod', COLECCION_EVENTOS, index={
+                'keyPattern': {'fecha_hora': 1},
+                'expireAfterSeconds': ttl,
+            })
+        else:
+            # Añadir o quitar la caducidad requiere recrear el índice
+            coleccion.drop_index('fecha_hora_1')
+            opciones = {'expireAfterSeconds': ttl} if ttl else {}
+            coleccion.create_index('fecha_hora', **opciones)
+        self.stdout.write(f'  Retención de {COLECCION_EVENTOS}: {ttl or "sin caducidad"}')
+
+    def _coleccion_timeseries(self, db, ttl):
+        if COLECCION_EVENTOS_TIMESERIES not in db.list_collection_names():
+            opciones = {'expireAfterSeconds': ttl} if ttl else {}
+            self.stdout.write(f'  Creando colección de series temporales {COLECCION_EVENTOS_TIMESERIES}')
+            return db.create_collection(
+                COLECCION_EVENTOS_TIMESERIES,
+                timeseries={'timeField': 'fecha_hora', 'metaField': 'origen', 'granularity': 'seconds'},
+                **opciones
+            )
+        db.command('collMod', COLECCION_EVENTOS_TIMESERIES, expireAfterSeconds=ttl or 'off')
+        return db[COLECCION_EVENTOS_TIMESERIES]
+
+    def _copiar(self, origen, destino, tamano_lote):
+        """
+        Copia en orden de _id con inserciones ordenadas: si se interrumpe, el
+        destino contiene un prefijo exacto de la copia y la siguiente ejecución
+        continúa después del mayor _id copiado. (Con fecha_hora como clave un
+        lote sin orden podía dejar huecos; la colección de series temporales no
+        tiene índice único en _id que rechace duplicados al repetir la copia.)
+        """
+        ultimo = destino.find_one({}, sort=[('_id', -1)], projection={'_id': 1})
+        filtro = {'_id': {'$gt': ultimo['_id']}} if ultimo else {}
+
+        copiados = 0
+        lote = []
+        for documento in origen.find(filtro).sort('_id', 1).batch_size(tamano_lote):
+            documento['origen'] = {
+                'usuario_id': documento.get('usuario_id'),
+                'tipo_evento': documento.get('tipo_evento'),
+            }
+            lote.append(documento)
+            if len(lote) >= tamano_lote:
+                destino.insert_many(lote, ordered=True)
+                copiados += len(lote)
+                lote = []
+        if lote:
+            destino.insert_many(lote, ordered=True)
+            copiados += len(lote)
+        return copiados
@@ -1,3 +1,4 @@
 from .evento import EventoUsuario
+from .resumen import ResumenEventosHora, ResumenEventosDia, EstadoCompactacion
 
-__all__ = ['EventoUsuario']
+__all__ = ['EventoUsuario', 'ResumenEventosHora', 'ResumenEventosDia', 'EstadoCompactacion']
@@ -1,5 +1,52 @@
 from mongoengine import Document, fields
 from datetime import datetime
+from django.conf import settings
+
+COLECCION_EVENTOS = 'eventos_usuario'
+COLECCION_EVENTOS_TIMESERIES = 'eventos_usuario_ts'
+
+
+def _ttl_eventos():
+    """Segundos de retención de los eventos crudos (None = sin caducidad)"""
+    dias = settings.ANALYTICS_EVENTOS_TTL_DIAS
+    return dias * 24 * 3600 if dias else None
+
+
+def _meta_eventos():
+    """
+    Colección e índices de EventoUsuario según ANALYTICS_EVENTOS_TIMESERIES.
+    Los cambios de almacenamiento se aplican con `manage.py optimizar_eventos_usuario`.
+    """
+    ttl = _ttl_eventos()
+    indices = [
+        ('usuario_id', 'tipo_evento'),
+        ('usuario_id', 'curso_id'),
+    ]
+    if settings.ANALYTICS_EVENTOS_TIMESERIES:
+        # La colección de series temporales ya agrupa por fecha_hora y
+        # caduca por expireAfterSeconds: no necesita índice propio de fecha
+        timeseries = {
+            'timeField': 'fecha_hora',
+            'metaField': 'origen',
+            'granularity': 'seconds',
+        }
+        if ttl:
+            timeseries['expireAfterSeconds'] = ttl
+        return {
+            'collection': COLECCION_EVENTOS_TIMESERIES,
+            'timeseries': timeseries,
+            'indexes': indices,
+            'ordering': ['-fecha_hora']
+        }
+
+    indice_fecha = {'fields': ['fecha_hora'], 'expireAfterSeconds': ttl} if ttl else 'fecha_hora'
+    return {
+        'collection': COLECCION_EVENTOS,
+        # fecha_hora sirve también para ordenar descendente y los compuestos
+        # cubren las búsquedas por usuario_id
+        'indexes': [indice_fecha] + indices,
+        'ordering': ['-fecha_hora']
+    }
 
 
 class EventoUsuario(Document):
@@ -55,18 +102,14 @@ class EventoUsuario(Document):
     # Tiempo dedicado (en segundos)
     duracion_segundos = fields.IntField(default=0)
     
-    meta = {
-        'collection': 'eventos_usuario',
-        'indexes': [
-            'usuario_id',
-            'tipo_evento',
-            'fecha_hora',
-            ('usuario_id', 'tipo_evento'),
-            ('usuario_id', 'curso_id'),
-            '-fecha_hora',  # Índice descendente para consultas recientes
-        ],
-        'ordering': ['-fecha_hora']
-    }
+    # metaField de la colección de series temporales (copia de usuario_id y tipo_evento)
+    origen = fields.DictField(default=None)
+    
+    meta = _meta_eventos()
+    
+    def clean(self):
+        if settings.ANALYTICS_EVENTOS_TIMESERIES:
+            self.origen = {'usuario_id': self.usuario_id, 'tipo_evento': self.tipo_evento}
     
     def __str__(self):
         return f"{self.tipo_evento} - Usuario {self.usuario_id} - {self.fecha_hora}"
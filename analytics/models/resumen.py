@@ -0,0 +1,62 @@
+from mongoengine import Document, fields
+from datetime import datetime
+
+
+class ResumenEventosBase(Document):
+    """
+    Resumen (rollup) de eventos de un periodo cerrado.
+    Lo genera el comando `compactar_eventos`; los periodos sin eventos no tienen documento.
+    """
+    # Inicio del periodo (UTC)
+    periodo = fields.DateTimeField(required=True)
+
+    total = fields.IntField(default=0)
+
+    # {tipo_evento: total}
+    por_tipo = fields.DictField(default=dict)
+
+    # Vistas de curso (curso_view): {str(curso_id): total}
+    vistas_curso = fields.DictField(default=dict)
+
+    # Registros HyperLogLog de usuarios únicos (ver analytics/hll.py)
+    usuarios_hll = fields.DictField(default=dict)
+
+    # Registros HyperLogLog por curso para curso_view: {str(curso_id): {indice: rango}}
+    usuarios_curso_hll = fields.DictField(default=dict)
+
+    fecha_calculo = fields.DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'abstract': True,
+        'indexes': [
+            {'fields': ['periodo'], 'unique': True},
+        ],
+        'ordering': ['periodo']
+    }
+
+
+class ResumenEventosHora(ResumenEventosBase):
+    meta = {'collection': 'eventos_resumen_hora'}
+
+
+class ResumenEventosDia(ResumenEventosBase):
+    meta = {'collection': 'eventos_resumen_dia'}
+
+
+class EstadoCompactacion(Document):
+    """
+    Intervalo de horas [cubierto_desde, cubierto_hasta) ya compactado en resúmenes.
+    Fuera de ese intervalo las estadísticas se calculan sobre los eventos crudos.
+    """
+    clave = fields.StringField(required=True, unique=True, default='eventos_usuario')
+    cubierto_desde = fields.DateTimeField()
+    cubierto_hasta = fields.DateTimeField()
+    fecha_actualizacion = fields.DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'eventos_resumen_estado'
+    }
+
+    @classmethod
+    def obtener(cls):
+        return cls.objects(clave='eventos_usuario').first()
@@ -0,0 +1,25 @@
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser para JSON delimitado por saltos de línea (un evento por línea).
+    Devuelve la lista de objetos; las líneas vacías se ignoran.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        datos = []
+        for numero, linea in enumerate(stream.read().decode(encoding).splitlines(), start=1):
+            if not linea.strip():
+                continue
+            try:
+                datos.append(json.loads(linea))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON inválido en la línea {numero}: {exc}')
+        return datos
@@ -0,0 +1,300 @@
+"""
+Resúmenes (rollups) por hora y por día de los eventos de usuario.
+
+`compactar()` resume las horas cerradas en `eventos_resumen_hora`, los días
+completos en `eventos_resumen_dia` y avanza la marca de agua en
+EstadoCompactacion. Las consultas combinan los resúmenes del intervalo ya
+compactado con pipelines sobre los eventos crudos solo para lo que queda
+fuera (la hora abierta y, si el rango no está alineado, los bordes), así el
+coste no crece con la longitud del historial.
+
+Los usuarios únicos de los resúmenes son aproximados (HyperLogLog, ver hll.py).
+Si el rango pedido no toca el intervalo compactado se usan los pipelines
+exactos de agregaciones.py.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from . import agregaciones, hll
+from .models import EventoUsuario, ResumenEventosHora, ResumenEventosDia, EstadoCompactacion
+
+UNA_HORA = timedelta(hours=1)
+UN_DIA = timedelta(days=1)
+
+# Las horas recién cerradas se esperan un poco antes de compactarlas
+MARGEN_COMPACTACION = timedelta(minutes=5)
+
+
+def _truncar_hora(fecha):
+    return fecha.replace(minute=0, second=0, microsecond=0)
+
+
+def _truncar_dia(fecha):
+    return fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _redondear_hora(fecha):
+    truncada = _truncar_hora(fecha)
+    return truncada if truncada == fecha else truncada + UNA_HORA
+
+
+def _redondear_dia(fecha):
+    truncada = _truncar_dia(fecha)
+    return truncada if truncada == fecha else truncada + UN_DIA
+
+
+class Resumen:
+    """Acumulador combinable de conteos y registros HLL de un rango de tiempo"""
+
+    def __init__(self):
+        self.total = 0
+        self.por_tipo = Counter()
+        self.por_dia = Counter()
+        self.vistas_curso = Counter()
+        self.usuarios_hll = {}
+        self.usuarios_curso_hll = defaultdict(dict)
+
+    def sumar(self, total, por_tipo, vistas_curso, usuarios_hll, usuarios_curso_hll, por_dia):
+        self.total += total
+        self.por_tipo.update(por_tipo)
+        self.por_dia.update(por_dia)
+        self.vistas_curso.update({int(curso_id): vistas for curso_id, vistas in vistas_curso.items()})
+        hll.fusionar(self.usuarios_hll, usuarios_hll)
+        for curso_id, registros in usuarios_curso_hll.items():
+            hll.fusionar(self.usuarios_curso_hll[int(curso_id)], registros)
+
+    def sumar_documento(self, documento):
+        self.sumar(
+            documento.total, documento.por_tipo, documento.vistas_curso,
+            documento.usuarios_hll, documento.usuarios_curso_hll,
+            {documento.periodo.strftime('%Y-%m-%d'): documento.total} if documento.total else {},
+        )
+
+    @property
+    def usuarios_unicos(self):
+        return hll.estimar(self.usuarios_hll)
+
+    def cursos_top(self, limite):
+        return sorted(self.vistas_curso.items(), key=lambda fila: (-fila[1], fila[0]))[:limite]
+
+
+# ----------------------------------------------------------------------
+# Eventos crudos
+# ----------------------------------------------------------------------
+
+def _resumen_crudo(desde, hasta):
+    """Conteos y registros HLL de [desde, hasta) calculados sobre los eventos"""
+    resultado = agregaciones._facetas(agregaciones._match_fechas(desde, hasta), {
+        'total': agregaciones.faceta_total(),
+        'por_tipo': agregaciones.faceta_por_tipo(),
+        'por_dia': agregaciones.faceta_por_dia(),
+        'usuarios': [{'$group': {'_id': '$usuario_id'}}],
+        'cursos': [
+            {'$match': {'tipo_evento': 'curso_view', 'curso_id': {'$ne': None}}},
+            {'$group': {'_id': {'curso_id': '$curso_id', 'usuario_id': '$usuario_id'}, 'vistas': {'$sum': 1}}},
+        ],
+    })
+    vistas_curso = Counter()
+    usuarios_curso = defaultdict(dict)
+    for fila in resultado.get('cursos') or []:
+        curso_id = fila['_id']['curso_id']
+        vistas_curso[curso_id] += fila['vistas']
+        hll.agregar(usuarios_curso[curso_id], fila['_id']['usuario_id'])
+
+    return {
+        'total': agregaciones._escalar(resultado, 'total'),
+        'por_tipo': agregaciones._diccionario(resultado, 'por_tipo'),
+        'por_dia': agregaciones._diccionario(resultado, 'por_dia'),
+        'vistas_curso': vistas_curso,
+        'usuarios_hll': hll.desde_valores(fila['_id'] for fila in resultado.get('usuarios') or []),
+        'usuarios_curso_hll': usuarios_curso,
+    }
+
+
+def _sumar_crudo(resumen, desde, hasta):
+    if desde < hasta:
+        resumen.sumar(**_resumen_crudo(desde, hasta))
+
+
+def _sumar_documentos(resumen, modelo, desde, hasta):
+    if desde < hasta:
+        for documento in modelo.objects(periodo__gte=desde, periodo__lt=hasta):
+            resumen.sumar_documento(documento)
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+
+def _intervalo_cubierto():
+    estado = EstadoCompactacion.obtener()
+    if estado is None or not estado.cubierto_desde or not estado.cubierto_hasta:
+        return None
+    return estado.cubierto_desde, estado.cubierto_hasta
+
+
+def _solapa(desde, hasta, cubierto):
+    return cubierto is not None and desde < cubierto[1] and hasta > cubierto[0]
+
+
+def resumen(desde, hasta, cubierto=None):
+    """
+    Resumen de [desde, hasta): días completos desde eventos_resumen_dia, horas
+    sueltas desde eventos_resumen_hora y el resto sobre los eventos crudos.
+    """
+    cubierto = cubierto or _intervalo_cubierto()
+    acumulado = Resumen()
+    if not _solapa(desde, hasta, cubierto):
+        _sumar_crudo(acumulado, desde, hasta)
+        return acumulado
+
+    inicio = max(desde, cubierto[0])
+    fin = min(hasta, cubierto[1])
+
+    # Fuera del intervalo compactado
+    _sumar_crudo(acumulado, desde, inicio)
+    _sumar_crudo(acumulado, fin, hasta)
+
+    # Bordes que no caen en una hora completa
+    inicio_hora = _redondear_hora(inicio)
+    fin_hora = max(_truncar_hora(fin), inicio_hora)
+    _sumar_crudo(acumulado, inicio, min(inicio_hora, fin))
+    _sumar_crudo(acumulado, max(fin_hora, inicio), fin)
+
+    # Horas completas: días enteros desde el resumen diario, el resto por horas
+    inicio_dia = _redondear_dia(inicio_hora)
+    fin_dia = _truncar_dia(fin_hora)
+    if inicio_dia < fin_dia:
+        _sumar_documentos(acumulado, ResumenEventosDia, inicio_dia, fin_dia)
+        _sumar_documentos(acumulado, ResumenEventosHora, inicio_hora, inicio_dia)
+        _sumar_documentos(acumulado, ResumenEventosHora, fin_dia, fin_hora)
+    else:
+        _sumar_documentos(acumulado, ResumenEventosHora, inicio_hora, fin_hora)
+    return acumulado
+
+
+def estadisticas_actividad(inicio_hoy, inicio_semana, inicio_mes, ahora, limite_cursos=5):
+    cubierto = _intervalo_cubierto()
+    if not _solapa(inicio_mes, ahora, cubierto):
+        return agregaciones.estadisticas_actividad(inicio_hoy, inicio_semana, inicio_mes, limite_cursos)
+
+    mes = resumen(inicio_mes, ahora, cubierto)
+    return {
+        'eventos_hoy': resumen(inicio_hoy, ahora, cubierto).total,
+        'eventos_semana': resumen(inicio_semana, ahora, cubierto).total,
+        'eventos_mes': mes.total,
+        'usuarios_activos': mes.usuarios_unicos,
+        'eventos_por_tipo': dict(mes.por_tipo),
+        'cursos_top': mes.cursos_top(limite_cursos),
+    }
+
+
+def estadisticas_periodo(desde, hasta):
+    cubierto = _intervalo_cubierto()
+    if not _solapa(desde, hasta, cubierto):
+        return agregaciones.estadisticas_periodo(desde, hasta)
+
+    periodo = resumen(desde, hasta, cubierto)
+    return {
+        'total_eventos': periodo.total,
+        'usuarios_activos': periodo.usuarios_unicos,
+        'eventos_por_tipo': dict(periodo.por_tipo),
+        'eventos_por_dia': dict(sorted(periodo.por_dia.items())),
+    }
+
+
+def cursos_populares(desde, hasta, limite=10):
+    cubierto = _intervalo_cubierto()
+    if not _solapa(desde, hasta, cubierto):
+        return agregaciones.cursos_populares(desde, limite=limite)
+
+    periodo = resumen(desde, hasta, cubierto)
+    return [
+        {
+            'curso_id': curso_id,
+            'vistas': vistas,
+            'usuarios_unicos': hll.estimar(periodo.usuarios_curso_hll.get(curso_id, {})),
+        }
+        for curso_id, vistas in periodo.cursos_top(limite)
+    ]
+
+
+# ----------------------------------------------------------------------
+# Compactación
+# ----------------------------------------------------------------------
+
+def _guardar(modelo, periodo, datos):
+    """Reemplaza el resumen del periodo; si no hubo eventos lo elimina"""
+    if not datos['total']:
+        modelo.objects(periodo=periodo).delete()
+        return
+    modelo.objects(periodo=periodo).update_one(
+        upsert=True,
+        set__total=datos['total'],
+        set__por_tipo=dict(datos['por_tipo']),
+        set__vistas_curso={str(curso_id): vistas for curso_id, vistas in datos['vistas_curso'].items()},
+        set__usuarios_hll=datos['usuarios_hll'],
+        set__usuarios_curso_hll={
+            str(curso_id): registros for curso_id, registros in datos['usuarios_curso_hll'].items()
+        },
+        set__fecha_calculo=datetime.utcnow(),
+    )
+
+
+def compactar_hora(hora):
+    _guardar(ResumenEventosHora, hora, _resumen_crudo(hora, hora + UNA_HORA))
+
+
+def compactar_dia(dia):
+    acumulado = Resumen()
+    _sumar_documentos(acumulado, ResumenEventosHora, dia, dia + UN_DIA)
+    _guardar(ResumenEventosDia, dia, {
+        'total': acumulado.total,
+        'por_tipo': acumulado.por_tipo,
+        'vistas_curso': acumulado.vistas_curso,
+        'usuarios_hll': acumulado.usuarios_hll,
+        'usuarios_curso_hll': acumulado.usuarios_curso_hll,
+    })
+
+
+def compactar(hasta=None, desde=None, reconstruir=False):
+    """
+    Compacta las horas cerradas pendientes y devuelve (horas, dias) procesados.
+    `desde` solo se usa en la primera ejecución (o con reconstruir=True);
+    por defecto se empieza en la hora del evento más antiguo.
+    """
+    limite = _truncar_hora(hasta or datetime.utcnow() - MARGEN_COMPACTACION)
+    estado = EstadoCompactacion.obtener()
+    if estado is None or reconstruir:
+        if estado is None:
+            estado = EstadoCompactacion()
+        if desde is None:
+            primero = EventoUsuario.objects.order_by('fecha_hora').only('fecha_hora').first()
+            if primero is None:
+                return 0, 0
+            desde = primero.fecha_hora
+        estado.cubierto_desde = _truncar_hora(desde)
+        estado.cubierto_hasta = estado.cubierto_desde
+
+    inicio = estado.cubierto_hasta
+    if inicio >= limite:
+        return 0, 0
+
+    horas = 0
+    hora = inicio
+    while hora < limite:
+        compactar_hora(hora)
+        hora += UNA_HORA
+        horas += 1
+
+    # Días que han quedado completos dentro del intervalo cubierto
+    dias = 0
+    dia = max(_redondear_dia(estado.cubierto_desde), _truncar_dia(inicio))
+    while dia + UN_DIA <= limite:
+        compactar_dia(dia)
+        dia += UN_DIA
+        dias += 1
+
+    estado.cubierto_hasta = limite
+    estado.fecha_actualizacion = datetime.utcnow()
+    estado.save()
+    return horas, dias
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from ..models import EventoUsuario
+from ..buffer import BufferLleno, obtener_buffer
 
 
 class EventoUsuarioSerializer(serializers.Serializer):
@@ -33,28 +34,53 @@ class EventoUsuarioSerializer(serializers.Serializer):
         return value
     
     def create(self, validated_data):
-        """Crear evento"""
+        """
+        Crear evento (encolado si el buffer de escritura está activo).
+        Lanza BufferLleno si la cola está llena y el evento se descartó.
+        """
+        evento = self.construir(validated_data)
+        buffer = obtener_buffer()
+        if buffer is not None:
+            if not buffer.encolar(evento):
+                raise BufferLleno()
+        else:
+            evento.save()
+        return evento
+    
+    def construir(self, validated_data, datos_peticion=None):
+        """
+        Construir el documento sin guardarlo (lo usa también la ingesta por lotes).
+        `datos_peticion` permite reutilizar los datos de sesión ya calculados.
+        """
+        if datos_peticion is None:
+            datos_peticion = self.datos_peticion()
+        
+        datos = dict(validated_data)
+        for campo, valor in datos_peticion.items():
+            # url y referrer solo se completan si el cliente no los envió
+            if campo in ('url', 'referrer') and datos.get(campo):
+                continue
+            datos[campo] = valor
+        return EventoUsuario(**datos)
+    
+    def datos_peticion(self):
+        """Usuario e información de sesión tomados de la petición"""
         request = self.context.get('request')
+        datos = {}
+        if not request:
+            return datos
         
         # Asignar usuario_id del usuario autenticado
-        if request and request.user.is_authenticated:
-            validated_data['usuario_id'] = request.user.id
+        if request.user.is_authenticated:
+            datos['usuario_id'] = request.user.id
         
         # Agregar información de sesión automáticamente
-        if request:
-            validated_data['sesion_id'] = request.session.session_key or ''
-            validated_data['ip_address'] = self._get_client_ip(request)
-            validated_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')[:500]
-            
-            if not validated_data.get('url'):
-                validated_data['url'] = request.build_absolute_uri()
-            if not validated_data.get('referrer'):
-                referrer = request.META.get('HTTP_REFERER', '')
-                validated_data['referrer'] = referrer if referrer else ''
-        
-        evento = EventoUsuario(**validated_data)
-        evento.save()
-        return evento
+        datos['sesion_id'] = request.session.session_key or ''
+        datos['ip_address'] = self._get_client_ip(request)
+        datos['user_agent'] = request.META.get('HTTP_USER_AGENT', '')[:500]
+        datos['url'] = request.build_absolute_uri()
+        datos['referrer'] = request.META.get('HTTP_REFERER', '')
+        return datos
     
     def _get_client_ip(self, request):
         """Obtener IP del cliente"""
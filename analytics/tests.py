@@ -1,3 +1,411 @@
-from django.test import TestCase
+import io
+import random
+import threading
+from datetime import datetime, timedelta
+from bson import ObjectId
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from mongoengine.connection import get_db
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APITestCase
+from curso_online_project.pruebas_mongo import MongoMockMixin
+from . import agregaciones, hll, resumenes
+from . import buffer as buffer_modulo
+from .ingesta import insertar_eventos
+from .parsers import NDJSONParser
+from .buffer import BufferEventos
+from .management.commands import optimizar_eventos_usuario
+from .models import EstadoCompactacion, EventoUsuario, ResumenEventosDia, ResumenEventosHora
 
-# Create your tests here.
+User = get_user_model()
+
+
+class HyperLogLogTest(SimpleTestCase):
+    """Estimación de usuarios únicos usada por los resúmenes de eventos"""
+
+    def test_estimacion_aproximada(self):
+        registros = hll.desde_valores(range(5000))
+        self.assertAlmostEqual(hll.estimar(registros), 5000, delta=5000 * 0.1)
+
+    def test_fusion_equivale_a_la_union(self):
+        a = hll.desde_valores(range(0, 3000))
+        b = hll.desde_valores(range(2000, 5000))
+        self.assertEqual(hll.fusionar(dict(a), b), hll.desde_valores(range(5000)))
+
+    def test_vacio_y_pequenos(self):
+        self.assertEqual(hll.estimar({}), 0)
+        self.assertEqual(hll.estimar(hll.desde_valores([1, 2, 3, 3, 2])), 3)
+
+
+class NDJSONParserTest(SimpleTestCase):
+    """Cuerpo de la ingesta por lotes en formato NDJSON"""
+
+    def test_una_linea_por_evento(self):
+        cuerpo = b'{"tipo_evento": "click"}\n\n{"tipo_evento": "login"}\n'
+        datos = NDJSONParser().parse(io.BytesIO(cuerpo))
+        self.assertEqual(datos, [{'tipo_evento': 'click'}, {'tipo_evento': 'login'}])
+
+    def test_linea_invalida(self):
+        with self.assertRaises(ParseError):
+            NDJSONParser().parse(io.BytesIO(b'{"tipo_evento": "click"}\nno-json\n'))
+
+
+class BufferEventosTest(SimpleTestCase):
+    """Escritura en segundo plano de eventos"""
+
+    def _evento(self):
+        return EventoUsuario(usuario_id=1, tipo_evento='click')
+
+    def test_escribe_en_lotes_y_vacia_al_detener(self):
+        lotes = []
+        buffer = BufferEventos(tamano_lote=3, intervalo=30, escribir=lambda lote: (lotes.append(lote), {}))
+        eventos = [self._evento() for _ in range(4)]
+        for evento in eventos:
+            self.assertTrue(buffer.encolar(evento))
+        self.assertTrue(all(evento.id for evento in eventos))
+
+        buffer.vaciar()
+
+        self.assertEqual([len(lote) for lote in lotes], [3, 1])
+        self.assertEqual(buffer.estadisticas()['escritos'], 4)
+
+    def test_descarta_con_la_cola_llena(self):
+        liberar = threading.Event()
+        buffer = BufferEventos(
+            capacidad=1, tamano_lote=1, intervalo=30,
+            escribir=lambda lote: (liberar.wait(5), {})
+        )
+        resultados = [buffer.encolar(self._evento()) for _ in range(5)]
+        liberar.set()
+        buffer.vaciar()
+
+        self.assertIn(False, resultados)
+        estadisticas = buffer.estadisticas()
+        self.assertEqual(estadisticas['descartados'], resultados.count(False))
+        self.assertEqual(estadisticas['escritos'] + estadisticas['descartados'], 5)
+
+
+class AgregacionesTest(MongoMockMixin, SimpleTestCase):
+    """Pipelines $facet de las estadísticas de eventos"""
+
+    def setUp(self):
+        super().setUp()
+        self.ahora = datetime(2025, 1, 31, 12)
+        eventos = [
+            # (usuario, tipo, curso, hace)
+            (1, 'curso_view', 10, timedelta(hours=1)),
+            (1, 'curso_view', 10, timedelta(days=2)),
+            (2, 'curso_view', 10, timedelta(days=3)),
+            (2, 'curso_view', 20, timedelta(days=20)),
+            (3, 'click', None, timedelta(hours=2)),
+            (3, 'login', None, timedelta(days=40)),
+        ]
+        for usuario_id, tipo, curso_id, hace in eventos:
+            EventoUsuario(
+                usuario_id=usuario_id, tipo_evento=tipo, curso_id=curso_id, fecha_hora=self.ahora - hace
+            ).save()
+
+    def test_facetas_se_reparten_en_una_sola_respuesta(self):
+        match = {'$match': {}}
+        facetas = {'total': agregaciones.faceta_total(), 'usuarios': agregaciones.faceta_usuarios_unicos()}
+        self.assertEqual(agregaciones._facetas(match, facetas), {'total': [{'total': 6}], 'usuarios': [{'total': 3}]})
+
+    def test_estadisticas_actividad(self):
+        datos = agregaciones.estadisticas_actividad(
+            inicio_hoy=self.ahora.replace(hour=0),
+            inicio_semana=self.ahora - timedelta(days=7),
+            inicio_mes=self.ahora - timedelta(days=30),
+        )
+        self.assertEqual(datos, {
+            'eventos_hoy': 2,
+            'eventos_semana': 4,
+            'eventos_mes': 5,
+            'usuarios_activos': 3,
+            'eventos_por_tipo': {'curso_view': 4, 'click': 1},
+            'cursos_top': [(10, 3), (20, 1)],
+        })
+
+    def test_estadisticas_periodo(self):
+        datos = agregaciones.estadisticas_periodo(self.ahora - timedelta(days=7), self.ahora)
+        self.assertEqual(datos['total_eventos'], 4)
+        self.assertEqual(datos['usuarios_activos'], 3)
+        self.assertEqual(datos['eventos_por_dia'], {'2025-01-28': 1, '2025-01-29': 1, '2025-01-31': 2})
+
+    def test_periodo_sin_eventos(self):
+        datos = agregaciones.estadisticas_periodo(self.ahora + timedelta(days=1))
+        self.assertEqual(datos, {
+            'total_eventos': 0, 'usuarios_activos': 0, 'eventos_por_tipo': {}, 'eventos_por_dia': {},
+        })
+
+    def test_estadisticas_usuario(self):
+        datos = agregaciones.estadisticas_usuario(2)
+        self.assertEqual(datos, {
+            'total_eventos': 2,
+            'eventos_por_tipo': {'curso_view': 2},
+            'cursos_top': [(10, 1), (20, 1)],
+        })
+
+    def test_cursos_populares_cuenta_usuarios_unicos(self):
+        self.assertEqual(agregaciones.cursos_populares(self.ahora - timedelta(days=30)), [
+            {'curso_id': 10, 'vistas': 3, 'usuarios_unicos': 2},
+            {'curso_id': 20, 'vistas': 1, 'usuarios_unicos': 1},
+        ])
+
+
+@override_settings(ANALYTICS_BUFFER_ACTIVO=True, ANALYTICS_BUFFER_INTERVALO=1.0)
+class BufferLlenoApiTest(APITestCase):
+    """Respuesta de la API cuando el buffer descarta eventos"""
+
+    def setUp(self):
+        self.escribiendo = threading.Event()
+        self.liberar = threading.Event()
+        self.buffer_original = buffer_modulo._buffer
+        buffer_modulo._buffer = BufferEventos(capacidad=1, tamano_lote=1, intervalo=30, escribir=self._escribir)
+        self.estudiante = User.objects.create_user(
+            username='estudiante', email='estudiante@example.com', password='testpass123'
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='testpass123', perfil='administrador'
+        )
+
+    def tearDown(self):
+        self.liberar.set()
+        buffer_modulo._buffer.vaciar()
+        buffer_modulo._buffer = self.buffer_original
+
+    def _escribir(self, lote):
+        self.escribiendo.set()
+        self.liberar.wait(5)
+        return [], {}
+
+    def _llenar(self):
+        """Un lote bloqueado en la escritura y la cola ocupada"""
+        buffer = buffer_modulo._buffer
+        buffer.encolar(EventoUsuario(usuario_id=1, tipo_evento='click'))
+        self.escribiendo.wait(5)
+        while buffer.encolar(EventoUsuario(usuario_id=1, tipo_evento='click')):
+            pass
+
+    def test_evento_descartado_devuelve_503(self):
+        self._llenar()
+        self.client.force_authenticate(self.estudiante)
+
+        response = self.client.post('/api/analytics/eventos/', {'tipo_evento': 'click'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(response.data['encolado'])
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_estadisticas_del_buffer_solo_admin(self):
+        self._llenar()
+        self.client.force_authenticate(self.estudiante)
+        self.assertEqual(self.client.get('/api/analytics/eventos/buffer/').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/analytics/eventos/buffer/')
+
+        self.assertTrue(response.data['activo'])
+        self.assertEqual(response.data['capacidad'], 1)
+        self.assertGreaterEqual(response.data['descartados'], 1)
+
+
+class CopiaSeriesTemporalesTest(MongoMockMixin, SimpleTestCase):
+    """Copia de eventos_usuario a la colección de series temporales"""
+
+    def setUp(self):
+        super().setUp()
+        db = get_db('default')
+        self.origen = db['eventos_origen']
+        self.destino = db['eventos_destino']
+        ahora = datetime(2025, 1, 31, 12)
+        # Los _id no siguen el orden de fecha_hora (eventos encolados con retraso)
+        self.origen.insert_many([
+            {'_id': ObjectId(), 'usuario_id': i, 'tipo_evento': 'click', 'fecha_hora': ahora - timedelta(minutes=i % 3)}
+            for i in range(7)
+        ])
+
+    def _copiar(self):
+        return optimizar_eventos_usuario.Command()._copiar(self.origen, self.destino, tamano_lote=2)
+
+    def _ids(self, coleccion):
+        return [documento['_id'] for documento in coleccion.find().sort('_id', 1)]
+
+    def test_copia_completa_con_origen(self):
+        self.assertEqual(self._copiar(), 7)
+        self.assertEqual(self._ids(self.destino), self._ids(self.origen))
+        documento = self.destino.find_one({'usuario_id': 4})
+        self.assertEqual(documento['origen'], {'usuario_id': 4, 'tipo_evento': 'click'})
+
+    def test_reanuda_sin_huecos_ni_duplicados(self):
+        # Copia interrumpida: solo llegó un prefijo en orden de _id
+        self.destino.insert_many(list(self.origen.find().sort('_id', 1).limit(4)))
+
+        self.assertEqual(self._copiar(), 3)
+        self.assertEqual(self._ids(self.destino), self._ids(self.origen))
+        self.assertEqual(self._copiar(), 0)
+
+
+class ResumenesTest(MongoMockMixin, SimpleTestCase):
+    """Resúmenes por hora/día frente a los pipelines exactos sobre los eventos"""
+
+    def setUp(self):
+        super().setUp()
+        self.ahora = datetime.utcnow().replace(microsecond=0)
+        self.inicio = self.ahora.replace(minute=0, second=0) - timedelta(days=4)
+        aleatorio = random.Random(7)
+        minutos = int((self.ahora - self.inicio).total_seconds() // 60)
+        for _ in range(300):
+            tipo = aleatorio.choice(['curso_view', 'curso_view', 'click', 'login'])
+            EventoUsuario(
+                usuario_id=aleatorio.randint(1, 12),
+                tipo_evento=tipo,
+                curso_id=aleatorio.choice([10, 20, 30]) if tipo == 'curso_view' else None,
+                fecha_hora=self.inicio + timedelta(minutes=aleatorio.randrange(minutos)),
+            ).save()
+        # Horas cerradas hasta dos horas antes de ahora; el resto queda crudo
+        self.limite = self.ahora - timedelta(hours=2)
+
+    def _compactar(self):
+        return resumenes.compactar(hasta=self.limite)
+
+    def _comparar(self, desde, hasta):
+        self.assertEqual(
+            resumenes.estadisticas_periodo(desde, hasta),
+            agregaciones.estadisticas_periodo(desde, hasta)
+        )
+
+    def test_periodo_desalineado(self):
+        self._compactar()
+        # Empieza y termina a mitad de hora, cruza días completos y la hora abierta
+        self._comparar(self.inicio + timedelta(hours=7, minutes=13), self.ahora)
+        # Dentro del intervalo compactado, sin días completos
+        self._comparar(self.inicio + timedelta(hours=30, minutes=41), self.inicio + timedelta(hours=40, minutes=5))
+
+    def test_actividad_y_cursos_populares(self):
+        self._compactar()
+        inicio_hoy = self.ahora.replace(hour=0, minute=0, second=0)
+        inicio_semana = self.ahora - timedelta(days=3, minutes=17)
+        inicio_mes = self.ahora - timedelta(days=30)
+        self.assertEqual(
+            resumenes.estadisticas_actividad(inicio_hoy, inicio_semana, inicio_mes, self.ahora),
+            agregaciones.estadisticas_actividad(inicio_hoy, inicio_semana, inicio_mes)
+        )
+        desde = self.inicio + timedelta(hours=5, minutes=50)
+        self.assertEqual(
+            resumenes.cursos_populares(desde, self.ahora),
+            agregaciones.cursos_populares(desde)
+        )
+
+    def test_marca_de_agua(self):
+        horas, dias = self._compactar()
+        estado = EstadoCompactacion.obtener()
+        self.assertEqual(estado.cubierto_desde, self.inicio)
+        self.assertEqual(estado.cubierto_hasta, self.limite.replace(minute=0, second=0))
+        self.assertEqual(horas, int((estado.cubierto_hasta - estado.cubierto_desde).total_seconds() // 3600))
+        self.assertGreaterEqual(dias, 2)
+
+        # Sin horas nuevas no hace nada; después solo compacta las nuevas
+        self.assertEqual(self._compactar(), (0, 0))
+        self.limite += timedelta(hours=1)
+        self.assertEqual(self._compactar()[0], 1)
+        self._comparar(self.inicio, self.ahora)
+
+    def test_sin_eventos(self):
+        EventoUsuario.objects.delete()
+        self.assertEqual(self._compactar(), (0, 0))
+        self.assertIsNone(EstadoCompactacion.obtener())
+
+    def test_reconstruir_corrige_los_resumenes(self):
+        self._compactar()
+        ResumenEventosHora.objects.update(set__total=999)
+        ResumenEventosDia.objects.update(set__total=999)
+
+        call_command('compactar_eventos', '--reconstruir', '--desde', self.inicio.isoformat(), stdout=io.StringIO())
+
+        self._comparar(self.inicio, self.ahora)
+
+    def test_desde_invalido(self):
+        with self.assertRaises(CommandError):
+            call_command('compactar_eventos', '--desde', 'ayer', stdout=io.StringIO())
+
+
+class IngestaLoteTest(MongoMockMixin, APITestCase):
+    """Ingesta por lotes (POST /api/analytics/eventos/lote/)"""
+
+    url = '/api/analytics/eventos/lote/'
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user(
+            username='estudiante', email='estudiante@example.com', password='testpass123'
+        )
+        self.client.force_authenticate(self.usuario)
+
+    def test_validos_e_invalidos_mezclados(self):
+        eventos = [
+            {'tipo_evento': 'click', 'curso_id': 1},
+            {'tipo_evento': 'no_existe'},
+            {'tipo_evento': 'login'},
+            {'curso_id': 2},
+        ]
+        response = self.client.post(self.url, eventos, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['recibidos'], 4)
+        self.assertEqual(response.data['insertados'], 2)
+        self.assertEqual([fila['indice'] for fila in response.data['ids']], [0, 2])
+        self.assertEqual([fila['indice'] for fila in response.data['errores']], [1, 3])
+        guardados = {str(evento.id): evento for evento in EventoUsuario.objects.all()}
+        self.assertEqual(set(guardados), {fila['id'] for fila in response.data['ids']})
+        self.assertEqual({evento.usuario_id for evento in guardados.values()}, {self.usuario.id})
+
+    def test_todos_invalidos(self):
+        response = self.client.post(self.url, [{'tipo_evento': 'no_existe'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['insertados'], 0)
+
+    def test_cuerpo_vacio_o_no_lista(self):
+        for cuerpo in ([], {'tipo_evento': 'click'}):
+            response = self.client.post(self.url, cuerpo, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(EventoUsuario.objects.count(), 0)
+
+    @override_settings(ANALYTICS_LOTE_MAXIMO=2)
+    def test_maximo_por_lote(self):
+        response = self.client.post(self.url, [{'tipo_evento': 'click'}] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(EventoUsuario.objects.count(), 0)
+
+    def test_ndjson(self):
+        cuerpo = b'{"tipo_evento": "click"}\n\n{"tipo_evento": "search", "metadata": {"q": "python"}}\n'
+        response = self.client.post(self.url, cuerpo, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['insertados'], 2)
+        self.assertEqual(EventoUsuario.objects.get(tipo_evento='search').metadata, {'q': 'python'})
+
+    def test_ndjson_invalido(self):
+        response = self.client.post(self.url, b'{"tipo_evento": "click"}\nno-json\n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_errores_de_escritura_por_posicion(self):
+        """Los writeErrors de insert_many se devuelven en la posición del evento"""
+        existente = EventoUsuario(usuario_id=1, tipo_evento='click')
+        existente.save()
+        eventos = [
+            EventoUsuario(usuario_id=1, tipo_evento='login'),
+            EventoUsuario(usuario_id=1, tipo_evento='no_existe'),
+            EventoUsuario(id=existente.id, usuario_id=1, tipo_evento='click'),
+            EventoUsuario(usuario_id=1, tipo_evento='logout'),
+        ]
+
+        ids, errores = insertar_eventos(eventos)
+
+        self.assertEqual(sorted(errores), [1, 2])
+        self.assertIsNotNone(ids[0])
+        self.assertIsNone(ids[1])
+        self.assertIsNone(ids[2])
+        self.assertEqual(ids[3], eventos[3].id)
+        self.assertEqual(EventoUsuario.objects.count(), 3)
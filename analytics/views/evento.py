@@ -2,11 +2,17 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from django.conf import settings
 from ..models import EventoUsuario
 from ..serializers import EventoUsuarioSerializer
 from ..permissions import IsAdminUser
+from ..parsers import NDJSONParser
+from ..ingesta import insertar_eventos
+from ..buffer import BufferLleno, obtener_buffer
+from .. import agregaciones, resumenes
 from datetime import datetime, timedelta
-from django.db.models import Count
+import math
 
 
 class EventoUsuarioViewSet(viewsets.ViewSet):
@@ -14,10 +20,10 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
     
     def get_permissions(self):
         """
-        - Crear: Usuarios autenticados
+        - Crear (uno o por lotes): Usuarios autenticados
         - Leer/Estadísticas: Solo admin
         """
-        if self.action == 'create':
+        if self.action in ['create', 'lote']:
             return [IsAuthenticated()]
         return [IsAdminUser()]
     
@@ -26,7 +32,15 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
         serializer = EventoUsuarioSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
-            evento = serializer.save()
+            try:
+                evento = serializer.save()
+            except BufferLleno:
+                # El cliente puede reintentar cuando el hilo vacíe la cola
+                return Response(
+                    {'error': 'Servicio de eventos saturado, reintente más tarde', 'encolado': False},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': str(math.ceil(settings.ANALYTICS_BUFFER_INTERVALO))}
+                )
             return Response(
                 EventoUsuarioSerializer(evento, context={'request': request}).data,
                 status=status.HTTP_201_CREATED
@@ -34,6 +48,61 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def lote(self, request):
+        """
+        Registrar varios eventos en una sola petición.
+        Acepta un array JSON o NDJSON (application/x-ndjson, un evento por línea).
+        Los eventos válidos se insertan aunque otros fallen; los errores se
+        devuelven por posición.
+        """
+        eventos_data = request.data
+        if not isinstance(eventos_data, list) or not eventos_data:
+            return Response(
+                {'error': 'Se esperaba una lista de eventos no vacía'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        maximo = settings.ANALYTICS_LOTE_MAXIMO
+        if len(eventos_data) > maximo:
+            return Response(
+                {'error': f'Máximo {maximo} eventos por lote'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = EventoUsuarioSerializer(context={'request': request})
+        datos_peticion = serializer.datos_peticion()
+        
+        errores = {}
+        eventos = []
+        posiciones = []
+        for posicion, evento_data in enumerate(eventos_data):
+            item = EventoUsuarioSerializer(data=evento_data, context={'request': request})
+            if item.is_valid():
+                eventos.append(item.construir(item.validated_data, datos_peticion))
+                posiciones.append(posicion)
+            else:
+                errores[posicion] = item.errors
+        
+        ids, errores_escritura = insertar_eventos(eventos)
+        for indice, error in errores_escritura.items():
+            errores[posiciones[indice]] = error
+        
+        insertados = [
+            {'indice': posiciones[indice], 'id': str(evento_id)}
+            for indice, evento_id in enumerate(ids) if evento_id is not None
+        ]
+        
+        return Response({
+            'recibidos': len(eventos_data),
+            'insertados': len(insertados),
+            'ids': insertados,
+            'errores': [
+                {'indice': posicion, 'errores': errores[posicion]}
+                for posicion in sorted(errores)
+            ]
+        }, status=status.HTTP_201_CREATED if insertados else status.HTTP_400_BAD_REQUEST)
+    
     def list(self, request):
         """Listar eventos (solo admin)"""
         usuario_id = request.query_params.get('usuario_id')
@@ -73,6 +142,14 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @action(detail=False, methods=['get'])
+    def buffer(self, request):
+        """Estado del buffer de escritura de este proceso (solo admin)"""
+        buffer = obtener_buffer()
+        if buffer is None:
+            return Response({'activo': False})
+        return Response({'activo': True, **buffer.estadisticas()})
+    
     @action(detail=False, methods=['get'])
     def estadisticas_usuario(self, request):
         """Estadísticas de un usuario específico"""
@@ -84,29 +161,15 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        eventos = list(EventoUsuario.objects(usuario_id=int(usuario_id)))
-        
-        # Calcular estadísticas
-        total_eventos = len(eventos)
-        eventos_por_tipo = {}
-        for evento in eventos:
-            eventos_por_tipo[evento.tipo_evento] = eventos_por_tipo.get(evento.tipo_evento, 0) + 1
-        
-        # Cursos más visitados
-        cursos_visitados = {}
-        for evento in eventos:
-            if evento.curso_id:
-                cursos_visitados[evento.curso_id] = cursos_visitados.get(evento.curso_id, 0) + 1
-        
-        cursos_top = sorted(cursos_visitados.items(), key=lambda x: x[1], reverse=True)[:5]
+        resultado = agregaciones.estadisticas_usuario(int(usuario_id))
         
         return Response({
             'usuario_id': int(usuario_id),
-            'total_eventos': total_eventos,
-            'eventos_por_tipo': eventos_por_tipo,
+            'total_eventos': resultado['total_eventos'],
+            'eventos_por_tipo': resultado['eventos_por_tipo'],
             'cursos_mas_visitados': [
                 {'curso_id': curso_id, 'visitas': visitas}
-                for curso_id, visitas in cursos_top
+                for curso_id, visitas in resultado['cursos_top']
             ]
         })
     
@@ -121,57 +184,27 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
         inicio_semana = ahora - timedelta(days=7)
         inicio_mes = ahora - timedelta(days=30)
         
-        # Eventos hoy
-        eventos_hoy = EventoUsuario.objects(fecha_hora__gte=inicio_hoy).count()
-        
-        # Eventos semana
-        eventos_semana = EventoUsuario.objects(fecha_hora__gte=inicio_semana).count()
-        
-        # Eventos mes
-        eventos_mes = EventoUsuario.objects(fecha_hora__gte=inicio_mes).count()
-        
-        # Usuarios activos (únicos en el mes)
-        eventos_mes_list = list(EventoUsuario.objects(fecha_hora__gte=inicio_mes))
-        usuarios_activos = len(set(e.usuario_id for e in eventos_mes_list))
-        
-        # Eventos por tipo (mes)
-        eventos_por_tipo = {}
-        for evento in eventos_mes_list:
-            eventos_por_tipo[evento.tipo_evento] = eventos_por_tipo.get(evento.tipo_evento, 0) + 1
-        
-        # Cursos más visitados (mes)
-        cursos_visitas = {}
-        for evento in eventos_mes_list:
-            if evento.curso_id and evento.tipo_evento == 'curso_view':
-                cursos_visitas[evento.curso_id] = cursos_visitas.get(evento.curso_id, 0) + 1
-        
-        cursos_top = sorted(cursos_visitas.items(), key=lambda x: x[1], reverse=True)[:5]
+        resultado = resumenes.estadisticas_actividad(inicio_hoy, inicio_semana, inicio_mes, ahora)
         
-        # Obtener títulos de cursos
+        # Obtener títulos de cursos en una sola consulta
+        cursos = Curso.objects.in_bulk([curso_id for curso_id, _ in resultado['cursos_top']])
         cursos_mas_visitados = []
-        for curso_id, visitas in cursos_top:
-            try:
-                curso = Curso.objects.get(id=curso_id)
-                cursos_mas_visitados.append({
-                    'curso_id': curso_id,
-                    'titulo': curso.titulo,
-                    'visitas': visitas
-                })
-            except Curso.DoesNotExist:
+        for curso_id, visitas in resultado['cursos_top']:
+            curso = cursos.get(curso_id)
+            cursos_mas_visitados.append({
+                'curso_id': curso_id,
                 # Si el curso fue eliminado, incluirlo de todas formas
-                cursos_mas_visitados.append({
-                    'curso_id': curso_id,
-                    'titulo': f'Curso #{curso_id} (eliminado)',
-                    'visitas': visitas
-                })
+                'titulo': curso.titulo if curso else f'Curso #{curso_id} (eliminado)',
+                'visitas': visitas
+            })
         
         return Response({
-            'total_eventos': eventos_mes,
-            'eventos_hoy': eventos_hoy,
-            'eventos_semana': eventos_semana,
-            'eventos_mes': eventos_mes,
-            'usuarios_activos': usuarios_activos,
-            'eventos_por_tipo': eventos_por_tipo,
+            'total_eventos': resultado['eventos_mes'],
+            'eventos_hoy': resultado['eventos_hoy'],
+            'eventos_semana': resultado['eventos_semana'],
+            'eventos_mes': resultado['eventos_mes'],
+            'usuarios_activos': resultado['usuarios_activos'],
+            'eventos_por_tipo': resultado['eventos_por_tipo'],
             'cursos_mas_visitados': cursos_mas_visitados
         })
 
@@ -180,68 +213,27 @@ class EventoUsuarioViewSet(viewsets.ViewSet):
     def estadisticas_globales(self, request):
         """Estadísticas globales de la plataforma"""
         dias = int(request.query_params.get('dias', 7))
-        fecha_desde = datetime.utcnow() - timedelta(days=dias)
-        
-        eventos = list(EventoUsuario.objects(fecha_hora__gte=fecha_desde))
-        
-        # Usuarios activos
-        usuarios_activos = len(set(e.usuario_id for e in eventos))
-        
-        # Eventos por tipo
-        eventos_por_tipo = {}
-        for evento in eventos:
-            eventos_por_tipo[evento.tipo_evento] = eventos_por_tipo.get(evento.tipo_evento, 0) + 1
+        ahora = datetime.utcnow()
+        fecha_desde = ahora - timedelta(days=dias)
         
-        # Eventos por día
-        eventos_por_dia = {}
-        for evento in eventos:
-            fecha = evento.fecha_hora.date().isoformat()
-            eventos_por_dia[fecha] = eventos_por_dia.get(fecha, 0) + 1
+        resultado = resumenes.estadisticas_periodo(fecha_desde, ahora)
         
         return Response({
             'periodo_dias': dias,
-            'total_eventos': len(eventos),
-            'usuarios_activos': usuarios_activos,
-            'eventos_por_tipo': eventos_por_tipo,
-            'eventos_por_dia': eventos_por_dia
+            'total_eventos': resultado['total_eventos'],
+            'usuarios_activos': resultado['usuarios_activos'],
+            'eventos_por_tipo': resultado['eventos_por_tipo'],
+            'eventos_por_dia': resultado['eventos_por_dia']
         })
     
     @action(detail=False, methods=['get'])
     def cursos_populares(self, request):
         """Cursos más populares por vistas"""
         dias = int(request.query_params.get('dias', 30))
-        fecha_desde = datetime.utcnow() - timedelta(days=dias)
-        
-        eventos = EventoUsuario.objects(
-            tipo_evento='curso_view',
-            fecha_hora__gte=fecha_desde
-        )
-        
-        cursos_stats = {}
-        for evento in eventos:
-            if evento.curso_id:
-                if evento.curso_id not in cursos_stats:
-                    cursos_stats[evento.curso_id] = {
-                        'curso_id': evento.curso_id,
-                        'vistas': 0,
-                        'usuarios_unicos': set()
-                    }
-                cursos_stats[evento.curso_id]['vistas'] += 1
-                cursos_stats[evento.curso_id]['usuarios_unicos'].add(evento.usuario_id)
-        
-        # Convertir a lista y ordenar
-        cursos_list = [
-            {
-                'curso_id': stats['curso_id'],
-                'vistas': stats['vistas'],
-                'usuarios_unicos': len(stats['usuarios_unicos'])
-            }
-            for stats in cursos_stats.values()
-        ]
-        
-        cursos_list.sort(key=lambda x: x['vistas'], reverse=True)
+        ahora = datetime.utcnow()
+        fecha_desde = ahora - timedelta(days=dias)
         
         return Response({
             'periodo_dias': dias,
-            'cursos': cursos_list[:10]
+            'cursos': resumenes.cursos_populares(fecha_desde, ahora, limite=10)
         })
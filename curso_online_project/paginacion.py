@@ -0,0 +1,120 @@
+"""
+Paginación por cursor (keyset) común a los listados de MongoEngine
+(notificaciones, reseñas).
+"""
+import base64
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.queryset.visitor import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class MongoCursorPagination(BasePagination):
+    """
+    Paginación por cursor para querysets de MongoEngine, en orden descendente
+    por (campo, desempate). Cada página es una sola consulta con
+    limit(n + 1) sobre el índice compuesto del orden; el total solo se
+    calcula con ?count=true.
+
+    Las subclases declaran `ordenes` = {nombre: (campo, conversión del valor
+    del cursor)}. El primero es el orden por defecto; con varios se elige con
+    ?orden=. La respuesta es {next, results} (más count con ?count=true): no
+    hay previous. Un cursor mal formado es un 400.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    orden_query_param = 'orden'
+    invalid_cursor_message = 'Cursor inválido'
+
+    ordenes = {}
+    # Campo único que desempata los valores iguales del orden y su conversión
+    desempate = ('id', ObjectId)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.orden = self.get_orden(request)
+        self.campo = self.ordenes[self.orden][0]
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = queryset.count()
+
+        desempate = self.desempate[0]
+        queryset = queryset.order_by(f'-{self.campo}', f'-{desempate}')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            valor, ultimo = cursor
+            queryset = queryset.filter(
+                Q(**{f'{self.campo}__lt': valor}) | Q(**{self.campo: valor, f'{desempate}__lt': ultimo})
+            )
+
+        documentos = list(queryset.limit(self.page_size + 1))
+        self.has_next = len(documentos) > self.page_size
+        pagina = documentos[:self.page_size]
+        self.next_cursor = self.encode_cursor(pagina[-1]) if self.has_next else None
+        return pagina
+
+    def get_orden(self, request):
+        por_defecto = next(iter(self.ordenes))
+        if len(self.ordenes) == 1:
+            return por_defecto
+        orden = request.query_params.get(self.orden_query_param, por_defecto)
+        if orden not in self.ordenes:
+            raise ValidationError({self.orden_query_param: f'Debe ser uno de: {", ".join(self.ordenes)}'})
+        return orden
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(tamano, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        valor = request.query_params.get(self.cursor_query_param)
+        if not valor:
+            return None
+        convertir = self.ordenes[self.orden][1]
+        try:
+            clave, ultimo = base64.urlsafe_b64decode(valor.encode('ascii')).decode('ascii').split('|')
+            return convertir(clave), self.desempate[1](ultimo)
+        except (ValueError, TypeError, UnicodeError, InvalidId):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+    def encode_cursor(self, documento):
+        clave = getattr(documento, self.campo)
+        if isinstance(clave, datetime):
+            clave = clave.isoformat()
+        valor = f'{clave}|{getattr(documento, self.desempate[0])}'
+        return base64.urlsafe_b64encode(valor.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, self.count_query_param), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        respuesta = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            respuesta = {'count': self.count, **respuesta}
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,52 @@
+"""
+Base para tests que leen o escriben documentos de MongoEngine.
+
+Conecta el alias 'default' a una base en memoria de mongomock durante la
+clase de test y vuelve a la conexión de settings al terminar. Sin mongomock
+instalado los tests se saltan.
+"""
+import unittest
+import mongoengine
+from django.conf import settings
+from mongoengine.base.common import _document_registry
+from mongoengine.connection import disconnect, get_db
+
+try:
+    import mongomock
+except ImportError:  # pragma: no cover
+    mongomock = None
+
+
+def _reiniciar_colecciones():
+    """Olvida las colecciones cacheadas por cada Document al cambiar de conexión"""
+    for documento in _document_registry.values():
+        if not documento._meta.get('abstract'):
+            documento._collection = None
+
+
+class MongoMockMixin:
+    """Mixin para TestCase/SimpleTestCase con MongoDB en memoria"""
+
+    @classmethod
+    def setUpClass(cls):
+        if mongomock is None:
+            raise unittest.SkipTest('mongomock no está instalado')
+        disconnect('default')
+        mongoengine.connect(db='pruebas', alias='default', mongo_client_class=mongomock.MongoClient)
+        _reiniciar_colecciones()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        disconnect('default')
+        mongoengine.connect(db=settings.MONGO_DB, host=settings.MONGO_URI, alias='default')
+        _reiniciar_colecciones()
+
+    def setUp(self):
+        super().setUp()
+        db = get_db('default')
+        for nombre in db.list_collection_names():
+            db.drop_collection(nombre)
+        # Los índices se vuelven a crear en el primer acceso de cada Document
+        _reiniciar_colecciones()
@@ -87,6 +87,13 @@ ASGI_APPLICATION = 'curso_online_project.asgi.application'
 # Para desarrollo sin Redis, usar InMemoryChannelLayer
 # Para producción con Redis, cambiar a RedisChannelLayer
 USE_REDIS = os.getenv('USE_REDIS', 'False').lower() == 'true'
+# Varios Redis: REDIS_HOSTS="redis://r1:6379,redis://r2:6379". channels_redis asigna
+# cada grupo (notificaciones_user_{id}) a un host por hash consistente de su nombre.
+# Sin REDIS_HOSTS se usa un único host REDIS_HOST:REDIS_PORT.
+REDIS_HOSTS = [host.strip() for host in os.getenv('REDIS_HOSTS', '').split(',') if host.strip()]
+# Sin Redis: con CHANNEL_LAYER_SHARDS > 1 los grupos se reparten con el mismo hash
+# entre varias capas en memoria (notificaciones/layers.py), para desarrollo y pruebas
+CHANNEL_LAYER_SHARDS = int(os.getenv('CHANNEL_LAYER_SHARDS', 1))
 
 if USE_REDIS:
     # Configuración con Redis (producción)
@@ -94,7 +101,16 @@ if USE_REDIS:
         'default': {
             'BACKEND': 'channels_redis.core.RedisChannelLayer',
             'CONFIG': {
-                "hosts": [(os.getenv('REDIS_HOST', '127.0.0.1'), int(os.getenv('REDIS_PORT', 6379)))],
+                "hosts": REDIS_HOSTS or [(os.getenv('REDIS_HOST', '127.0.0.1'), int(os.getenv('REDIS_PORT', 6379)))],
+            },
+        },
+    }
+elif CHANNEL_LAYER_SHARDS > 1:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'notificaciones.layers.ShardedInMemoryChannelLayer',
+            'CONFIG': {
+                'shards': CHANNEL_LAYER_SHARDS,
             },
         },
     }
@@ -326,6 +342,93 @@ LOGGING = {
     },
 }
 
+# ============================================
+# CACHE CONFIGURATION
+# ============================================
+# Por defecto caché en memoria local (por proceso).
+# Con varios workers usar Redis para que la invalidación sea compartida.
+USE_REDIS_CACHE = os.getenv('USE_REDIS_CACHE', 'False').lower() == 'true'
+
+if USE_REDIS_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv(
+                'REDIS_CACHE_URL',
+                f"redis://{os.getenv('REDIS_HOST', '127.0.0.1')}:{os.getenv('REDIS_PORT', 6379)}/1"
+            ),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cursos-online',
+        },
+    }
+
+# Caché del catálogo público de cursos (respuestas anónimas de list/retrieve)
+CATALOGO_CACHE_ALIAS = os.getenv('CATALOGO_CACHE_ALIAS', 'default')
+CATALOGO_CACHE_TIMEOUT = int(os.getenv('CATALOGO_CACHE_TIMEOUT', 300))  # segundos
+
+# Contador de notificaciones no leídas por usuario (se reconcilia con MongoDB al caducar)
+NOTIFICACIONES_CONTADOR_TIMEOUT = int(os.getenv('NOTIFICACIONES_CONTADOR_TIMEOUT', 86400))  # segundos
+
+# Instantánea de las estadísticas globales (0 = calcular en cada petición).
+# Refrescar periódicamente con: python manage.py refrescar_estadisticas_globales
+ESTADISTICAS_GLOBALES_CACHE_TIMEOUT = int(os.getenv('ESTADISTICAS_GLOBALES_CACHE_TIMEOUT', 0))
+
+# ============================================
+# ANALYTICS
+# ============================================
+# Máximo de eventos aceptados por petición en POST /api/analytics/eventos/lote/
+ANALYTICS_LOTE_MAXIMO = int(os.getenv('ANALYTICS_LOTE_MAXIMO', 500))
+
+# Escritura en segundo plano de los eventos individuales (analytics/buffer.py)
+ANALYTICS_BUFFER_ACTIVO = os.getenv('ANALYTICS_BUFFER_ACTIVO', 'False').lower() == 'true'
+ANALYTICS_BUFFER_CAPACIDAD = int(os.getenv('ANALYTICS_BUFFER_CAPACIDAD', 10000))  # eventos en cola
+ANALYTICS_BUFFER_LOTE = int(os.getenv('ANALYTICS_BUFFER_LOTE', 500))  # eventos por insert_many
+ANALYTICS_BUFFER_INTERVALO = float(os.getenv('ANALYTICS_BUFFER_INTERVALO', 1.0))  # segundos
+ANALYTICS_BUFFER_ESPERA = float(os.getenv('ANALYTICS_BUFFER_ESPERA', 0.005))  # segundos con la cola llena
+
+# Almacenamiento de eventos_usuario. Tras cambiar estos valores ejecutar
+# `python manage.py optimizar_eventos_usuario` antes de arrancar los workers.
+# - TIMESERIES: usar la colección de series temporales eventos_usuario_ts (MongoDB >= 6.0)
+# - TTL_DIAS: días de retención de los eventos crudos (0 = sin caducidad)
+ANALYTICS_EVENTOS_TIMESERIES = os.getenv('ANALYTICS_EVENTOS_TIMESERIES', 'False').lower() == 'true'
+ANALYTICS_EVENTOS_TTL_DIAS = int(os.getenv('ANALYTICS_EVENTOS_TTL_DIAS', 0))
+
+# ============================================
+# NOTIFICACIONES: DISPATCHER EN SEGUNDO PLANO
+# ============================================
+# Backend de notificaciones/dispatcher: HilosBackend (pool de hilos en el proceso)
+# o SincronoBackend (ejecución inmediata, útil en desarrollo)
+NOTIFICACIONES_DISPATCHER_BACKEND = os.getenv(
+    'NOTIFICACIONES_DISPATCHER_BACKEND',
+    'notificaciones.dispatcher.backends.HilosBackend'
+)
+NOTIFICACIONES_DISPATCHER_WORKERS = int(os.getenv('NOTIFICACIONES_DISPATCHER_WORKERS', 4))
+NOTIFICACIONES_DISPATCHER_CAPACIDAD = int(os.getenv('NOTIFICACIONES_DISPATCHER_CAPACIDAD', 10000))
+NOTIFICACIONES_DISPATCHER_REINTENTOS = int(os.getenv('NOTIFICACIONES_DISPATCHER_REINTENTOS', 3))
+NOTIFICACIONES_DISPATCHER_ESPERA_REINTENTO = float(os.getenv('NOTIFICACIONES_DISPATCHER_ESPERA_REINTENTO', 2.0))  # segundos, se duplica en cada intento
+# Notificaciones por insert_many / envío agrupado en los fan-out masivos (curso_actualizado)
+NOTIFICACIONES_FANOUT_LOTE = int(os.getenv('NOTIFICACIONES_FANOUT_LOTE', 500))
+# Ventana en segundos en la que varias ediciones de un curso generan una sola
+# notificación curso_actualizado (0 = notificar cada edición). Con varios
+# procesos requiere una caché compartida (USE_REDIS_CACHE).
+NOTIFICACIONES_CURSO_VENTANA = int(os.getenv('NOTIFICACIONES_CURSO_VENTANA', 600))
+# Ofrecer el subprotocolo WebSocket 'msgpack' (frames binarios) además de JSON
+NOTIFICACIONES_WS_MSGPACK = os.getenv('NOTIFICACIONES_WS_MSGPACK', 'False').lower() == 'true'
+# Reenvío al reconectar con ?since=: notificaciones por consulta y máximo por conexión
+NOTIFICACIONES_WS_REENVIO_LOTE = int(os.getenv('NOTIFICACIONES_WS_REENVIO_LOTE', 100))
+NOTIFICACIONES_WS_REENVIO_MAXIMO = int(os.getenv('NOTIFICACIONES_WS_REENVIO_MAXIMO', 500))
+# Registro de conexiones abiertas por usuario (notificaciones/presencia.py): los
+# envíos omiten a los usuarios sin socket. Desactivado por defecto: requiere una
+# caché compartida entre procesos y clientes que envíen 'ping' con un intervalo
+# menor que el TTL (los que no lo hagan dejarían de recibir en tiempo real).
+NOTIFICACIONES_PRESENCIA = os.getenv('NOTIFICACIONES_PRESENCIA', 'False').lower() == 'true'
+NOTIFICACIONES_PRESENCIA_TTL = int(os.getenv('NOTIFICACIONES_PRESENCIA_TTL', 300))  # segundos sin ping
+
 # ============================================
 # FILE UPLOAD CONFIGURATION
 # ============================================
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CursosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cursos'
+
+    def ready(self):
+        # Importar signals para registrarlos
+        from cursos.signals import (
+            cache_signals,
+            estadisticas_signals
+        )
@@ -0,0 +1,77 @@
+"""
+Caché de lectura del catálogo público de cursos.
+
+Las claves llevan un contador de versión: el del catálogo para el listado y
+el de cada curso para el detalle. Las señales de cursos.signals incrementan
+esos contadores al guardar o eliminar Curso, Modulo, Seccion o Inscripcion,
+así las entradas antiguas dejan de leerse y expiran solas.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+CLAVE_VERSION_CATALOGO = 'catalogo:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOGO_CACHE_ALIAS', 'default')]
+
+
+def _clave_version_curso(curso_id):
+    return f'catalogo:curso:{curso_id}:version'
+
+
+def _version_inicial():
+    # Basada en el reloj para no reutilizar una versión si la clave fue desalojada
+    return int(time.time() * 1000)
+
+
+def _obtener_version(clave):
+    cache = _cache()
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _version_inicial(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def _incrementar_version(clave):
+    cache = _cache()
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La clave no existía: cualquier versión nueva invalida lo anterior
+        cache.set(clave, _version_inicial(), timeout=None)
+
+
+def _huella_parametros(query_params):
+    """Huella estable de los query params (el orden no importa)"""
+    items = sorted((clave, valor) for clave in query_params for valor in query_params.getlist(clave))
+    return hashlib.md5(repr(items).encode('utf-8')).hexdigest()
+
+
+def clave_listado(query_params):
+    version = _obtener_version(CLAVE_VERSION_CATALOGO)
+    return f'catalogo:lista:{version}:{_huella_parametros(query_params)}'
+
+
+def clave_detalle(curso_id, query_params):
+    version = _obtener_version(_clave_version_curso(curso_id))
+    return f'catalogo:detalle:{curso_id}:{version}:{_huella_parametros(query_params)}'
+
+
+def obtener(clave):
+    return _cache().get(clave)
+
+
+def guardar(clave, datos):
+    _cache().set(clave, datos, timeout=getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 300))
+
+
+def invalidar_curso(curso_id):
+    """Invalida el detalle del curso y el listado del catálogo"""
+    if curso_id is not None:
+        _incrementar_version(_clave_version_curso(curso_id))
+    _incrementar_version(CLAVE_VERSION_CATALOGO)
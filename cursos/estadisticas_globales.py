@@ -0,0 +1,107 @@
+"""
+Estadísticas globales de la plataforma (panel de administración).
+
+Se calculan con agregados SQL agrupados (un número fijo de consultas sin
+importar cuántos cursos haya) y opcionalmente se guardan como instantánea en
+caché. La instantánea se refresca con `python manage.py refrescar_estadisticas_globales`
+(p. ej. desde cron) o con ?refrescar=true en el endpoint.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+CLAVE_CACHE = 'estadisticas_globales:instantanea'
+
+User = get_user_model()
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOGO_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'ESTADISTICAS_GLOBALES_CACHE_TIMEOUT', 0)
+
+
+def _nombre_instructor(instructor):
+    if instructor is None:
+        return None
+    return instructor.get_full_name() if instructor.first_name else instructor.username
+
+
+def calcular():
+    from cursos.models import Curso
+    from inscripciones.models import Inscripcion
+
+    ahora = timezone.now()
+    hace_un_mes = ahora - timedelta(days=30)
+
+    # Cursos
+    cursos = Curso.objects.aggregate(
+        total=Count('pk'),
+        activos=Count('pk', filter=Q(activo=True)),
+    )
+
+    # Usuarios agrupados por perfil
+    usuarios_por_perfil = {
+        fila['perfil']: fila
+        for fila in User.objects.order_by().values('perfil').annotate(
+            total=Count('pk'),
+            nuevos_mes=Count('pk', filter=Q(date_joined__gte=hace_un_mes)),
+        )
+    }
+    estudiantes = usuarios_por_perfil.get('estudiante', {})
+    instructores = usuarios_por_perfil.get('instructor', {})
+
+    # Inscripciones e ingresos (precio del curso por cada inscripción)
+    inscripciones = Inscripcion.objects.aggregate(
+        total=Count('pk'),
+        ingresos=Sum(F('curso__precio')),
+    )
+
+    # Cursos más populares (por número de inscripciones)
+    cursos_populares = Curso.objects.select_related('instructor').annotate(
+        num_inscripciones=Count('inscripciones')
+    ).order_by('-num_inscripciones')[:5]
+
+    return {
+        'total_cursos': cursos['total'],
+        'cursos_activos': cursos['activos'],
+        'total_estudiantes': estudiantes.get('total', 0),
+        'total_instructores': instructores.get('total', 0),
+        'nuevos_estudiantes_mes': estudiantes.get('nuevos_mes', 0),
+        'total_inscripciones': inscripciones['total'],
+        'cursos_populares': [
+            {
+                'id': curso.id,
+                'titulo': curso.titulo,
+                'instructor': _nombre_instructor(curso.instructor),
+                'num_inscripciones': curso.num_inscripciones,
+                'imagen': curso.imagen.url if curso.imagen else None
+            }
+            for curso in cursos_populares
+        ],
+        'ingresos_totales': float(inscripciones['ingresos'] or 0),
+        'fecha_calculo': ahora.isoformat(),
+    }
+
+
+def refrescar():
+    """Recalcula las estadísticas y, si la instantánea está activa, la guarda"""
+    datos = calcular()
+    if _timeout():
+        _cache().set(CLAVE_CACHE, datos, timeout=_timeout())
+    return datos
+
+
+def obtener(forzar=False):
+    """Devuelve la instantánea en caché o la calcula si no existe (o está desactivada)"""
+    if _timeout() and not forzar:
+        datos = _cache().get(CLAVE_CACHE)
+        if datos is not None:
+            return datos
+    return refrescar()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from cursos.models import Curso, CursoEstadisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero la tabla de estadísticas materializadas de los cursos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'curso_ids',
+            nargs='*',
+            type=int,
+            help='IDs de los cursos a recalcular (por defecto, todos)'
+        )
+
+    def handle(self, *args, **options):
+        cursos = Curso.objects.all().order_by('pk')
+        if options['curso_ids']:
+            cursos = cursos.filter(pk__in=options['curso_ids'])
+
+        total = 0
+        for curso in cursos.iterator():
+            CursoEstadisticas.recalcular(curso)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Estadísticas recalculadas para {total} curso(s)'))
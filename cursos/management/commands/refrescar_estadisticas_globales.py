@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from cursos import estadisticas_globales
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la instantánea en caché de las estadísticas globales (para ejecutar desde cron)'
+
+    def handle(self, *args, **options):
+        datos = estadisticas_globales.refrescar()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Estadísticas globales recalculadas ({datos['total_cursos']} cursos, "
+            f"{datos['total_inscripciones']} inscripciones)"
+        ))
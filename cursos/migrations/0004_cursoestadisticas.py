@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0003_alter_curso_instructor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CursoEstadisticas',
+            fields=[
+                ('curso', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to='cursos.curso')),
+                ('total_estudiantes', models.IntegerField(default=0)),
+                ('estudiantes_completados', models.IntegerField(default=0)),
+                ('estudiantes_activos', models.IntegerField(default=0)),
+                ('suma_progreso', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_resenas', models.IntegerField(default=0)),
+                ('suma_ratings', models.FloatField(default=0)),
+                ('ratings_1', models.IntegerField(default=0)),
+                ('ratings_2', models.IntegerField(default=0)),
+                ('ratings_3', models.IntegerField(default=0)),
+                ('ratings_4', models.IntegerField(default=0)),
+                ('ratings_5', models.IntegerField(default=0)),
+                ('actividad_horaria', models.JSONField(blank=True, default=dict)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de curso',
+                'verbose_name_plural': 'Estadísticas de cursos',
+                'db_table': 'cursos_estadisticas',
+            },
+        ),
+    ]
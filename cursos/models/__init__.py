@@ -1,3 +1,4 @@
 from .curso import Curso
+from .estadisticas import CursoEstadisticas
 
-__all__ = ['Curso']
\ No newline at end of file
+__all__ = ['Curso', 'CursoEstadisticas']
\ No newline at end of file
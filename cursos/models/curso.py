@@ -1,10 +1,69 @@
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from model_utils import FieldTracker
 
 User = get_user_model()
 
 
+def _subconsulta_total(queryset, campo_curso, agregado):
+    """Agregado correlacionado por curso como subconsulta escalar (0 si no hay filas)"""
+    valores = (
+        queryset.filter(**{campo_curso: OuterRef('pk')})
+        .order_by()
+        .values(campo_curso)
+        .annotate(total=agregado)
+        .values('total')
+    )
+    return Coalesce(Subquery(valores, output_field=IntegerField()), 0)
+
+
+class CursoQuerySet(models.QuerySet):
+
+    def con_totales(self):
+        """
+        Anota total_modulos, total_secciones, duracion_total y total_estudiantes
+        en una sola consulta SQL e incluye el instructor con select_related.
+        Se usan subconsultas en lugar de JOINs para no multiplicar filas.
+        """
+        from modulos.models import Modulo
+        from secciones.models import Seccion
+        from inscripciones.models import Inscripcion
+
+        secciones = Seccion.objects.all()
+        return self.select_related('instructor').annotate(
+            total_modulos=_subconsulta_total(Modulo.objects.all(), 'curso', Count('pk')),
+            total_secciones=_subconsulta_total(secciones, 'modulo__curso', Count('pk')),
+            duracion_total=_subconsulta_total(secciones, 'modulo__curso', Sum('duracion_minutos')),
+            total_estudiantes=_subconsulta_total(Inscripcion.objects.all(), 'curso', Count('pk')),
+        )
+
+    def con_arbol(self, usuario=None):
+        """
+        Precarga el árbol curso → módulos → secciones (más la inscripción del
+        usuario, si está autenticado) en un número fijo de consultas, para que
+        CursoDetalladoSerializer calcule todos los totales en Python.
+        """
+        from modulos.models import Modulo
+        from inscripciones.models import Inscripcion
+
+        prefetches = [
+            Prefetch('modulos', queryset=Modulo.objects.prefetch_related('secciones')),
+        ]
+        if usuario is not None and usuario.is_authenticated:
+            prefetches.append(Prefetch(
+                'inscripciones',
+                queryset=Inscripcion.objects.filter(usuario=usuario),
+                to_attr='inscripciones_usuario'
+            ))
+
+        return self.select_related('instructor').annotate(
+            total_estudiantes=_subconsulta_total(Inscripcion.objects.all(), 'curso', Count('pk')),
+        ).prefetch_related(*prefetches)
+
+
 class Curso(models.Model):
 
     NIVEL_CHOICES = [
@@ -41,6 +100,15 @@ class Curso(models.Model):
     imagen = models.ImageField(upload_to='cursos/', blank=True, null=True)
     activo = models.BooleanField(default=True)
     
+    # Campos cuyo cambio se notifica a los estudiantes inscritos
+    # (activo, precio o instructor no generan notificación)
+    CAMPOS_CONTENIDO = ['titulo', 'descripcion', 'categoria', 'nivel', 'imagen']
+    
+    # Field tracker para detectar cambios de contenido
+    tracker = FieldTracker(fields=CAMPOS_CONTENIDO)
+    
+    objects = CursoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Curso'
         verbose_name_plural = 'Cursos'
@@ -0,0 +1,254 @@
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from .curso import Curso
+
+
+# Ventana de las estadísticas semanales y horas que se conservan en actividad_horaria
+VENTANA_SEMANAL = timedelta(days=7)
+RETENCION_ACTIVIDAD = timedelta(days=8)
+
+
+def _clave_hora(fecha):
+    """Clave 'YYYY-MM-DDTHH' en UTC (las fechas naive se asumen UTC, como en MongoDB)"""
+    if timezone.is_aware(fecha):
+        fecha = fecha.astimezone(dt_timezone.utc)
+    return fecha.strftime('%Y-%m-%dT%H')
+
+
+class _CambiosEstadisticas:
+    """
+    Contribución de inscripciones y reseñas a las estadísticas. La aplican
+    tanto la fila (reconstrucción completa) como DeltasEstadisticas
+    (actualización incremental), que definen _sumar(campo, valor) y
+    _sumar_actividad(fecha, campo, signo). No es una clase abstracta porque
+    CursoEstadisticas también hereda de models.Model (su metaclase no es
+    compatible con ABCMeta).
+    """
+
+    def _aplicar_inscripcion(self, progreso, completado, fecha_inscripcion, fecha_completado, signo):
+        """Suma (signo=1) o resta (signo=-1) la contribución de una inscripción"""
+        progreso = Decimal(str(progreso))
+        self._sumar('total_estudiantes', signo)
+        self._sumar('suma_progreso', signo * progreso)
+        if completado:
+            self._sumar('estudiantes_completados', signo)
+            self._sumar_actividad(fecha_completado, 'completados', signo)
+        if 0 < progreso < 100:
+            self._sumar('estudiantes_activos', signo)
+        self._sumar_actividad(fecha_inscripcion, 'inscripciones', signo)
+
+    def _aplicar_resena(self, rating, fecha_creacion, signo):
+        """Suma (signo=1) o resta (signo=-1) la contribución de una reseña"""
+        self._sumar('total_resenas', signo)
+        self._sumar('suma_ratings', signo * rating)
+        self._sumar(f'ratings_{min(max(int(rating), 1), 5)}', signo)
+        self._sumar_actividad(fecha_creacion, 'resenas', signo)
+
+    def _cambiar_rating(self, rating_anterior, rating_nuevo):
+        self._sumar('suma_ratings', rating_nuevo - rating_anterior)
+        self._sumar(f'ratings_{min(max(int(rating_anterior), 1), 5)}', -1)
+        self._sumar(f'ratings_{min(max(int(rating_nuevo), 1), 5)}', 1)
+
+
+class DeltasEstadisticas(_CambiosEstadisticas):
+    """Cambios acumulados para una fila: incrementos por campo y por hora"""
+
+    def __init__(self):
+        self.campos = {}
+        self.actividad = {}
+
+    def _sumar(self, campo, valor):
+        self.campos[campo] = self.campos.get(campo, 0) + valor
+
+    def _sumar_actividad(self, fecha, campo, signo):
+        if fecha is None:
+            return
+        contadores = self.actividad.setdefault(_clave_hora(fecha), {})
+        contadores[campo] = contadores.get(campo, 0) + signo
+
+    def campos_con_cambios(self):
+        return {campo: valor for campo, valor in self.campos.items() if valor}
+
+    def actividad_con_cambios(self):
+        return {
+            hora: {campo: valor for campo, valor in contadores.items() if valor}
+            for hora, contadores in self.actividad.items()
+            if any(contadores.values())
+        }
+
+
+class CursoEstadisticas(_CambiosEstadisticas, models.Model):
+    """
+    Resumen materializado de las estadísticas de un curso.
+    Se mantiene incrementalmente desde las señales de inscripciones y reseñas
+    (cursos/signals/estadisticas_signals.py) y se reconstruye con
+    `python manage.py recalcular_estadisticas_cursos`.
+    """
+    curso = models.OneToOneField(
+        Curso,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estadisticas'
+    )
+
+    # Inscripciones
+    total_estudiantes = models.IntegerField(default=0)
+    estudiantes_completados = models.IntegerField(default=0)
+    estudiantes_activos = models.IntegerField(default=0)
+    suma_progreso = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Reseñas (MongoDB)
+    total_resenas = models.IntegerField(default=0)
+    suma_ratings = models.FloatField(default=0)
+    ratings_1 = models.IntegerField(default=0)
+    ratings_2 = models.IntegerField(default=0)
+    ratings_3 = models.IntegerField(default=0)
+    ratings_4 = models.IntegerField(default=0)
+    ratings_5 = models.IntegerField(default=0)
+
+    # Contadores por hora (UTC) para las métricas de la última semana:
+    # {'2025-01-31T14': {'inscripciones': 2, 'completados': 1, 'resenas': 0}}
+    actividad_horaria = models.JSONField(default=dict, blank=True)
+
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estadísticas de curso'
+        verbose_name_plural = 'Estadísticas de cursos'
+        db_table = 'cursos_estadisticas'
+
+    def __str__(self):
+        return f"Estadísticas de {self.curso_id}"
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def obtener(cls, curso):
+        """Lectura por clave primaria; si la fila no existe se reconstruye"""
+        try:
+            return cls.objects.get(pk=curso.pk)
+        except cls.DoesNotExist:
+            return cls.recalcular(curso)
+
+    def actividad_semana(self, campo, ahora=None):
+        desde = _clave_hora((ahora or timezone.now()) - VENTANA_SEMANAL)
+        return sum(
+            contadores.get(campo, 0)
+            for hora, contadores in self.actividad_horaria.items()
+            if hora >= desde
+        )
+
+    def resumen_resenas(self):
+        """Widget de rating del curso (GET /api/resenas/estadisticas_curso/)"""
+        return {
+            'total_resenas': self.total_resenas,
+            'rating_promedio': round(self.suma_ratings / self.total_resenas, 2) if self.total_resenas else 0,
+            'distribucion': {
+                str(estrella): getattr(self, f'ratings_{estrella}') for estrella in (5, 4, 3, 2, 1)
+            },
+        }
+
+    def como_dict(self, precio):
+        total = self.total_estudiantes
+        resenas = self.resumen_resenas()
+        return {
+            'total_estudiantes': total,
+            'estudiantes_activos': self.estudiantes_activos,
+            'estudiantes_completados': self.estudiantes_completados,
+            'promedio_progreso': round(float(self.suma_progreso) / total, 2) if total else 0,
+            'rating_promedio': resenas['rating_promedio'],
+            'total_resenas': resenas['total_resenas'],
+            'distribucion_ratings': resenas['distribucion'],
+            'nuevos_estudiantes_semana': self.actividad_semana('inscripciones'),
+            'nuevas_resenas_semana': self.actividad_semana('resenas'),
+            'completados_semana': self.actividad_semana('completados'),
+            'ingresos_totales': float(precio * total),
+        }
+
+    # ------------------------------------------------------------------
+    # Reconstrucción completa
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def recalcular(cls, curso):
+        """Recalcula la fila desde cero a partir de inscripciones y reseñas"""
+        from inscripciones.models import Inscripcion
+        from resenas.models import Resena
+
+        estadisticas = cls(curso=curso)
+
+        inscripciones = Inscripcion.objects.filter(curso=curso).values_list(
+            'progreso', 'completado', 'fecha_inscripcion', 'fecha_completado'
+        )
+        for progreso, completado, fecha_inscripcion, fecha_completado in inscripciones.iterator():
+            estadisticas._aplicar_inscripcion(progreso, completado, fecha_inscripcion, fecha_completado, 1)
+
+        for rating, fecha_creacion in Resena.objects(curso_id=curso.pk).scalar('rating', 'fecha_creacion'):
+            estadisticas._aplicar_resena(rating, fecha_creacion, 1)
+
+        estadisticas._podar_actividad()
+        estadisticas.save()
+        return estadisticas
+
+    # ------------------------------------------------------------------
+    # Actualización incremental
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def actualizar(cls, curso_id, funcion):
+        """
+        Aplica `funcion(deltas)` a la fila del curso. Los contadores se
+        actualizan con UPDATE campo = campo + delta, sin bloquear la fila;
+        solo si cambia actividad_horaria (altas, finalizaciones, reseñas) se
+        bloquea la fila para reescribir el JSON. Si la fila aún no existe no
+        se hace nada: se construirá completa en la primera lectura (obtener)
+        o con el comando de reconstrucción.
+        """
+        if curso_id is None:
+            return
+        deltas = DeltasEstadisticas()
+        funcion(deltas)
+
+        campos = deltas.campos_con_cambios()
+        if campos:
+            cls.objects.filter(pk=curso_id).update(
+                fecha_actualizacion=timezone.now(),
+                **{campo: F(campo) + valor for campo, valor in campos.items()}
+            )
+
+        actividad = deltas.actividad_con_cambios()
+        if actividad:
+            with transaction.atomic():
+                estadisticas = cls.objects.select_for_update().only('actividad_horaria').filter(pk=curso_id).first()
+                if estadisticas is None:
+                    return
+                for hora, contadores in actividad.items():
+                    for campo, valor in contadores.items():
+                        estadisticas._sumar_actividad_hora(hora, campo, valor)
+                estadisticas._podar_actividad()
+                estadisticas.save(update_fields=['actividad_horaria'])
+
+    def _sumar(self, campo, valor):
+        setattr(self, campo, getattr(self, campo) + valor)
+
+    def _sumar_actividad(self, fecha, campo, signo):
+        if fecha is None:
+            return
+        self._sumar_actividad_hora(_clave_hora(fecha), campo, signo)
+
+    def _sumar_actividad_hora(self, clave, campo, signo):
+        contadores = self.actividad_horaria.setdefault(clave, {})
+        contadores[campo] = contadores.get(campo, 0) + signo
+
+    def _podar_actividad(self, ahora=None):
+        limite = _clave_hora((ahora or timezone.now()) - RETENCION_ACTIVIDAD)
+        self.actividad_horaria = {
+            hora: contadores
+            for hora, contadores in self.actividad_horaria.items()
+            if hora >= limite and any(contadores.values())
+        }
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import prefetch_related_objects
 from ..models import Curso
 from users.serializers import UsuarioPublicSerializer
 from secciones.models import Seccion
@@ -34,18 +35,29 @@ class CursoSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Usuario no encontrado")
         return value
     
+    # Los totales se leen de las anotaciones de Curso.objects.con_totales();
+    # si el objeto no viene anotado se calculan con una consulta por campo.
+    
     def get_total_modulos(self, obj):
+        if hasattr(obj, 'total_modulos'):
+            return obj.total_modulos
         return obj.modulos.count()
     
     def get_total_secciones(self, obj):
+        if hasattr(obj, 'total_secciones'):
+            return obj.total_secciones
         return Seccion.objects.filter(modulo__curso=obj).count()
     
     def get_duracion_total(self, obj):
+        if hasattr(obj, 'duracion_total'):
+            return obj.duracion_total
         return Seccion.objects.filter(modulo__curso=obj).aggregate(
             total=models.Sum('duracion_minutos')
         )['total'] or 0
     
     def get_total_estudiantes(self, obj):
+        if hasattr(obj, 'total_estudiantes'):
+            return obj.total_estudiantes
         return obj.inscripciones.count()
     
     def create(self, validated_data):
@@ -70,37 +82,50 @@ class CursoDetalladoSerializer(serializers.ModelSerializer):
                  'modulos', 'inscripcion_usuario', 'total_modulos', 'total_secciones', 
                  'duracion_total', 'total_estudiantes')
     
+    def _modulos(self, obj):
+        """Módulos con sus secciones; si no vienen precargados se cargan una sola vez"""
+        prefetch_related_objects([obj], 'modulos__secciones')
+        return obj.modulos.all()
+    
     def get_modulos(self, obj):
         from modulos.serializers import ModuloDetalladoSerializer
-        return ModuloDetalladoSerializer(obj.modulos.all(), many=True).data
+        return ModuloDetalladoSerializer(self._modulos(obj), many=True).data
     
     def get_inscripcion_usuario(self, obj):
         from inscripciones.models import Inscripcion
         
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                inscripcion = Inscripcion.objects.get(usuario=request.user, curso=obj)
-                return {
-                    'inscrito': True,
-                    'progreso': inscripcion.progreso,
-                    'completado': inscripcion.completado,
-                    'fecha_inscripcion': inscripcion.fecha_inscripcion
-                }
-            except Inscripcion.DoesNotExist:
+            if hasattr(obj, 'inscripciones_usuario'):
+                # Precargada por Curso.objects.con_arbol()
+                inscripcion = obj.inscripciones_usuario[0] if obj.inscripciones_usuario else None
+            else:
+                inscripcion = Inscripcion.objects.filter(usuario=request.user, curso=obj).first()
+            
+            if inscripcion is None:
                 return {'inscrito': False}
+            return {
+                'inscrito': True,
+                'progreso': inscripcion.progreso,
+                'completado': inscripcion.completado,
+                'fecha_inscripcion': inscripcion.fecha_inscripcion
+            }
         return None
     
     def get_total_modulos(self, obj):
-        return obj.modulos.count()
+        return len(self._modulos(obj))
     
     def get_total_secciones(self, obj):
-        return Seccion.objects.filter(modulo__curso=obj).count()
+        return sum(len(modulo.secciones.all()) for modulo in self._modulos(obj))
     
     def get_duracion_total(self, obj):
-        return Seccion.objects.filter(modulo__curso=obj).aggregate(
-            total=models.Sum('duracion_minutos')
-        )['total'] or 0
+        return sum(
+            seccion.duracion_minutos
+            for modulo in self._modulos(obj)
+            for seccion in modulo.secciones.all()
+        )
     
     def get_total_estudiantes(self, obj):
-        return obj.inscripciones.count()
\ No newline at end of file
+        if hasattr(obj, 'total_estudiantes'):
+            return obj.total_estudiantes
+        return obj.inscripciones.count()
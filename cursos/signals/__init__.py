@@ -0,0 +1,3 @@
+# Este módulo importa todos los handlers para registrarlos automáticamente
+from .cache_signals import *
+from .estadisticas_signals import *
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from cursos.models import Curso
+from cursos import cache as catalogo_cache
+from modulos.models import Modulo
+from secciones.models import Seccion
+from inscripciones.models import Inscripcion
+
+
+@receiver([post_save, post_delete], sender=Curso)
+def invalidar_cache_curso(sender, instance, **kwargs):
+    """Invalida el catálogo al crear, editar, activar/desactivar o eliminar un curso"""
+    catalogo_cache.invalidar_curso(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Modulo)
+@receiver(post_delete, sender=Inscripcion)
+def invalidar_cache_por_curso_relacionado(sender, instance, **kwargs):
+    """Módulos e inscripciones cambian los totales del curso al que pertenecen"""
+    catalogo_cache.invalidar_curso(instance.curso_id)
+
+
+@receiver(post_save, sender=Inscripcion)
+def invalidar_cache_inscripcion(sender, instance, created, **kwargs):
+    """
+    Solo altas y cambios de curso alteran el total de estudiantes; el
+    progreso de cada estudiante no aparece en el catálogo.
+    """
+    if created:
+        catalogo_cache.invalidar_curso(instance.curso_id)
+    elif instance.tracker.has_changed('curso'):
+        catalogo_cache.invalidar_curso(instance.tracker.previous('curso'))
+        catalogo_cache.invalidar_curso(instance.curso_id)
+
+
+@receiver([post_save, post_delete], sender=Seccion)
+def invalidar_cache_seccion(sender, instance, **kwargs):
+    """Las secciones cambian el árbol y la duración total de su curso"""
+    curso_id = Modulo.objects.filter(pk=instance.modulo_id).values_list('curso_id', flat=True).first()
+    catalogo_cache.invalidar_curso(curso_id)
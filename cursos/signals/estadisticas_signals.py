@@ -0,0 +1,94 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from mongoengine import signals as mongo_signals
+from cursos.models import Curso, CursoEstadisticas
+from inscripciones.models import Inscripcion
+from resenas.models import Resena
+
+
+@receiver(post_save, sender=Curso)
+def crear_estadisticas_curso(sender, instance, created, **kwargs):
+    """Un curso nuevo empieza con sus estadísticas en cero"""
+    if created:
+        CursoEstadisticas.objects.get_or_create(curso=instance)
+
+
+@receiver(post_save, sender=Inscripcion)
+def actualizar_estadisticas_inscripcion(sender, instance, created, **kwargs):
+    """
+    Resta la contribución anterior de la inscripción y suma la nueva.
+    El estado anterior se obtiene del FieldTracker de Inscripcion.
+    """
+    tracker = instance.tracker
+    estado_nuevo = (instance.progreso, instance.completado, instance.fecha_inscripcion, instance.fecha_completado)
+    
+    if created:
+        CursoEstadisticas.actualizar(
+            instance.curso_id,
+            lambda estadisticas: estadisticas._aplicar_inscripcion(*estado_nuevo, 1)
+        )
+        return
+    
+    if not tracker.changed():
+        return
+    
+    curso_anterior = tracker.previous('curso')
+    estado_anterior = (
+        tracker.previous('progreso'),
+        tracker.previous('completado'),
+        instance.fecha_inscripcion,
+        tracker.previous('fecha_completado'),
+    )
+    if curso_anterior == instance.curso_id:
+        # Mismo curso: un solo UPDATE; la actividad de la alta se compensa
+        def cambiar(estadisticas):
+            estadisticas._aplicar_inscripcion(*estado_anterior, -1)
+            estadisticas._aplicar_inscripcion(*estado_nuevo, 1)
+        CursoEstadisticas.actualizar(instance.curso_id, cambiar)
+        return
+    
+    CursoEstadisticas.actualizar(
+        curso_anterior,
+        lambda estadisticas: estadisticas._aplicar_inscripcion(*estado_anterior, -1)
+    )
+    CursoEstadisticas.actualizar(
+        instance.curso_id,
+        lambda estadisticas: estadisticas._aplicar_inscripcion(*estado_nuevo, 1)
+    )
+
+
+@receiver(post_delete, sender=Inscripcion)
+def descontar_estadisticas_inscripcion(sender, instance, **kwargs):
+    estado = (instance.progreso, instance.completado, instance.fecha_inscripcion, instance.fecha_completado)
+    CursoEstadisticas.actualizar(
+        instance.curso_id,
+        lambda estadisticas: estadisticas._aplicar_inscripcion(*estado, -1)
+    )
+
+
+def actualizar_estadisticas_resena(sender, document, created, **kwargs):
+    """Reseña creada o con rating modificado (señal de MongoEngine)"""
+    if created:
+        CursoEstadisticas.actualizar(
+            document.curso_id,
+            lambda estadisticas: estadisticas._aplicar_resena(document.rating, document.fecha_creacion, 1)
+        )
+    elif document._rating_guardado is not None and document._rating_guardado != document.rating:
+        rating_anterior = document._rating_guardado
+        CursoEstadisticas.actualizar(
+            document.curso_id,
+            lambda estadisticas: estadisticas._cambiar_rating(rating_anterior, document.rating)
+        )
+
+
+def descontar_estadisticas_resena(sender, document, **kwargs):
+    rating = document._rating_guardado if document._rating_guardado is not None else document.rating
+    CursoEstadisticas.actualizar(
+        document.curso_id,
+        lambda estadisticas: estadisticas._aplicar_resena(rating, document.fecha_creacion, -1)
+    )
+
+
+# Conectar signals de MongoEngine
+mongo_signals.post_save.connect(actualizar_estadisticas_resena, sender=Resena)
+mongo_signals.post_delete.connect(descontar_estadisticas_resena, sender=Resena)
@@ -1,8 +1,14 @@
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Curso
+from .models import Curso, CursoEstadisticas
+from modulos.models import Modulo
+from secciones.models import Seccion
+from inscripciones.models import Inscripcion
 
 User = get_user_model()
 
@@ -38,6 +44,15 @@ class CursoModelTest(TestCase):
         """Test del método __str__"""
         self.assertEqual(str(self.curso), 'Curso de Python')
 
+    
+    def test_tracker_solo_campos_de_contenido(self):
+        """activo y precio no cuentan como cambio de contenido"""
+        self.curso.activo = False
+        self.curso.precio = 10
+        self.assertEqual(self.curso.tracker.changed(), {})
+        
+        self.curso.titulo = 'Curso de Python 3'
+        self.assertEqual(self.curso.tracker.changed(), {'titulo': 'Curso de Python'})
 
 class CursoAPITest(APITestCase):
     """Tests para las APIs de curso"""
@@ -64,4 +79,318 @@ class CursoAPITest(APITestCase):
     def test_list_cursos(self):
         """Test de listado de cursos"""
         response = self.client.get('/api/cursos/')
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CursoListadoTotalesTest(APITestCase):
+    """Tests de los totales anotados en el listado de cursos"""
+    
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        self.estudiante = User.objects.create_user(
+            username='estudiante',
+            email='estudiante@example.com',
+            password='testpass123',
+            perfil='estudiante'
+        )
+        
+        for i in range(3):
+            curso = Curso.objects.create(
+                titulo=f'Curso {i}',
+                descripcion='Descripción',
+                categoria='programacion',
+                nivel='principiante',
+                instructor=self.instructor
+            )
+            for orden in (1, 2):
+                modulo = Modulo.objects.create(titulo=f'Módulo {orden}', orden=orden, curso=curso)
+                for seccion_orden in (1, 2, 3):
+                    Seccion.objects.create(
+                        titulo=f'Sección {seccion_orden}',
+                        contenido='Contenido',
+                        orden=seccion_orden,
+                        modulo=modulo,
+                        duracion_minutos=5
+                    )
+            Inscripcion.objects.create(usuario=self.estudiante, curso=curso)
+    
+    def test_totales_anotados(self):
+        """Los totales del listado coinciden con los datos reales"""
+        response = self.client.get('/api/cursos/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        for curso in response.data['results']:
+            self.assertEqual(curso['total_modulos'], 2)
+            self.assertEqual(curso['total_secciones'], 6)
+            self.assertEqual(curso['duracion_total'], 30)
+            self.assertEqual(curso['total_estudiantes'], 1)
+    
+    def test_consultas_constantes(self):
+        """El número de consultas no depende del tamaño de la página"""
+        # Una consulta para el conteo de la paginación y otra para la página
+        with self.assertNumQueries(2):
+            self.client.get('/api/cursos/')
+
+
+class CursoDetalleArbolTest(APITestCase):
+    """Tests del detalle de curso cargado como árbol precargado"""
+    
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        self.estudiante = User.objects.create_user(
+            username='estudiante',
+            email='estudiante@example.com',
+            password='testpass123',
+            perfil='estudiante'
+        )
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=self.instructor
+        )
+        for orden in (1, 2, 3):
+            modulo = Modulo.objects.create(titulo=f'Módulo {orden}', orden=orden, curso=self.curso)
+            for seccion_orden in (1, 2):
+                Seccion.objects.create(
+                    titulo=f'Sección {seccion_orden}',
+                    contenido='Contenido',
+                    orden=seccion_orden,
+                    modulo=modulo,
+                    duracion_minutos=10
+                )
+        Inscripcion.objects.create(usuario=self.estudiante, curso=self.curso, progreso=40)
+    
+    def test_detalle_totales(self):
+        """Los totales del detalle se calculan desde el árbol precargado"""
+        response = self.client.get(f'/api/cursos/{self.curso.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_modulos'], 3)
+        self.assertEqual(response.data['total_secciones'], 6)
+        self.assertEqual(response.data['duracion_total'], 60)
+        self.assertEqual(response.data['total_estudiantes'], 1)
+        self.assertEqual(response.data['modulos'][0]['total_secciones'], 2)
+        self.assertEqual(response.data['modulos'][0]['duracion_total'], 20)
+        self.assertIsNone(response.data['inscripcion_usuario'])
+    
+    def test_detalle_consultas_fijas(self):
+        """Curso, módulos, secciones e inscripción: cuatro consultas sin importar el tamaño"""
+        self.client.force_authenticate(user=self.estudiante)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/cursos/{self.curso.id}/')
+        self.assertTrue(response.data['inscripcion_usuario']['inscrito'])
+
+
+class CatalogoCacheTest(APITestCase):
+    """Tests de la caché del catálogo público"""
+    
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=self.instructor
+        )
+    
+    def test_listado_anonimo_desde_cache(self):
+        """La segunda petición anónima no toca la base de datos"""
+        self.client.get('/api/cursos/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/cursos/')
+        self.assertEqual(response.data['count'], 1)
+    
+    def test_invalidacion_por_modulo(self):
+        """Crear un módulo invalida el detalle y el listado del curso"""
+        self.client.get(f'/api/cursos/{self.curso.id}/')
+        self.client.get('/api/cursos/')
+        
+        Modulo.objects.create(titulo='Nuevo módulo', orden=1, curso=self.curso)
+        
+        detalle = self.client.get(f'/api/cursos/{self.curso.id}/')
+        self.assertEqual(detalle.data['total_modulos'], 1)
+        listado = self.client.get('/api/cursos/')
+        self.assertEqual(listado.data['results'][0]['total_modulos'], 1)
+    
+    def test_progreso_no_invalida_el_catalogo(self):
+        """Actualizar el progreso de una inscripción no descarta el listado"""
+        estudiante = User.objects.create_user(
+            username='estudiante',
+            email='estudiante@example.com',
+            password='testpass123',
+            perfil='estudiante'
+        )
+        inscripcion = Inscripcion.objects.create(usuario=estudiante, curso=self.curso)
+        self.client.get('/api/cursos/')
+        
+        inscripcion.progreso = 50
+        inscripcion.save()
+        
+        with self.assertNumQueries(0):
+            self.client.get('/api/cursos/')
+        
+        inscripcion.delete()
+        listado = self.client.get('/api/cursos/')
+        self.assertEqual(listado.data['results'][0]['total_estudiantes'], 0)
+    
+    def test_desactivar_oculta_del_catalogo(self):
+        """Desactivar un curso lo retira del listado cacheado"""
+        self.client.get('/api/cursos/')
+        
+        self.curso.activo = False
+        self.curso.save()
+        
+        response = self.client.get('/api/cursos/')
+        self.assertEqual(response.data['count'], 0)
+
+
+class CursoEstadisticasTest(TestCase):
+    """Tests del resumen materializado de estadísticas"""
+    
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        self.estudiantes = [
+            User.objects.create_user(
+                username=f'estudiante{i}',
+                email=f'estudiante{i}@example.com',
+                password='testpass123',
+                perfil='estudiante'
+            )
+            for i in range(3)
+        ]
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=self.instructor,
+            precio=10
+        )
+    
+    def test_mantenimiento_incremental(self):
+        """Altas, cambios de progreso y bajas actualizan la fila del curso"""
+        inscripciones = [
+            Inscripcion.objects.create(usuario=estudiante, curso=self.curso)
+            for estudiante in self.estudiantes
+        ]
+        inscripciones[0].progreso = 50
+        inscripciones[0].save()
+        inscripciones[1].progreso = 100
+        inscripciones[1].save()
+        inscripciones[2].delete()
+        
+        estadisticas = CursoEstadisticas.objects.get(pk=self.curso.pk).como_dict(self.curso.precio)
+        self.assertEqual(estadisticas['total_estudiantes'], 2)
+        self.assertEqual(estadisticas['estudiantes_activos'], 1)
+        self.assertEqual(estadisticas['estudiantes_completados'], 1)
+        self.assertEqual(estadisticas['promedio_progreso'], 75)
+        self.assertEqual(estadisticas['nuevos_estudiantes_semana'], 2)
+        self.assertEqual(estadisticas['completados_semana'], 1)
+        self.assertEqual(estadisticas['ingresos_totales'], 20)
+    
+    def test_cambio_de_curso(self):
+        """Mover una inscripción de curso traslada su contribución"""
+        otro_curso = Curso.objects.create(
+            titulo='Curso de Django',
+            descripcion='Aprende Django',
+            categoria='programacion',
+            nivel='intermedio',
+            instructor=self.instructor
+        )
+        inscripcion = Inscripcion.objects.create(usuario=self.estudiantes[0], curso=self.curso, progreso=30)
+        inscripcion.curso = otro_curso
+        inscripcion.save()
+        
+        self.assertEqual(CursoEstadisticas.objects.get(pk=self.curso.pk).total_estudiantes, 0)
+        self.assertEqual(CursoEstadisticas.objects.get(pk=otro_curso.pk).total_estudiantes, 1)
+        self.assertEqual(CursoEstadisticas.objects.get(pk=otro_curso.pk).estudiantes_activos, 1)
+    
+    def test_progreso_sin_bloquear_la_fila(self):
+        """Un cambio de progreso es un único UPDATE con F() sobre la fila"""
+        inscripcion = Inscripcion.objects.create(usuario=self.estudiantes[0], curso=self.curso)
+        inscripcion.progreso = 40
+        
+        with CaptureQueriesContext(connection) as consultas:
+            inscripcion.save()
+        
+        sql = [consulta['sql'] for consulta in consultas if 'cursos_estadisticas' in consulta['sql']]
+        self.assertEqual(len(sql), 1)
+        self.assertTrue(sql[0].startswith('UPDATE'))
+        estadisticas = CursoEstadisticas.objects.get(pk=self.curso.pk)
+        self.assertEqual(estadisticas.estudiantes_activos, 1)
+        self.assertEqual(estadisticas.suma_progreso, 40)
+        self.assertEqual(estadisticas.actividad_semana('inscripciones'), 1)
+
+
+class EstadisticasGlobalesTest(APITestCase):
+    """Tests de las estadísticas globales de la plataforma"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            perfil='administrador'
+        )
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        estudiantes = [
+            User.objects.create_user(
+                username=f'estudiante{i}',
+                email=f'estudiante{i}@example.com',
+                password='testpass123',
+                perfil='estudiante'
+            )
+            for i in range(2)
+        ]
+        for precio in (10, 25):
+            curso = Curso.objects.create(
+                titulo=f'Curso {precio}',
+                descripcion='Descripción',
+                categoria='programacion',
+                nivel='principiante',
+                instructor=self.instructor,
+                precio=precio
+            )
+            for estudiante in estudiantes:
+                Inscripcion.objects.create(usuario=estudiante, curso=curso)
+        self.client.force_authenticate(user=self.admin)
+    
+    def test_estadisticas_globales(self):
+        """Ingresos y conteos salen de agregados en un número fijo de consultas"""
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/cursos/estadisticas_globales/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_cursos'], 2)
+        self.assertEqual(response.data['total_estudiantes'], 2)
+        self.assertEqual(response.data['total_instructores'], 1)
+        self.assertEqual(response.data['total_inscripciones'], 4)
+        self.assertEqual(response.data['ingresos_totales'], 70.0)
+        self.assertEqual(response.data['cursos_populares'][0]['num_inscripciones'], 2)
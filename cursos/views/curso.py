@@ -1,15 +1,16 @@
-from datetime import datetime, timedelta
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Sum, Avg, Count
+from django.db.models import Q
 from rest_framework import viewsets, status, permissions, exceptions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from ..models import Curso
+from ..models import Curso, CursoEstadisticas
 from ..serializers import CursoSerializer, CursoDetalladoSerializer
 from ..permissions import IsOwnerOrAdmin, IsInstructorOrAdmin
+from .. import cache as catalogo_cache
+from .. import estadisticas_globales
 
 User = get_user_model()
 
@@ -41,20 +42,20 @@ class CursoViewSet(viewsets.ModelViewSet):
         # Para mis_cursos: todos los cursos del instructor autenticado (activos e inactivos)
         if self.action == 'mis_cursos':
             if self.request.user.is_authenticated:
-                return Curso.objects.filter(instructor=self.request.user)
+                return Curso.objects.filter(instructor=self.request.user).con_totales()
             return Curso.objects.none()
         
         # Para retrieve (detalle): permitir al instructor ver sus propios cursos inactivos
         if self.action == 'retrieve':
             if self.request.user.is_authenticated:
                 if self.request.user.perfil == 'administrador':
-                    return Curso.objects.all()
+                    return Curso.objects.con_arbol(self.request.user)
                 # Instructores pueden ver cursos activos públicos O sus propios cursos (activos e inactivos)
                 return Curso.objects.filter(
                     Q(activo=True) | Q(instructor=self.request.user)
-                )
+                ).con_arbol(self.request.user)
             # Usuarios no autenticados solo ven cursos activos
-            return Curso.objects.filter(activo=True)
+            return Curso.objects.filter(activo=True).con_arbol()
         
         # Para acciones de modificación/estadísticas: solo cursos del instructor o admin
         if self.action in ['update', 'partial_update', 'destroy', 'estadisticas', 'desactivar', 'activar']:
@@ -75,9 +76,9 @@ class CursoViewSet(viewsets.ModelViewSet):
                     # Convertir string a boolean
                     activo_bool = activo_param.lower() in ['true', '1', 'yes']
                     queryset = queryset.filter(activo=activo_bool)
-                return queryset
+                return queryset.con_totales()
             # Para el público general: solo cursos activos
-            return Curso.objects.filter(activo=True)
+            return Curso.objects.filter(activo=True).con_totales()
         
         # Fallback: solo cursos activos
         return Curso.objects.filter(activo=True)
@@ -96,6 +97,34 @@ class CursoViewSet(viewsets.ModelViewSet):
             return CursoDetalladoSerializer
         return CursoSerializer
     
+    def list(self, request, *args, **kwargs):
+        # Las respuestas anónimas son iguales para todos: se sirven desde caché
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        
+        clave = catalogo_cache.clave_listado(request.query_params)
+        datos = catalogo_cache.obtener(clave)
+        if datos is not None:
+            return Response(datos)
+        
+        response = super().list(request, *args, **kwargs)
+        catalogo_cache.guardar(clave, response.data)
+        return response
+    
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get('pk', ''))
+        if request.user.is_authenticated or not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        
+        clave = catalogo_cache.clave_detalle(int(pk), request.query_params)
+        datos = catalogo_cache.obtener(clave)
+        if datos is not None:
+            return Response(datos)
+        
+        response = super().retrieve(request, *args, **kwargs)
+        catalogo_cache.guardar(clave, response.data)
+        return response
+    
     def perform_create(self, serializer):
         if not CustomPermission.es_instructor_o_admin(self.request.user):
             raise exceptions.PermissionDenied("Solo instructores pueden crear cursos")
@@ -252,16 +281,16 @@ class CursoViewSet(viewsets.ModelViewSet):
             )
         
         # Incluir cursos activos e inactivos del instructor
-        cursos = Curso.objects.filter(instructor=request.user)
+        cursos = self.get_queryset()
         serializer = self.get_serializer(cursos, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def estadisticas(self, request, pk=None):
-        """Obtener estadísticas detalladas de un curso"""
-        from inscripciones.models import Inscripcion
-        from resenas.models import Resena
-        
+        """
+        Obtener estadísticas detalladas de un curso.
+        Se leen del resumen materializado CursoEstadisticas (una lectura por clave primaria).
+        """
         curso = self.get_object()
         
         # Verificar permisos: solo el instructor del curso o admin
@@ -271,78 +300,16 @@ class CursoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Inscripciones
-        inscripciones = Inscripcion.objects.filter(curso=curso)
-        total_estudiantes = inscripciones.count()
-        estudiantes_completados = inscripciones.filter(completado=True).count()
-        estudiantes_activos = inscripciones.filter(
-            progreso__gt=0,
-            progreso__lt=100
-        ).count()
-        
-        # Promedio de progreso
-        promedio_progreso = inscripciones.aggregate(
-            Avg('progreso')
-        )['progreso__avg'] or 0
-        
-        # Estadísticas de la última semana
-        hace_una_semana = datetime.now() - timedelta(days=7)
-        nuevos_estudiantes_semana = inscripciones.filter(
-            fecha_inscripcion__gte=hace_una_semana
-        ).count()
-        completados_semana = inscripciones.filter(
-            completado=True,
-            fecha_completado__gte=hace_una_semana,
-            fecha_completado__isnull=False
-        ).count()
-        
-        # Reseñas y ratings
-        resenas = list(Resena.objects(curso_id=curso.id))
-        total_resenas = len(resenas)
-        rating_promedio = 0
-        distribucion_ratings = {'5': 0, '4': 0, '3': 0, '2': 0, '1': 0}
-        
-        if resenas:
-            suma_ratings = sum(r.rating for r in resenas)
-            rating_promedio = round(suma_ratings / total_resenas, 2)
-            
-            # Distribución por estrellas
-            for resena in resenas:
-                star = str(int(resena.rating))
-                distribucion_ratings[star] = distribucion_ratings.get(star, 0) + 1
-            
-            # Nuevas reseñas última semana (fecha_creacion es UTC)
-            hace_una_semana_utc = datetime.utcnow() - timedelta(days=7)
-            nuevas_resenas_semana = sum(
-                1 for r in resenas 
-                if r.fecha_creacion and r.fecha_creacion >= hace_una_semana_utc
-            )
-        else:
-            nuevas_resenas_semana = 0
-        
-        # Ingresos
-        ingresos_totales = curso.precio * total_estudiantes
-        
-        return Response({
-            'total_estudiantes': total_estudiantes,
-            'estudiantes_activos': estudiantes_activos,
-            'estudiantes_completados': estudiantes_completados,
-            'promedio_progreso': round(promedio_progreso, 2),
-            'rating_promedio': rating_promedio,
-            'total_resenas': total_resenas,
-            'distribucion_ratings': distribucion_ratings,
-            'nuevos_estudiantes_semana': nuevos_estudiantes_semana,
-            'nuevas_resenas_semana': nuevas_resenas_semana,
-            'completados_semana': completados_semana,
-            'ingresos_totales': float(ingresos_totales),
-        })
+        estadisticas = CursoEstadisticas.obtener(curso)
+        return Response(estadisticas.como_dict(curso.precio))
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def estadisticas_globales(self, request):
-        """Obtener estadísticas globales de la plataforma"""
-        from inscripciones.models import Inscripcion
-        from resenas.models import Resena
-        
+        """
+        Obtener estadísticas globales de la plataforma.
+        Usa la instantánea en caché si ESTADISTICAS_GLOBALES_CACHE_TIMEOUT > 0;
+        ?refrescar=true fuerza el recálculo.
+        """
         # Verificar que sea administrador
         if request.user.perfil != 'administrador':
             return Response(
@@ -350,52 +317,5 @@ class CursoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Cursos
-        total_cursos = Curso.objects.count()
-        cursos_activos = Curso.objects.filter(activo=True).count()
-        
-        # Usuarios
-        total_estudiantes = User.objects.filter(perfil='estudiante').count()
-        total_instructores = User.objects.filter(perfil='instructor').count()
-        
-        # Estudiantes nuevos este mes
-        hace_un_mes = datetime.now() - timedelta(days=30)
-        nuevos_estudiantes_mes = User.objects.filter(
-            perfil='estudiante',
-            date_joined__gte=hace_un_mes
-        ).count()
-        
-        # Inscripciones
-        total_inscripciones = Inscripcion.objects.count()
-        
-        # Cursos más populares (por número de inscripciones)
-        cursos_populares = Curso.objects.annotate(
-            num_inscripciones=Count('inscripciones')
-        ).order_by('-num_inscripciones')[:5]
-        
-        cursos_populares_data = []
-        for curso in cursos_populares:
-            cursos_populares_data.append({
-                'id': curso.id,
-                'titulo': curso.titulo,
-                'instructor': curso.instructor.get_full_name() if curso.instructor.first_name else curso.instructor.username,
-                'num_inscripciones': curso.num_inscripciones,
-                'imagen': curso.imagen.url if curso.imagen else None
-            })
-        
-        # Ingresos totales
-        ingresos_totales = 0
-        for curso in Curso.objects.all():
-            inscripciones_count = Inscripcion.objects.filter(curso=curso).count()
-            ingresos_totales += curso.precio * inscripciones_count
-        
-        return Response({
-            'total_cursos': total_cursos,
-            'cursos_activos': cursos_activos,
-            'total_estudiantes': total_estudiantes,
-            'total_instructores': total_instructores,
-            'nuevos_estudiantes_mes': nuevos_estudiantes_mes,
-            'total_inscripciones': total_inscripciones,
-            'cursos_populares': cursos_populares_data,
-            'ingresos_totales': float(ingresos_totales)
-        })
+        refrescar = request.query_params.get('refrescar', '').lower() in ['true', '1', 'yes']
+        return Response(estadisticas_globales.obtener(forzar=refrescar))
@@ -29,7 +29,7 @@ class Inscripcion(models.Model):
     fecha_completado = models.DateTimeField(blank=True, null=True)
     
     # Field tracker para detectar cambios
-    tracker = FieldTracker(fields=['completado'])
+    tracker = FieldTracker(fields=['completado', 'progreso', 'curso', 'fecha_completado'])
     
     class Meta:
         verbose_name = 'Inscripción'
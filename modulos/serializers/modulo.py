@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.db import models
+from django.db.models import prefetch_related_objects
 from ..models import Modulo
 
 
@@ -31,14 +32,17 @@ class ModuloDetalladoSerializer(serializers.ModelSerializer):
         fields = ('id', 'titulo', 'descripcion', 'orden', 'curso', 
                  'secciones', 'total_secciones', 'duracion_total')
     
+    def _secciones(self, obj):
+        """Secciones del módulo; usa las precargadas si existen"""
+        prefetch_related_objects([obj], 'secciones')
+        return obj.secciones.all()
+    
     def get_secciones(self, obj):
         from secciones.serializers import SeccionSerializer
-        return SeccionSerializer(obj.secciones.all(), many=True).data
+        return SeccionSerializer(self._secciones(obj), many=True).data
     
     def get_total_secciones(self, obj):
-        return obj.secciones.count()
+        return len(self._secciones(obj))
     
     def get_duracion_total(self, obj):
-        return obj.secciones.aggregate(
-            total=models.Sum('duracion_minutos')
-        )['total'] or 0
\ No newline at end of file
+        return sum(seccion.duracion_minutos for seccion in self._secciones(obj))
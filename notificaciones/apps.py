@@ -11,5 +11,6 @@ class NotificacionesConfig(AppConfig):
             inscripcion_signals,
             resena_signals,
             aviso_signals,
-            curso_signals
+            curso_signals,
+            contador_signals
         )
@@ -1,7 +1,13 @@
 import json
+import msgpack
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from notificaciones import contador, presencia, reenvio
+from notificaciones.websocket import codificar, SUBPROTOCOLO_MSGPACK
 
 User = get_user_model()
 
@@ -13,6 +19,13 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
     Endpoint: ws://localhost:8000/ws/notificaciones/
     
     Cada usuario se conecta a su propio grupo: notificaciones_user_{user_id}
+    
+    Por defecto los mensajes son JSON (frames de texto). Si el cliente pide el
+    subprotocolo 'msgpack' y NOTIFICACIONES_WS_MSGPACK está activo, se usan
+    frames binarios msgpack en ambos sentidos.
+    
+    Al reconectar, ?since=<id de la última notificación recibida> (o una
+    fecha ISO 8601) reenvía lo perdido antes de pasar a modo en vivo.
     """
     
     async def connect(self):
@@ -30,6 +43,9 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
         # Usar el ID del usuario autenticado
         user_id = self.user.id
         
+        # IDs ya entregados por el reenvío (se descartan si llegan en vivo)
+        self.reenviadas = set()
+        
         # Nombre del grupo privado del usuario
         self.group_name = f"notificaciones_user_{user_id}"
         
@@ -39,16 +55,36 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
         
-        # Aceptar la conexión WebSocket
-        await self.accept()
+        # Registrar la conexión para que los envíos no omitan a este usuario
+        await sync_to_async(presencia.conectar)(user_id)
+        
+        # Aceptar la conexión WebSocket negociando el formato
+        self.binario = (
+            settings.NOTIFICACIONES_WS_MSGPACK
+            and SUBPROTOCOLO_MSGPACK in self.scope.get('subprotocols', [])
+        )
+        await self.accept(subprotocol=SUBPROTOCOLO_MSGPACK if self.binario else None)
         
         # Enviar mensaje de bienvenida
-        await self.send(text_data=json.dumps({
+        await self._enviar({
             'tipo': 'conexion',
             'mensaje': 'Conectado al sistema de notificaciones',
             'usuario_id': self.user.id if (self.user and self.user.is_authenticated) else None,
-            'grupo': self.group_name
-        }))
+            'grupo': self.group_name,
+            'formato': 'msgpack' if self.binario else 'json'
+        })
+        
+        # Enviar el contador actual; los cambios llegan por contador_actualizado
+        no_leidas = await database_sync_to_async(contador.obtener)(user_id)
+        await self._enviar({
+            'tipo': 'contador',
+            'no_leidas': no_leidas
+        })
+        
+        # Reenviar lo creado desde la última notificación que recibió el cliente
+        since = parse_qs(self.scope.get('query_string', b'').decode()).get('since')
+        if since:
+            await self._reenviar_perdidas(since[0])
     
     async def disconnect(self, close_code):
         """
@@ -60,37 +96,100 @@ class NotificacionConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name
             )
+            await sync_to_async(presencia.desconectar)(self.user.id)
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Se ejecuta cuando se recibe un mensaje del cliente.
         Puede usarse para ping/pong o comandos especiales.
         """
         try:
-            data = json.loads(text_data)
+            if bytes_data is not None:
+                data = msgpack.unpackb(bytes_data, raw=False)
+            else:
+                data = json.loads(text_data)
             tipo = data.get('tipo')
             
             if tipo == 'ping':
-                # Responder con pong para mantener conexión viva
-                await self.send(text_data=json.dumps({
+                # Responder con pong para mantener conexión viva y renovar la presencia
+                await sync_to_async(presencia.renovar)(self.user.id)
+                await self._enviar({
                     'tipo': 'pong',
                     'timestamp': data.get('timestamp')
-                }))
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
+                })
+        except (json.JSONDecodeError, msgpack.ExtraData, msgpack.FormatError, ValueError, AttributeError):
+            await self._enviar({
                 'tipo': 'error',
                 'mensaje': 'Formato de mensaje inválido'
-            }))
+            })
+    
+    async def _reenviar_perdidas(self, since):
+        """
+        Envía en lotes de NOTIFICACIONES_WS_REENVIO_LOTE las notificaciones
+        posteriores a `since`. Si hay más de NOTIFICACIONES_WS_REENVIO_MAXIMO
+        el mensaje final lleva completo=False y el cliente completa con la API.
+        """
+        try:
+            desde = reenvio.decodificar_desde(since)
+        except ValueError:
+            await self._enviar({
+                'tipo': 'error',
+                'mensaje': 'Parámetro since inválido'
+            })
+            return
+        desde = await database_sync_to_async(reenvio.resolver_desde)(self.user.id, desde)
+        
+        tamano_lote = settings.NOTIFICACIONES_WS_REENVIO_LOTE
+        maximo = settings.NOTIFICACIONES_WS_REENVIO_MAXIMO
+        enviadas = 0
+        hay_mas = True
+        while hay_mas and enviadas < maximo:
+            eventos, desde, hay_mas = await database_sync_to_async(reenvio.siguiente_lote)(
+                self.user.id, desde, min(tamano_lote, maximo - enviadas)
+            )
+            for evento in eventos:
+                self.reenviadas.add(evento['id'])
+                await self._enviar_frames(evento)
+            enviadas += len(eventos)
+        
+        await self._enviar({
+            'tipo': 'sincronizacion',
+            'enviadas': enviadas,
+            'completo': not hay_mas
+        })
+    
+    async def _enviar(self, datos):
+        """Codifica y envía un mensaje propio de esta conexión"""
+        await self._enviar_frames(codificar(datos))
+    
+    async def _enviar_frames(self, frames):
+        """Envía el frame ya codificado en el formato negociado"""
+        if self.binario and 'binario' in frames:
+            await self.send(bytes_data=frames['binario'])
+        else:
+            await self.send(text_data=frames['texto'])
     
     async def notificacion_mensaje(self, event):
         """
         Recibe una notificación desde el channel layer y la envía al cliente.
-        Este método es llamado cuando se usa channel_layer.group_send()
+        Este método es llamado cuando se usa channel_layer.group_send();
+        el frame llega ya codificado (notificaciones/websocket.py).
         """
-        notificacion = event['notificacion']
-        
-        # Enviar la notificación al WebSocket
-        await self.send(text_data=json.dumps({
-            'tipo': 'notificacion',
-            'data': notificacion
-        }))
+        if event.get('id') in self.reenviadas:
+            # Ya entregada por el reenvío de la reconexión
+            self.reenviadas.discard(event['id'])
+        elif 'texto' in event:
+            await self._enviar_frames(event)
+        else:
+            # Formato anterior: {'notificacion': {...}}
+            await self._enviar({
+                'tipo': 'notificacion',
+                'data': event['notificacion']
+            })
+    
+    async def contador_actualizado(self, event):
+        """
+        Recibe el nuevo contador de no leídas desde el channel layer
+        (notificaciones/contador.py) y lo envía al cliente.
+        """
+        await self._enviar_frames(event)
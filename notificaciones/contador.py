@@ -0,0 +1,116 @@
+"""
+Contador de notificaciones no leídas por usuario.
+
+El valor vive en la caché de Django (Redis en producción, memoria local en
+desarrollo) y se ajusta con incr/decr al crear, leer o eliminar
+notificaciones. Si la clave no existe (caducó, se reinició la caché) se
+reconcilia con un count() en MongoDB. Cada cambio se envía por WebSocket
+al grupo del usuario como 'contador_actualizado'.
+"""
+import logging
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('notificaciones')
+
+
+def _clave(usuario_id):
+    return f'notificaciones:no_leidas:{usuario_id}'
+
+
+def reconciliar(usuario_id):
+    """Recalcula el contador desde MongoDB y lo guarda en caché"""
+    from notificaciones.models import Notificacion
+
+    valor = Notificacion.objects(usuario_id=usuario_id, leida=False).count()
+    cache.set(_clave(usuario_id), valor, settings.NOTIFICACIONES_CONTADOR_TIMEOUT)
+    return valor
+
+
+def obtener(usuario_id):
+    valor = cache.get(_clave(usuario_id))
+    if valor is None:
+        valor = reconciliar(usuario_id)
+    return valor
+
+
+def ajustar(usuario_id, delta, publicar=True):
+    """
+    Suma `delta` al contador del usuario (negativo para restar).
+    Si la clave no existe se reconcilia desde MongoDB, que ya refleja el cambio.
+    """
+    if not delta:
+        return None
+    try:
+        valor = cache.incr(_clave(usuario_id), delta)
+    except ValueError:
+        valor = reconciliar(usuario_id)
+    else:
+        if valor < 0:
+            valor = reconciliar(usuario_id)
+    if publicar:
+        publicar_contador(usuario_id, valor)
+    return valor
+
+
+def invalidar(usuario_id, publicar=True):
+    """Descarta el contador y lo recalcula (para cambios masivos sin delta conocido)"""
+    cache.delete(_clave(usuario_id))
+    valor = reconciliar(usuario_id)
+    if publicar:
+        publicar_contador(usuario_id, valor)
+    return valor
+
+
+def invalidar_lote(usuario_ids):
+    """
+    Descarta los contadores de varios usuarios con un solo delete_many.
+    Cada uno se reconcilia en su próxima lectura (obtener), sin count() aquí.
+    """
+    if usuario_ids:
+        cache.delete_many([_clave(usuario_id) for usuario_id in usuario_ids])
+
+
+def ajustar_lote(deltas, publicar=True):
+    """
+    Aplica {usuario_id: delta} tras una inserción masiva. Solo se ajustan
+    los contadores que están en caché; los demás se reconciliarán en su
+    próxima lectura, sin lanzar un count() por usuario.
+    """
+    claves = {usuario_id: _clave(usuario_id) for usuario_id, delta in deltas.items() if delta}
+    existentes = cache.get_many(list(claves.values()))
+    valores = {}
+    for usuario_id, clave in claves.items():
+        if clave not in existentes:
+            continue
+        try:
+            valores[usuario_id] = cache.incr(clave, deltas[usuario_id])
+        except ValueError:
+            continue
+    if publicar:
+        publicar_contadores(valores)
+    return valores
+
+
+def publicar_contador(usuario_id, valor):
+    """Envía el nuevo valor al grupo WebSocket del usuario"""
+    publicar_contadores({usuario_id: valor})
+
+
+def publicar_contadores(valores):
+    """
+    Envía {usuario_id: valor} a los grupos WebSocket en una sola pasada
+    (solo a los usuarios conectados; al conectar reciben el valor actual)
+    """
+    from notificaciones import presencia
+    from notificaciones.websocket import enviar_a_grupos, evento, nombre_grupo
+
+    try:
+        en_linea = presencia.conectados(valores)
+        enviar_a_grupos([
+            (nombre_grupo(usuario_id), evento('contador_actualizado', {'tipo': 'contador', 'no_leidas': valor}))
+            for usuario_id, valor in valores.items()
+            if usuario_id in en_linea
+        ])
+    except Exception as e:
+        logger.warning(f"Error al enviar contador por WebSocket: {e}")
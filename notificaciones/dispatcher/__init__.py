@@ -0,0 +1,60 @@
+"""
+Dispatcher de trabajos en segundo plano para notificaciones.
+
+Las señales no crean notificaciones ni las envían por WebSocket: encolan
+una tarea (notificaciones/tareas.py) con los IDs necesarios y la petición
+responde sin esperar a MongoDB ni al channel layer. El backend se elige
+con NOTIFICACIONES_DISPATCHER_BACKEND:
+
+- HilosBackend: cola en memoria con un pool de hilos (por defecto).
+- SincronoBackend: ejecuta en el momento (desarrollo/tests).
+
+Un broker externo puede sustituirlos implementando BaseBackend.encolar().
+"""
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from .backends import Trabajo, BaseBackend, SincronoBackend, HilosBackend
+
+__all__ = [
+    'Trabajo', 'BaseBackend', 'SincronoBackend', 'HilosBackend',
+    'obtener_dispatcher', 'encolar', 'encolar_al_confirmar',
+]
+
+_dispatcher = None
+_lock = threading.Lock()
+
+
+def obtener_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _lock:
+            if _dispatcher is None:
+                backend = import_string(settings.NOTIFICACIONES_DISPATCHER_BACKEND)
+                _dispatcher = backend(
+                    workers=settings.NOTIFICACIONES_DISPATCHER_WORKERS,
+                    capacidad=settings.NOTIFICACIONES_DISPATCHER_CAPACIDAD,
+                    reintentos=settings.NOTIFICACIONES_DISPATCHER_REINTENTOS,
+                    espera_reintento=settings.NOTIFICACIONES_DISPATCHER_ESPERA_REINTENTO,
+                )
+    return _dispatcher
+
+
+def _nombre_tarea(tarea):
+    if isinstance(tarea, str):
+        return tarea
+    return f"{tarea.__module__}.{tarea.__qualname__}"
+
+
+def encolar(tarea, *args, retraso=0, **kwargs):
+    """Encola `tarea(*args, **kwargs)`; `retraso` en segundos la difiere"""
+    obtener_dispatcher().encolar(Trabajo(_nombre_tarea(tarea), args, kwargs), retraso=retraso)
+
+
+def encolar_al_confirmar(tarea, *args, **kwargs):
+    """
+    Encola la tarea cuando se confirme la transacción actual, para que el
+    worker vea los datos guardados (inmediato si no hay transacción).
+    """
+    transaction.on_commit(lambda: encolar(tarea, *args, **kwargs))
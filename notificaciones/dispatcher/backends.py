@@ -0,0 +1,171 @@
+import abc
+import atexit
+import logging
+import os
+import queue
+import threading
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('notificaciones')
+
+# Marca para detener a los workers
+_FIN = object()
+
+
+class Trabajo:
+    """
+    Llamada diferida a una tarea identificada por su ruta de importación
+    ('notificaciones.tareas.notificar_nuevo_aviso'). Los argumentos deben ser
+    serializables (IDs, no instancias) para que un broker pueda transportarlos.
+    """
+
+    def __init__(self, tarea, args=(), kwargs=None, intentos=0):
+        self.tarea = tarea
+        self.args = list(args)
+        self.kwargs = kwargs or {}
+        self.intentos = intentos
+
+    def ejecutar(self):
+        import_string(self.tarea)(*self.args, **self.kwargs)
+
+    def __repr__(self):
+        return f"Trabajo({self.tarea}, args={self.args}, kwargs={self.kwargs})"
+
+
+class BaseBackend(abc.ABC):
+    """
+    Interfaz de los backends del dispatcher. Un backend de broker (Celery,
+    RQ, ...) solo necesita implementar encolar(); procesar() aplica los
+    reintentos y el dead-lettering comunes. Un backend sin encolar() falla
+    al instanciarse, no con el primer trabajo.
+    """
+
+    def __init__(self, reintentos=3, espera_reintento=2.0, **opciones):
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+
+    @abc.abstractmethod
+    def encolar(self, trabajo, retraso=0):
+        """Entrega el trabajo para ejecutarlo (tras `retraso` segundos)"""
+
+    def detener(self, timeout=10):
+        pass
+
+    def procesar(self, trabajo):
+        """
+        Ejecuta el trabajo. Devuelve los segundos de espera antes del
+        siguiente intento, o None si terminó (con éxito o en dead letter).
+        """
+        trabajo.intentos += 1
+        try:
+            trabajo.ejecutar()
+            return None
+        except Exception as e:
+            if trabajo.intentos <= self.reintentos:
+                espera = self.espera_reintento * 2 ** (trabajo.intentos - 1)
+                logger.warning(f"[DISPATCHER] {trabajo} falló (intento {trabajo.intentos}), reintento en {espera}s: {e}")
+                return espera
+            self.descartar(trabajo, e)
+            return None
+
+    def descartar(self, trabajo, error):
+        """Guarda el trabajo en la colección de trabajos fallidos"""
+        logger.error(f"[DISPATCHER] ✗ {trabajo} descartado tras {trabajo.intentos} intentos: {error}")
+        try:
+            from notificaciones.models import TrabajoFallido
+
+            TrabajoFallido(
+                tarea=trabajo.tarea,
+                args=trabajo.args,
+                kwargs=trabajo.kwargs,
+                intentos=trabajo.intentos,
+                error=str(error)[:2000],
+            ).save()
+        except Exception as e:
+            logger.error(f"[DISPATCHER] No se pudo guardar el trabajo fallido: {e}")
+
+
+class SincronoBackend(BaseBackend):
+    """
+    Ejecuta el trabajo en el mismo hilo (desarrollo y tests). Los reintentos
+    son inmediatos y el retraso se ignora.
+    """
+
+    def encolar(self, trabajo, retraso=0):
+        while self.procesar(trabajo) is not None:
+            pass
+
+
+class HilosBackend(BaseBackend):
+    """
+    Cola en memoria atendida por un pool de hilos del propio proceso.
+    Los retrasos (reintentos, trabajos diferidos) se programan con temporizadores.
+    Si la cola está llena el trabajo va directamente a dead letter.
+    """
+
+    def __init__(self, workers=4, capacidad=10000, **opciones):
+        super().__init__(**opciones)
+        self.workers = workers
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._reiniciar()
+        atexit.register(self.detener)
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._cola = queue.Queue(maxsize=self.capacidad)
+        self._hilos = []
+
+    def _asegurar_hilos(self):
+        if self._hilos and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (fork): la cola y los hilos heredados no sirven
+                self._reiniciar()
+            if not self._hilos:
+                for numero in range(self.workers):
+                    hilo = threading.Thread(
+                        target=self._ejecutar, name=f'notificaciones-dispatcher-{numero}', daemon=True
+                    )
+                    hilo.start()
+                    self._hilos.append(hilo)
+
+    def encolar(self, trabajo, retraso=0):
+        if retraso:
+            temporizador = threading.Timer(retraso, self.encolar, args=(trabajo,))
+            temporizador.daemon = True
+            temporizador.start()
+            return
+        self._asegurar_hilos()
+        try:
+            self._cola.put_nowait(trabajo)
+        except queue.Full:
+            self.descartar(trabajo, 'Cola del dispatcher llena')
+
+    def _ejecutar(self):
+        while True:
+            trabajo = self._cola.get()
+            try:
+                if trabajo is _FIN:
+                    return
+                espera = self.procesar(trabajo)
+                if espera is not None:
+                    self.encolar(trabajo, retraso=espera)
+            finally:
+                self._cola.task_done()
+
+    def esperar(self):
+        """Bloquea hasta que la cola esté vacía (no espera a los trabajos diferidos)"""
+        if self._hilos and self._pid == os.getpid():
+            self._cola.join()
+
+    def detener(self, timeout=10):
+        """Procesa lo pendiente y detiene los workers"""
+        if not self._hilos or self._pid != os.getpid():
+            return
+        hilos, self._hilos = self._hilos, []
+        for _ in hilos:
+            self._cola.put(_FIN)
+        for hilo in hilos:
+            hilo.join(timeout)
@@ -0,0 +1,108 @@
+"""
+Channel layer en memoria repartido en varios shards.
+
+En producción los grupos se reparten entre varios Redis con
+channels_redis.core.RedisChannelLayer y una lista de hosts (REDIS_HOSTS):
+cada grupo notificaciones_user_{id} vive en el host que le asigna el hash
+consistente de su nombre. ShardedInMemoryChannelLayer reproduce ese mismo
+reparto con un InMemoryChannelLayer por shard, para desarrollo, tests y el
+comando benchmark_channel_layer sin varios Redis.
+"""
+import binascii
+from channels.layers import BaseChannelLayer, InMemoryChannelLayer
+
+
+def indice_shard(nombre, total):
+    """
+    Shard de un grupo o canal: mismo anillo de 4096 nodos que
+    channels_redis (crc32 del nombre repartido en rangos contiguos).
+    """
+    if total == 1:
+        return 0
+    valor = binascii.crc32(nombre.encode('utf8')) & 0xFFF
+    return int(valor / (4096 / float(total)))
+
+
+class _Shard(InMemoryChannelLayer):
+    """Shard que entrega cada mensaje en el shard dueño del canal"""
+
+    def __init__(self, capa, indice, **config):
+        super().__init__(**config)
+        self.capa = capa
+        self.indice = indice
+        self.mensajes = 0
+        self.envios_grupo = 0
+
+    async def send(self, channel, message):
+        destino = self.capa.shard_de(channel)
+        if destino is not self:
+            return await destino.send(channel, message)
+        self.mensajes += 1
+        await super().send(channel, message)
+
+    async def group_send(self, group, message):
+        self.envios_grupo += 1
+        await super().group_send(group, message)
+
+
+class ShardedInMemoryChannelLayer(BaseChannelLayer):
+    """
+    Reparte grupos y canales entre `shards` capas en memoria. Cada grupo
+    guarda sus miembros en su shard; group_send entrega a cada canal en el
+    shard que lo recibe, como channels_redis con varios hosts.
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, shards=2, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.shards = [
+            _Shard(
+                self, indice,
+                expiry=expiry,
+                group_expiry=group_expiry,
+                capacity=capacity,
+                channel_capacity=channel_capacity,
+            )
+            for indice in range(shards)
+        ]
+
+    def shard_de(self, nombre):
+        return self.shards[indice_shard(nombre, len(self.shards))]
+
+    async def send(self, channel, message):
+        await self.shard_de(channel).send(channel, message)
+
+    async def receive(self, channel):
+        return await self.shard_de(channel).receive(channel)
+
+    async def new_channel(self, prefix='specific.'):
+        return await self.shards[0].new_channel(prefix)
+
+    async def group_add(self, group, channel):
+        await self.shard_de(group).group_add(group, channel)
+
+    async def group_discard(self, group, channel):
+        await self.shard_de(group).group_discard(group, channel)
+
+    async def group_send(self, group, message):
+        await self.shard_de(group).group_send(group, message)
+
+    async def flush(self):
+        for shard in self.shards:
+            await shard.flush()
+
+    async def close(self):
+        pass
+
+    def estadisticas(self):
+        """Grupos, envíos a grupo y mensajes entregados por shard"""
+        return [
+            {
+                'shard': shard.indice,
+                'grupos': len(shard.groups),
+                'envios_grupo': shard.envios_grupo,
+                'mensajes': shard.mensajes,
+            }
+            for shard in self.shards
+        ]
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from notificaciones.layers import ShardedInMemoryChannelLayer, indice_shard
+from notificaciones.websocket import evento, nombre_grupo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el fan-out de notificaciones (group_send a notificaciones_user_{id} y '
+        'recepción en cada socket) según el número de shards del channel layer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4], help='Números de shards a medir')
+        parser.add_argument('--usuarios', type=int, default=1000, help='Usuarios (grupos) conectados')
+        parser.add_argument('--conexiones', type=int, default=1, help='Sockets por usuario')
+        parser.add_argument('--rondas', type=int, default=5, help='Notificaciones enviadas a cada usuario')
+        parser.add_argument(
+            '--redis',
+            action='store_true',
+            help='Usar RedisChannelLayer con los primeros N hosts de REDIS_HOSTS en lugar de shards en memoria'
+        )
+
+    def handle(self, *args, **options):
+        if options['redis'] and max(options['shards']) > len(settings.REDIS_HOSTS):
+            raise CommandError(
+                f'REDIS_HOSTS tiene {len(settings.REDIS_HOSTS)} hosts; no se pueden medir '
+                f'{max(options["shards"])} shards'
+            )
+
+        for shards in options['shards']:
+            capa = self._capa(shards, options['redis'])
+            por_segundo = async_to_sync(self._medir)(
+                capa, options['usuarios'], options['conexiones'], options['rondas']
+            )
+            reparto = [0] * shards
+            for usuario_id in range(1, options['usuarios'] + 1):
+                reparto[indice_shard(nombre_grupo(usuario_id), shards)] += 1
+            self.stdout.write(
+                f'  {shards} shard(s): {por_segundo:,.0f} mensajes/s | grupos por shard: {reparto}'
+            )
+
+    def _capa(self, shards, redis):
+        if redis:
+            from channels_redis.core import RedisChannelLayer
+            return RedisChannelLayer(hosts=settings.REDIS_HOSTS[:shards], prefix='asgi-benchmark')
+        return ShardedInMemoryChannelLayer(shards=shards)
+
+    async def _medir(self, capa, usuarios, conexiones, rondas):
+        grupos = [nombre_grupo(usuario_id) for usuario_id in range(1, usuarios + 1)]
+        canales = []
+        for grupo in grupos:
+            for _ in range(conexiones):
+                canal = await capa.new_channel()
+                await capa.group_add(grupo, canal)
+                canales.append(canal)
+
+        mensaje = evento('notificacion_mensaje', {
+            'tipo': 'notificacion',
+            'data': {'titulo': 'Actualización en el curso', 'mensaje': 'x' * 200},
+        })
+        inicio = time.perf_counter()
+        for _ in range(rondas):
+            await asyncio.gather(*(capa.group_send(grupo, mensaje) for grupo in grupos))
+            await asyncio.gather(*(capa.receive(canal) for canal in canales))
+        duracion = time.perf_counter() - inicio
+
+        await capa.flush()
+        return len(canales) * rondas / duracion
@@ -1,3 +1,4 @@
 from .notificacion import Notificacion
+from .trabajo_fallido import TrabajoFallido
 
-__all__ = ['Notificacion']
+__all__ = ['Notificacion', 'TrabajoFallido']
@@ -37,17 +37,34 @@ class Notificacion(Document):
     # Datos adicionales (IDs relacionados, URLs, etc.)
     datos_extra = fields.DictField(default=dict, db_field='datos_extra')
     
+    # Identificador determinista de las notificaciones creadas por tareas
+    # ('evento:objeto_id:usuario_id'): el reintento de una tarea no las duplica
+    clave = fields.StringField(db_field='clave')
+    
     # Metadata de MongoDB
     meta = {
         'collection': 'notificaciones',
         'indexes': [
-            'usuario_id',
             'tipo',
             'leida',
-            '-fecha_creacion',  # Índice descendente para ordenar por más reciente
+            # Orden de la paginación por cursor: (-fecha_creacion, -id)
+            {
+                'fields': ['-fecha_creacion', '-id'],
+                'name': 'fecha_idx'
+            },
+            {
+                'fields': ['usuario_id', '-fecha_creacion', '-id'],
+                'name': 'usuario_fecha_idx'
+            },
             {
-                'fields': ['usuario_id', 'leida'],
-                'name': 'usuario_leida_idx'
+                'fields': ['usuario_id', 'leida', '-fecha_creacion', '-id'],
+                'name': 'usuario_leida_fecha_idx'
+            },
+            {
+                'fields': ['clave'],
+                'name': 'clave_idx',
+                'unique': True,
+                'sparse': True  # Las notificaciones manuales no tienen clave
             }
         ],
         'ordering': ['-fecha_creacion']
@@ -56,6 +73,32 @@ class Notificacion(Document):
     def __str__(self):
         return f"Notificación {self.tipo} para usuario {self.usuario_id}"
     
+    @classmethod
+    def marcar_leidas(cls, queryset, usuario_id=None):
+        """
+        Marca como leídas las notificaciones no leídas del queryset con un
+        único update_many en el servidor. Retorna cuántas se modificaron.
+        `usuario_id` indica que todas son de ese usuario (ajuste directo del
+        contador); si no se indica se descartan en bloque los contadores de
+        los usuarios afectados, que se recalculan al leerlos.
+        """
+        from notificaciones import contador
+        
+        pendientes = queryset.filter(leida=False)
+        usuarios = None if usuario_id is not None else pendientes.distinct('usuario_id')
+        resultado = pendientes.update(
+            set__leida=True,
+            set__fecha_lectura=datetime.utcnow(),
+            full_result=True
+        )
+        modificadas = resultado.modified_count
+        
+        if usuario_id is not None:
+            contador.ajustar(usuario_id, -modificadas)
+        elif modificadas:
+            contador.invalidar_lote(usuarios)
+        return modificadas
+    
     def marcar_como_leida(self):
         """Marca la notificación como leída"""
         if not self.leida:
@@ -0,0 +1,24 @@
+from mongoengine import Document, fields
+from datetime import datetime
+
+
+class TrabajoFallido(Document):
+    """
+    Trabajo del dispatcher de notificaciones que agotó sus reintentos (dead letter).
+    Se conserva para inspección y reenvío manual.
+    """
+    tarea = fields.StringField(required=True)
+    args = fields.ListField(default=list)
+    kwargs = fields.DictField(default=dict)
+    intentos = fields.IntField(default=0)
+    error = fields.StringField()
+    fecha = fields.DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'notificaciones_trabajos_fallidos',
+        'indexes': ['-fecha', 'tarea'],
+        'ordering': ['-fecha']
+    }
+
+    def __str__(self):
+        return f"{self.tarea} ({self.intentos} intentos): {self.error}"
@@ -1,7 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+from curso_online_project.paginacion import MongoCursorPagination
 
 
-class NotificacionPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+class NotificacionCursorPagination(MongoCursorPagination):
+    """
+    Paginación por cursor de las notificaciones, ordenadas por
+    (-fecha_creacion, -id) sobre los índices compuestos de Notificacion.
+    """
+    ordenes = {
+        'recientes': ('fecha_creacion', datetime.fromisoformat),
+    }
@@ -0,0 +1,98 @@
+"""
+Presencia de usuarios en el WebSocket de notificaciones.
+
+NotificacionConsumer registra cada conexión abierta en la caché de Django
+(un contador por usuario) y la renueva con cada ping del cliente; si un
+proceso muere sin cerrar sus sockets, la clave caduca tras
+NOTIFICACIONES_PRESENCIA_TTL segundos sin ping. Los envíos por WebSocket
+consultan la presencia con un solo get_many y omiten el group_send de los
+usuarios sin conexión (lo recuperan al conectarse con ?since=).
+
+Es opcional (NOTIFICACIONES_PRESENCIA, desactivado por defecto): requiere
+una caché compartida entre los procesos que sirven el WebSocket y los que
+envían, y clientes que hagan ping antes de que caduque el TTL. Desactivado,
+todos los usuarios se consideran conectados.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+# Métricas globales (aproximadas si un proceso muere sin desconectar)
+_CLAVE_CONEXIONES = 'notificaciones:presencia:conexiones'
+_CLAVE_USUARIOS = 'notificaciones:presencia:usuarios'
+
+
+def _clave(usuario_id):
+    return f'notificaciones:presencia:{usuario_id}'
+
+
+def _sumar(clave, delta, timeout=None):
+    """incr que crea la clave si no existe y no baja de 0"""
+    cache.add(clave, 0, timeout)
+    try:
+        valor = cache.incr(clave, delta)
+    except ValueError:
+        # Caducó entre add e incr
+        valor = max(delta, 0)
+        cache.set(clave, valor, timeout)
+    if valor < 0:
+        valor = 0
+        cache.set(clave, valor, timeout)
+    return valor
+
+
+def conectar(usuario_id):
+    """Registra una conexión abierta del usuario"""
+    if not settings.NOTIFICACIONES_PRESENCIA:
+        return
+    ttl = settings.NOTIFICACIONES_PRESENCIA_TTL
+    clave = _clave(usuario_id)
+    if _sumar(clave, 1, ttl) == 1:
+        _sumar(_CLAVE_USUARIOS, 1)
+    cache.touch(clave, ttl)
+    _sumar(_CLAVE_CONEXIONES, 1)
+
+
+def desconectar(usuario_id):
+    """Da de baja una conexión; con la última el usuario pasa a desconectado"""
+    if not settings.NOTIFICACIONES_PRESENCIA:
+        return
+    clave = _clave(usuario_id)
+    try:
+        valor = cache.decr(clave)
+    except ValueError:
+        # Ya caducó por falta de ping
+        valor = 0
+    if valor <= 0:
+        cache.delete(clave)
+        _sumar(_CLAVE_USUARIOS, -1)
+    _sumar(_CLAVE_CONEXIONES, -1)
+
+
+def renovar(usuario_id):
+    """
+    Heartbeat (ping del cliente): extiende la presencia. Si la clave ya
+    caducó se vuelve a registrar con una conexión.
+    """
+    if not settings.NOTIFICACIONES_PRESENCIA:
+        return
+    ttl = settings.NOTIFICACIONES_PRESENCIA_TTL
+    if not cache.touch(_clave(usuario_id), ttl):
+        cache.add(_clave(usuario_id), 1, ttl)
+
+
+def conectados(usuario_ids):
+    """Subconjunto de `usuario_ids` con alguna conexión abierta"""
+    usuario_ids = set(usuario_ids)
+    if not settings.NOTIFICACIONES_PRESENCIA or not usuario_ids:
+        return usuario_ids
+    claves = {_clave(usuario_id): usuario_id for usuario_id in usuario_ids}
+    return {claves[clave] for clave, valor in cache.get_many(list(claves)).items() if valor}
+
+
+def metricas():
+    valores = cache.get_many([_CLAVE_CONEXIONES, _CLAVE_USUARIOS])
+    return {
+        'presencia_activa': settings.NOTIFICACIONES_PRESENCIA,
+        'conexiones': valores.get(_CLAVE_CONEXIONES, 0),
+        'usuarios_conectados': valores.get(_CLAVE_USUARIOS, 0),
+    }
@@ -0,0 +1,73 @@
+"""
+Reenvío de notificaciones perdidas al reconectar el WebSocket.
+
+El cliente se conecta con ?since=<id de la última notificación recibida>
+(o una fecha ISO 8601) y el consumer le envía lo que se creó después, en
+orden (fecha_creacion, id) y en lotes acotados sobre usuario_fecha_idx,
+antes de pasar a recibir en vivo.
+"""
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.queryset.visitor import Q
+
+from notificaciones.models import Notificacion
+from notificaciones.websocket import evento_notificacion
+
+
+def decodificar_desde(valor):
+    """
+    Convierte el parámetro `since` en (fecha, id). Con un id la fecha se
+    resuelve después (resolver_desde); con una fecha el id es None.
+    Lanza ValueError si no es ninguno de los dos.
+    """
+    try:
+        return None, ObjectId(valor)
+    except (InvalidId, TypeError):
+        pass
+    fecha = datetime.fromisoformat(valor)
+    if fecha.tzinfo is not None:
+        # fecha_creacion se guarda en UTC sin zona horaria
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha, None
+
+
+def resolver_desde(usuario_id, desde):
+    """Completa la fecha de un cursor (None, id) con la de la notificación"""
+    fecha, ultimo_id = desde
+    if fecha is not None:
+        return desde
+    notificacion = Notificacion.objects(
+        id=ultimo_id, usuario_id=usuario_id
+    ).only('fecha_creacion').first()
+    if notificacion is not None:
+        return notificacion.fecha_creacion, ultimo_id
+    # Notificación ya eliminada: el ObjectId lleva su instante de creación
+    return ultimo_id.generation_time.replace(tzinfo=None), ultimo_id
+
+
+def siguiente_lote(usuario_id, desde, limite):
+    """
+    Notificaciones del usuario posteriores al cursor `desde`, como mensajes
+    ya codificados. Retorna (eventos, cursor del último, hay_mas).
+    """
+    fecha, ultimo_id = desde
+    if ultimo_id is None:
+        filtro = Q(fecha_creacion__gt=fecha)
+    else:
+        filtro = Q(fecha_creacion__gt=fecha) | Q(fecha_creacion=fecha, id__gt=ultimo_id)
+
+    notificaciones = list(
+        Notificacion.objects(usuario_id=usuario_id)
+        .filter(filtro)
+        .order_by('fecha_creacion', 'id')
+        .limit(limite + 1)
+    )
+    hay_mas = len(notificaciones) > limite
+    notificaciones = notificaciones[:limite]
+    if not notificaciones:
+        return [], desde, False
+
+    ultima = notificaciones[-1]
+    eventos = [evento_notificacion(notificacion) for notificacion in notificaciones]
+    return eventos, (ultima.fecha_creacion, ultima.id), hay_mas
@@ -3,3 +3,4 @@ from .inscripcion_signals import *
 from .resena_signals import *
 from .aviso_signals import *
 from .curso_signals import *
+from .contador_signals import *
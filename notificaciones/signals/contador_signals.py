@@ -0,0 +1,46 @@
+from collections import Counter
+from mongoengine.signals import post_save, post_delete, post_bulk_insert
+from notificaciones.models import Notificacion
+from notificaciones import contador
+import logging
+
+logger = logging.getLogger('notificaciones')
+
+
+def actualizar_contador_guardado(sender, document, created=False, **kwargs):
+    """
+    Ajusta el contador de no leídas al crear una notificación o al cambiar su
+    estado 'leida' (marcar_como_leida, PATCH). Las actualizaciones masivas
+    ajustan el contador en Notificacion.marcar_leidas.
+    """
+    try:
+        if created:
+            if not document.leida:
+                contador.ajustar(document.usuario_id, 1)
+        elif 'leida' in document._changed_fields:
+            contador.ajustar(document.usuario_id, -1 if document.leida else 1)
+    except Exception as e:
+        logger.error(f"Error al actualizar contador de notificaciones: {e}")
+
+
+def actualizar_contador_eliminado(sender, document, **kwargs):
+    try:
+        if not document.leida:
+            contador.ajustar(document.usuario_id, -1)
+    except Exception as e:
+        logger.error(f"Error al actualizar contador de notificaciones: {e}")
+
+
+def actualizar_contador_insercion_masiva(sender, documents, **kwargs):
+    """Ajusta los contadores tras Notificacion.objects.insert (fan-out masivo)"""
+    try:
+        deltas = Counter(documento.usuario_id for documento in documents if not documento.leida)
+        contador.ajustar_lote(deltas)
+    except Exception as e:
+        logger.error(f"Error al actualizar contadores de notificaciones: {e}")
+
+
+# Conectar signals de MongoEngine
+post_save.connect(actualizar_contador_guardado, sender=Notificacion)
+post_delete.connect(actualizar_contador_eliminado, sender=Notificacion)
+post_bulk_insert.connect(actualizar_contador_insercion_masiva, sender=Notificacion)
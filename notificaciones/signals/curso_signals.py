@@ -1,51 +1,49 @@
+from bson import ObjectId
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from cursos.models import Curso
-from inscripciones.models import Inscripcion
-from notificaciones.models import Notificacion
-from notificaciones.views.notificacion import NotificacionViewSet
+from notificaciones import dispatcher, tareas
 import sys
 
 
+def clave_curso_pendiente(curso_id):
+    return f'notificaciones:curso_actualizado:{curso_id}'
+
+
 @receiver(post_save, sender=Curso)
 def notificar_curso_actualizado(sender, instance, created, **kwargs):
     """
     Signal que se ejecuta al actualizar un curso.
-    Notifica a todos los estudiantes inscritos sobre la actualización.
+    Solo reacciona a cambios de contenido (Curso.CAMPOS_CONTENIDO): activar,
+    desactivar o cambiar el precio no notifica. Las ediciones dentro de la
+    ventana NOTIFICACIONES_CURSO_VENTANA se agrupan en una sola notificación
+    por estudiante, enviada al cerrarse la ventana.
     No notifica cuando el curso se crea por primera vez.
     """
     # Desactivar durante tests si no hay MongoDB disponible
     if 'test' in sys.argv:
         return
     
-    if not created:
-        # Obtener todas las inscripciones activas en este curso
-        inscripciones = Inscripcion.objects.filter(
-            curso=instance,
-            completado=False  # Solo notificar a quienes no han completado
-        ).select_related('usuario')
-        
-        # Crear notificación para cada estudiante inscrito
-        for inscripcion in inscripciones:
-            estudiante = inscripcion.usuario
-            
-            notificacion = Notificacion(
-                usuario_id=estudiante.id,
-                tipo='curso_actualizado',
-                titulo=f'Actualización en {instance.titulo}',
-                mensaje=f'El curso "{instance.titulo}" ha sido actualizado. Revisa el nuevo contenido.',
-                datos_extra={
-                    'curso_id': instance.id,
-                    'inscripcion_id': inscripcion.id,
-                    'instructor_id': instance.instructor.id,
-                    'accion': 'contenido_actualizado',
-                }
-            )
-            notificacion.save()
-            
-            # Enviar por WebSocket a cada estudiante
-            try:
-                viewset = NotificacionViewSet()
-                viewset._enviar_por_websocket(notificacion)
-            except Exception as e:
-                print(f"Error al enviar notificación al estudiante {estudiante.id}: {e}")
+    if created or not instance.tracker.changed():
+        return
+    
+    # Identifica esta actualización en las claves de sus notificaciones
+    evento = str(ObjectId())
+    ventana = settings.NOTIFICACIONES_CURSO_VENTANA
+    if not ventana:
+        dispatcher.encolar_al_confirmar(tareas.notificar_curso_actualizado, instance.id, evento)
+        return
+    
+    curso_id = instance.id
+    
+    def programar():
+        # La primera edición abre la ventana y programa el envío; las
+        # siguientes quedan incluidas (la tarea lee el curso al ejecutarse).
+        # La clave caduca sola si el trabajo diferido se pierde.
+        if cache.add(clave_curso_pendiente(curso_id), True, ventana * 2):
+            dispatcher.encolar(tareas.notificar_curso_actualizado_agrupado, curso_id, evento, retraso=ventana)
+    
+    transaction.on_commit(programar)
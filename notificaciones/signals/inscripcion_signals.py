@@ -1,9 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.conf import settings
 from inscripciones.models import Inscripcion
-from notificaciones.models import Notificacion
-from notificaciones.views.notificacion import NotificacionViewSet
+from notificaciones import dispatcher, tareas
 import sys
 import logging
 
@@ -14,136 +12,28 @@ logger = logging.getLogger('notificaciones')
 def notificar_nueva_inscripcion(sender, instance, created, **kwargs):
     """
     Signal que se ejecuta al crear una nueva inscripción.
-    Notifica tanto al instructor como al estudiante.
+    Encola la notificación al instructor y al estudiante (tareas.notificar_nueva_inscripcion).
     """
-    logger.info(f"[SIGNAL] notificar_nueva_inscripcion ejecutada. created={created}")
-    
     # Desactivar durante tests si no hay MongoDB disponible
     if 'test' in sys.argv:
-        logger.info("[SIGNAL] Señal desactivada durante tests")
         return
     
     if created:
-        try:
-            logger.info(f"[SIGNAL] Nueva inscripción detectada: ID={instance.id}")
-            curso = instance.curso
-            instructor = curso.instructor
-            estudiante = instance.usuario
-            
-            # 1. Notificación para el INSTRUCTOR
-            logger.info(f"[SIGNAL] Creando notificación para instructor ID={instructor.id}")
-            notificacion_instructor = Notificacion(
-                usuario_id=instructor.id,
-                tipo='nueva_inscripcion',
-                titulo=f'Nueva inscripción en {curso.titulo}',
-                mensaje=f'{estudiante.get_full_name() or estudiante.email} se ha inscrito en tu curso "{curso.titulo}".',
-                datos_extra={
-                    'inscripcion_id': instance.id,
-                    'curso_id': curso.id,
-                    'estudiante_id': estudiante.id,
-                    'estudiante_nombre': estudiante.get_full_name() or estudiante.email,
-                }
-            )
-            notificacion_instructor.save()
-            logger.info(f"[SIGNAL] ✓ Notificación instructor creada: {notificacion_instructor.id}")
-            
-            # Enviar por WebSocket al instructor
-            try:
-                viewset = NotificacionViewSet()
-                viewset._enviar_por_websocket(notificacion_instructor)
-            except Exception as e:
-                logger.error(f"Error al enviar notificación al instructor: {e}")
-            
-            # 2. Notificación de BIENVENIDA para el ESTUDIANTE
-            logger.info(f"[SIGNAL] Creando notificación para estudiante ID={estudiante.id}")
-            notificacion_estudiante = Notificacion(
-                usuario_id=estudiante.id,
-                tipo='nueva_inscripcion',
-                titulo=f'¡Bienvenido a {curso.titulo}!',
-                mensaje=f'Te has inscrito exitosamente en el curso "{curso.titulo}". ¡Comienza tu aprendizaje ahora!',
-                datos_extra={
-                    'inscripcion_id': instance.id,
-                    'curso_id': curso.id,
-                    'instructor_id': instructor.id,
-                    'instructor_nombre': instructor.get_full_name() or instructor.email,
-                    'accion': 'inscripcion_confirmada',
-                }
-            )
-            notificacion_estudiante.save()
-            logger.info(f"[SIGNAL] ✓ Notificación estudiante creada: {notificacion_estudiante.id}")
-            
-            # Enviar por WebSocket al estudiante
-            try:
-                viewset = NotificacionViewSet()
-                viewset._enviar_por_websocket(notificacion_estudiante)
-            except Exception as e:
-                logger.error(f"Error al enviar notificación al estudiante: {e}")
-        
-        except Exception as e:
-            logger.error(f"[SIGNAL] ✗ ERROR en notificar_nueva_inscripcion: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+        logger.info(f"[SIGNAL] Nueva inscripción detectada: ID={instance.id}")
+        dispatcher.encolar_al_confirmar(tareas.notificar_nueva_inscripcion, instance.id)
 
 
 @receiver(post_save, sender=Inscripcion)
 def notificar_curso_completado(sender, instance, created, **kwargs):
     """
     Signal que se ejecuta al actualizar una inscripción.
-    Si el curso se marca como completado, notifica al instructor y felicita al estudiante.
+    Si el curso se acaba de completar, encola la notificación al instructor
+    y la felicitación al estudiante (tareas.notificar_curso_completado).
     """
     # Desactivar durante tests si no hay MongoDB disponible
     if 'test' in sys.argv:
         return
     
-    if not created and instance.completado:
-        # Verificar si acaba de completarse (comparar con estado anterior)
-        if instance.tracker.has_changed('completado'):
-            curso = instance.curso
-            instructor = curso.instructor
-            estudiante = instance.usuario
-            
-            # 1. Notificación para el INSTRUCTOR
-            notificacion_instructor = Notificacion(
-                usuario_id=instructor.id,
-                tipo='curso_completado',
-                titulo=f'Curso completado: {curso.titulo}',
-                mensaje=f'{estudiante.get_full_name() or estudiante.email} ha completado tu curso "{curso.titulo}". ¡Felicitaciones!',
-                datos_extra={
-                    'inscripcion_id': instance.id,
-                    'curso_id': curso.id,
-                    'estudiante_id': estudiante.id,
-                    'estudiante_nombre': estudiante.get_full_name() or estudiante.email,
-                    'progreso': float(instance.progreso),
-                }
-            )
-            notificacion_instructor.save()
-            
-            # Enviar por WebSocket al instructor
-            try:
-                viewset = NotificacionViewSet()
-                viewset._enviar_por_websocket(notificacion_instructor)
-            except Exception as e:
-                logger.error(f"Error al enviar notificación al instructor: {e}")
-            
-            # 2. Notificación de FELICITACIÓN para el ESTUDIANTE
-            notificacion_estudiante = Notificacion(
-                usuario_id=estudiante.id,
-                tipo='curso_actualizado',
-                titulo=f'¡Felicitaciones! Completaste {curso.titulo}',
-                mensaje=f'Has completado exitosamente el curso "{curso.titulo}". ¡Excelente trabajo! Ahora puedes dejar una reseña.',
-                datos_extra={
-                    'inscripcion_id': instance.id,
-                    'curso_id': curso.id,
-                    'instructor_id': instructor.id,
-                    'progreso': float(instance.progreso),
-                    'accion': 'curso_completado',
-                }
-            )
-            notificacion_estudiante.save()
-            
-            # Enviar por WebSocket al estudiante
-            try:
-                viewset = NotificacionViewSet()
-                viewset._enviar_por_websocket(notificacion_estudiante)
-            except Exception as e:
-                logger.error(f"Error al enviar notificación al estudiante: {e}")
+    # Verificar si acaba de completarse (comparar con estado anterior)
+    if not created and instance.completado and instance.tracker.has_changed('completado'):
+        dispatcher.encolar_al_confirmar(tareas.notificar_curso_completado, instance.id)
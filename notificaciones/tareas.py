@@ -0,0 +1,371 @@
+"""
+Tareas del dispatcher de notificaciones.
+
+Reciben IDs (no instancias), cargan los datos, crean las notificaciones en
+MongoDB y las envían por WebSocket. Las encolan las señales de
+notificaciones/signals; se ejecutan fuera del ciclo de la petición.
+
+El dispatcher reintenta una tarea completa si falla, así que las que crean
+varias notificaciones les asignan una clave determinista (clave_notificacion):
+en el reintento las ya guardadas se omiten en lugar de duplicarse. Los
+fan-out masivos encolan además un trabajo por lote, y un fallo solo repite
+su lote.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from bson import ObjectId
+from mongoengine import signals
+from mongoengine.errors import NotUniqueError
+from pymongo.errors import BulkWriteError
+import logging
+
+from notificaciones.models import Notificacion
+from notificaciones.websocket import enviar_notificacion, enviar_notificaciones
+
+logger = logging.getLogger('notificaciones')
+
+User = get_user_model()
+
+
+def clave_notificacion(evento, objeto_id, usuario_id):
+    return f'{evento}:{objeto_id}:{usuario_id}'
+
+
+def _guardar_y_enviar(notificacion):
+    """
+    Guarda la notificación y la envía por WebSocket (un fallo del envío no se
+    reintenta). Devuelve None si ya existía una con la misma clave.
+    """
+    try:
+        notificacion.save(force_insert=True)
+    except NotUniqueError:
+        logger.info(f"[TAREA] Notificación {notificacion.clave} ya creada en un intento anterior")
+        return None
+    try:
+        enviar_notificacion(notificacion)
+    except Exception as e:
+        logger.error(f"Error al enviar notificación {notificacion.id} por WebSocket: {e}")
+    return notificacion
+
+
+def _insertar_y_enviar(notificaciones):
+    """
+    Inserta un lote de notificaciones con un único insert_many sin orden y
+    envía por WebSocket las insertadas en una sola pasada. Las que ya
+    existían (misma clave: reintento del lote) se omiten.
+    """
+    if not notificaciones:
+        return
+    documentos = [notificacion.to_mongo().to_dict() for notificacion in notificaciones]
+    rechazadas = set()
+    error = None
+    try:
+        Notificacion._get_collection().insert_many(documentos, ordered=False)
+    except BulkWriteError as exc:
+        errores = exc.details.get('writeErrors', [])
+        rechazadas = {fallo['index'] for fallo in errores}
+        if any(fallo.get('code') != 11000 for fallo in errores):
+            error = exc
+
+    # insert_many asigna _id a cada diccionario antes de enviarlo
+    insertadas = []
+    for indice, (notificacion, documento) in enumerate(zip(notificaciones, documentos)):
+        if indice not in rechazadas:
+            notificacion.id = documento['_id']
+            insertadas.append(notificacion)
+    if insertadas:
+        # Misma señal que Notificacion.objects.insert (contadores de no leídas)
+        signals.post_bulk_insert.send(Notificacion, documents=insertadas, loaded=False)
+        try:
+            enviar_notificaciones(insertadas)
+        except Exception as e:
+            logger.error(f"Error al enviar {len(insertadas)} notificaciones por WebSocket: {e}")
+    if error is not None:
+        raise error
+
+
+def notificar_nueva_inscripcion(inscripcion_id):
+    """
+    Nueva inscripción: notifica al instructor y da la bienvenida al estudiante.
+    """
+    from inscripciones.models import Inscripcion
+
+    try:
+        inscripcion = Inscripcion.objects.select_related('curso__instructor', 'usuario').get(id=inscripcion_id)
+    except Inscripcion.DoesNotExist:
+        logger.info(f"[TAREA] Inscripción {inscripcion_id} ya no existe")
+        return
+
+    curso = inscripcion.curso
+    instructor = curso.instructor
+    estudiante = inscripcion.usuario
+
+    # 1. Notificación para el INSTRUCTOR
+    notificacion_instructor = _guardar_y_enviar(Notificacion(
+        usuario_id=instructor.id,
+        clave=clave_notificacion('nueva_inscripcion', inscripcion.id, instructor.id),
+        tipo='nueva_inscripcion',
+        titulo=f'Nueva inscripción en {curso.titulo}',
+        mensaje=f'{estudiante.get_full_name() or estudiante.email} se ha inscrito en tu curso "{curso.titulo}".',
+        datos_extra={
+            'inscripcion_id': inscripcion.id,
+            'curso_id': curso.id,
+            'estudiante_id': estudiante.id,
+            'estudiante_nombre': estudiante.get_full_name() or estudiante.email,
+        }
+    ))
+    if notificacion_instructor:
+        logger.info(f"[TAREA] ✓ Notificación instructor creada: {notificacion_instructor.id}")
+
+    # 2. Notificación de BIENVENIDA para el ESTUDIANTE
+    notificacion_estudiante = _guardar_y_enviar(Notificacion(
+        usuario_id=estudiante.id,
+        clave=clave_notificacion('nueva_inscripcion', inscripcion.id, estudiante.id),
+        tipo='nueva_inscripcion',
+        titulo=f'¡Bienvenido a {curso.titulo}!',
+        mensaje=f'Te has inscrito exitosamente en el curso "{curso.titulo}". ¡Comienza tu aprendizaje ahora!',
+        datos_extra={
+            'inscripcion_id': inscripcion.id,
+            'curso_id': curso.id,
+            'instructor_id': instructor.id,
+            'instructor_nombre': instructor.get_full_name() or instructor.email,
+            'accion': 'inscripcion_confirmada',
+        }
+    ))
+    if notificacion_estudiante:
+        logger.info(f"[TAREA] ✓ Notificación estudiante creada: {notificacion_estudiante.id}")
+
+
+def notificar_curso_completado(inscripcion_id):
+    """
+    Curso completado: notifica al instructor y felicita al estudiante.
+    """
+    from inscripciones.models import Inscripcion
+
+    try:
+        inscripcion = Inscripcion.objects.select_related('curso__instructor', 'usuario').get(id=inscripcion_id)
+    except Inscripcion.DoesNotExist:
+        logger.info(f"[TAREA] Inscripción {inscripcion_id} ya no existe")
+        return
+
+    curso = inscripcion.curso
+    instructor = curso.instructor
+    estudiante = inscripcion.usuario
+
+    # 1. Notificación para el INSTRUCTOR
+    _guardar_y_enviar(Notificacion(
+        usuario_id=instructor.id,
+        clave=clave_notificacion('curso_completado', inscripcion.id, instructor.id),
+        tipo='curso_completado',
+        titulo=f'Curso completado: {curso.titulo}',
+        mensaje=f'{estudiante.get_full_name() or estudiante.email} ha completado tu curso "{curso.titulo}". ¡Felicitaciones!',
+        datos_extra={
+            'inscripcion_id': inscripcion.id,
+            'curso_id': curso.id,
+            'estudiante_id': estudiante.id,
+            'estudiante_nombre': estudiante.get_full_name() or estudiante.email,
+            'progreso': float(inscripcion.progreso),
+        }
+    ))
+
+    # 2. Notificación de FELICITACIÓN para el ESTUDIANTE
+    _guardar_y_enviar(Notificacion(
+        usuario_id=estudiante.id,
+        clave=clave_notificacion('curso_completado', inscripcion.id, estudiante.id),
+        tipo='curso_actualizado',
+        titulo=f'¡Felicitaciones! Completaste {curso.titulo}',
+        mensaje=f'Has completado exitosamente el curso "{curso.titulo}". ¡Excelente trabajo! Ahora puedes dejar una reseña.',
+        datos_extra={
+            'inscripcion_id': inscripcion.id,
+            'curso_id': curso.id,
+            'instructor_id': instructor.id,
+            'progreso': float(inscripcion.progreso),
+            'accion': 'curso_completado',
+        }
+    ))
+
+
+def notificar_nuevo_aviso(aviso_id):
+    """
+    Nuevo aviso: notifica al usuario destinatario.
+    """
+    from avisos.models import Aviso
+
+    try:
+        aviso = Aviso.objects.get(id=aviso_id)
+    except Aviso.DoesNotExist:
+        logger.info(f"[TAREA] Aviso {aviso_id} ya no existe")
+        return
+
+    _guardar_y_enviar(Notificacion(
+        usuario_id=aviso.usuario_id,
+        tipo='aviso_nuevo',
+        titulo=f'Nuevo aviso: {aviso.titulo}',
+        mensaje=f'{aviso.descripcion[:200]}...' if len(aviso.descripcion) > 200 else aviso.descripcion,
+        datos_extra={
+            'aviso_id': aviso.id,
+            'titulo': aviso.titulo,
+            'descripcion': aviso.descripcion,
+            'tipo_aviso': aviso.tipo,
+            'fecha_envio': aviso.fecha_envio.isoformat() if aviso.fecha_envio else None,
+        }
+    ))
+
+
+def notificar_curso_actualizado(curso_id, evento=None):
+    """
+    Curso actualizado: notifica a los estudiantes inscritos que no lo han completado.
+    Reparte las inscripciones en lotes de NOTIFICACIONES_FANOUT_LOTE y encola
+    un trabajo por lote. `evento` identifica la actualización en las claves
+    de las notificaciones; lo fija quien encola la tarea para que un
+    reintento no genere otra actualización.
+    """
+    from cursos.models import Curso
+    from inscripciones.models import Inscripcion
+    from notificaciones import dispatcher
+
+    if not Curso.objects.filter(id=curso_id).exists():
+        logger.info(f"[TAREA] Curso {curso_id} ya no existe")
+        return
+
+    evento = evento or str(ObjectId())
+    inscripciones = Inscripcion.objects.filter(
+        curso_id=curso_id,
+        completado=False  # Solo notificar a quienes no han completado
+    ).values_list('id', flat=True)
+
+    tamano_lote = max(settings.NOTIFICACIONES_FANOUT_LOTE, 1)
+    lote = []
+    for inscripcion_id in inscripciones.iterator(chunk_size=tamano_lote):
+        lote.append(inscripcion_id)
+        if len(lote) >= tamano_lote:
+            dispatcher.encolar(notificar_curso_actualizado_lote, curso_id, evento, lote)
+            lote = []
+    if lote:
+        dispatcher.encolar(notificar_curso_actualizado_lote, curso_id, evento, lote)
+
+
+def notificar_curso_actualizado_lote(curso_id, evento, inscripcion_ids):
+    """
+    Un lote del fan-out de curso_actualizado: un insert_many y un envío
+    agrupado. Si se reintenta, las notificaciones ya insertadas se omiten.
+    """
+    from cursos.models import Curso
+    from inscripciones.models import Inscripcion
+
+    try:
+        curso = Curso.objects.get(id=curso_id)
+    except Curso.DoesNotExist:
+        logger.info(f"[TAREA] Curso {curso_id} ya no existe")
+        return
+
+    inscripciones = Inscripcion.objects.filter(
+        id__in=inscripcion_ids,
+        curso_id=curso_id,
+        completado=False
+    ).values_list('id', 'usuario_id')
+
+    _insertar_y_enviar([
+        Notificacion(
+            usuario_id=estudiante_id,
+            clave=clave_notificacion(f'curso_actualizado.{evento}', inscripcion_id, estudiante_id),
+            tipo='curso_actualizado',
+            titulo=f'Actualización en {curso.titulo}',
+            mensaje=f'El curso "{curso.titulo}" ha sido actualizado. Revisa el nuevo contenido.',
+            datos_extra={
+                'curso_id': curso.id,
+                'inscripcion_id': inscripcion_id,
+                'instructor_id': curso.instructor_id,
+                'accion': 'contenido_actualizado',
+            }
+        )
+        for inscripcion_id, estudiante_id in inscripciones
+    ])
+
+
+def notificar_curso_actualizado_agrupado(curso_id, evento=None):
+    """
+    Cierre de la ventana de agrupación de ediciones de un curso
+    (signals/curso_signals.py): libera la ventana y notifica una vez.
+    """
+    from django.core.cache import cache
+    from notificaciones.signals.curso_signals import clave_curso_pendiente
+
+    cache.delete(clave_curso_pendiente(curso_id))
+    notificar_curso_actualizado(curso_id, evento)
+
+
+def notificar_nueva_resena(resena_id):
+    """
+    Nueva reseña: notifica al instructor del curso.
+    """
+    from cursos.models import Curso
+    from resenas.models import Resena
+
+    resena = Resena.objects(id=resena_id).first()
+    if resena is None:
+        logger.info(f"[TAREA] Reseña {resena_id} ya no existe")
+        return
+
+    try:
+        curso = Curso.objects.select_related('instructor').get(id=resena.curso_id)
+        usuario = User.objects.get(id=resena.usuario_id)
+    except (Curso.DoesNotExist, User.DoesNotExist):
+        logger.info(f"[TAREA] Curso o usuario de la reseña {resena_id} ya no existe")
+        return
+
+    # Obtener nombre del usuario
+    nombre_usuario = usuario.get_full_name() or usuario.email
+
+    _guardar_y_enviar(Notificacion(
+        usuario_id=curso.instructor_id,
+        tipo='nueva_resena',
+        titulo=f'Nueva reseña en {curso.titulo}',
+        mensaje=f'{nombre_usuario} dejó una reseña de {resena.rating} estrellas en tu curso "{curso.titulo}": "{resena.comentario[:100]}..."',
+        datos_extra={
+            'resena_id': str(resena.id),
+            'curso_id': curso.id,
+            'usuario_id': usuario.id,
+            'rating': float(resena.rating),
+            'titulo': resena.titulo,
+            'comentario': resena.comentario[:200],
+        }
+    ))
+
+
+def notificar_respuesta_resena(resena_id):
+    """
+    Respuesta a una reseña: si la última respuesta no es del autor, le notifica.
+    """
+    from cursos.models import Curso
+    from resenas.models import Resena
+
+    resena = Resena.objects(id=resena_id).first()
+    if resena is None or not resena.respuestas:
+        return
+
+    # Obtener la última respuesta
+    ultima_respuesta = resena.respuestas[-1]
+
+    # Solo notificar si la respuesta es del instructor (no del mismo usuario)
+    if ultima_respuesta.usuario_id == resena.usuario_id:
+        return
+
+    try:
+        curso = Curso.objects.get(id=resena.curso_id)
+    except Curso.DoesNotExist:
+        return
+
+    _guardar_y_enviar(Notificacion(
+        usuario_id=resena.usuario_id,
+        tipo='respuesta_resena',
+        titulo=f'Respuesta a tu reseña en {curso.titulo}',
+        mensaje=f'El instructor de "{curso.titulo}" respondió a tu reseña: "{ultima_respuesta.texto[:100]}..."',
+        datos_extra={
+            'resena_id': str(resena.id),
+            'curso_id': curso.id,
+            'instructor_id': curso.instructor_id,
+            'respuesta': ultima_respuesta.texto,
+            'fecha_respuesta': ultima_respuesta.fecha.isoformat() if hasattr(ultima_respuesta.fecha, 'isoformat') else str(ultima_respuesta.fecha),
+        }
+    ))
@@ -1,3 +1,649 @@
-from django.test import TestCase
+import asyncio
+import sys
+import time
+import msgpack
+import ujson
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from datetime import datetime
+from unittest import mock
+from bson import ObjectId
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from curso_online_project.pruebas_mongo import MongoMockMixin
+from cursos.models import Curso
+from inscripciones.models import Inscripcion
+from notificaciones import contador, presencia, tareas
+from notificaciones import dispatcher as dispatcher_modulo
+from notificaciones.dispatcher import BaseBackend, HilosBackend, SincronoBackend, Trabajo
+from notificaciones.consumers import NotificacionConsumer
+from notificaciones.layers import ShardedInMemoryChannelLayer
+from notificaciones.models import Notificacion
+from notificaciones.reenvio import decodificar_desde
+from notificaciones.signals.curso_signals import clave_curso_pendiente
+from notificaciones.websocket import SUBPROTOCOLO_MSGPACK, codificar, enviar_notificaciones, nombre_grupo
 
-# Create your tests here.
+User = get_user_model()
+
+# Registro de llamadas de las tareas de prueba
+LLAMADAS = []
+
+
+def tarea_de_prueba(valor):
+    LLAMADAS.append(valor)
+
+
+def tarea_que_falla(valor, fallos):
+    LLAMADAS.append(valor)
+    if LLAMADAS.count(valor) <= fallos:
+        raise RuntimeError('fallo de prueba')
+
+
+class BackendDePrueba(HilosBackend):
+    """Guarda los descartados en memoria en lugar de MongoDB"""
+
+    def __init__(self, **opciones):
+        super().__init__(**opciones)
+        self.descartados = []
+
+    def descartar(self, trabajo, error):
+        self.descartados.append((trabajo, str(error)))
+
+
+class DispatcherTest(SimpleTestCase):
+    """Dispatcher en segundo plano de notificaciones"""
+
+    def setUp(self):
+        LLAMADAS.clear()
+
+    def _trabajo(self, tarea, *args):
+        return Trabajo(f'notificaciones.tests.{tarea}', args)
+
+    def test_pool_de_hilos_ejecuta_los_trabajos(self):
+        backend = BackendDePrueba(workers=2)
+        for valor in range(10):
+            backend.encolar(self._trabajo('tarea_de_prueba', valor))
+        backend.esperar()
+        backend.detener()
+
+        self.assertEqual(sorted(LLAMADAS), list(range(10)))
+
+    def test_reintenta_y_descarta(self):
+        backend = BackendDePrueba(workers=1, reintentos=2, espera_reintento=0.01)
+        backend.encolar(self._trabajo('tarea_que_falla', 'a', 1))
+        backend.encolar(self._trabajo('tarea_que_falla', 'b', 10))
+        for _ in range(200):
+            if LLAMADAS.count('b') == 3 and backend.descartados:
+                break
+            time.sleep(0.01)
+        backend.detener()
+
+        self.assertEqual(LLAMADAS.count('a'), 2)
+        self.assertEqual(LLAMADAS.count('b'), 3)
+        self.assertEqual([trabajo.args[0] for trabajo, _ in backend.descartados], ['b'])
+
+    def test_backend_sincrono(self):
+        SincronoBackend().encolar(self._trabajo('tarea_de_prueba', 'x'))
+        self.assertEqual(LLAMADAS, ['x'])
+
+
+class BackendIncompletoTest(SimpleTestCase):
+    """Los backends deben implementar encolar()"""
+
+    def test_sin_encolar_falla_al_instanciar(self):
+        class SinEncolar(BaseBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            SinEncolar()
+
+
+class ReenvioTest(SimpleTestCase):
+    """Parámetro since del reenvío al reconectar el WebSocket"""
+
+    def test_since_con_id(self):
+        ultimo_id = ObjectId()
+        self.assertEqual(decodificar_desde(str(ultimo_id)), (None, ultimo_id))
+
+    def test_since_con_fecha_se_normaliza_a_utc(self):
+        self.assertEqual(
+            decodificar_desde('2025-01-10T12:00:00-05:00'),
+            (datetime(2025, 1, 10, 17, 0), None)
+        )
+
+    def test_since_invalido(self):
+        with self.assertRaises(ValueError):
+            decodificar_desde('ayer')
+
+
+@override_settings(NOTIFICACIONES_PRESENCIA=True, NOTIFICACIONES_PRESENCIA_TTL=60)
+class PresenciaTest(SimpleTestCase):
+    """Registro de conexiones WebSocket abiertas por usuario"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_conectar_y_desconectar(self):
+        presencia.conectar(1)
+        presencia.conectar(1)
+        presencia.conectar(2)
+        self.assertEqual(presencia.conectados([1, 2, 3]), {1, 2})
+        self.assertEqual(presencia.metricas()['conexiones'], 3)
+        self.assertEqual(presencia.metricas()['usuarios_conectados'], 2)
+
+        presencia.desconectar(1)
+        self.assertEqual(presencia.conectados([1, 2]), {1, 2})
+        presencia.desconectar(1)
+        self.assertEqual(presencia.conectados([1, 2]), {2})
+        self.assertEqual(presencia.metricas()['usuarios_conectados'], 1)
+
+    def test_ping_vuelve_a_registrar_una_presencia_caducada(self):
+        presencia.conectar(1)
+        cache.delete(presencia._clave(1))
+        self.assertEqual(presencia.conectados([1]), set())
+        presencia.renovar(1)
+        self.assertEqual(presencia.conectados([1]), {1})
+
+    @override_settings(NOTIFICACIONES_PRESENCIA=False)
+    def test_desactivada_considera_a_todos_conectados(self):
+        self.assertEqual(presencia.conectados([1, 2]), {1, 2})
+
+
+
+@override_settings(
+    NOTIFICACIONES_PRESENCIA=True,
+    NOTIFICACIONES_PRESENCIA_TTL=60,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+class EnvioConPresenciaTest(MongoMockMixin, SimpleTestCase):
+    """Los envíos por WebSocket omiten a los usuarios sin conexión"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        presencia.conectar(1)
+
+    def _recibir(self, enviar):
+        """Ejecuta `enviar` con un canal en el grupo de los usuarios 1 y 2; devuelve lo recibido por cada uno"""
+        capa = get_channel_layer()
+
+        async def ejecutar():
+            canales = {}
+            for usuario_id in (1, 2):
+                canales[usuario_id] = await capa.new_channel()
+                await capa.group_add(nombre_grupo(usuario_id), canales[usuario_id])
+            await sync_to_async(enviar)()
+            recibidos = {}
+            for usuario_id, canal in canales.items():
+                try:
+                    recibidos[usuario_id] = await asyncio.wait_for(capa.receive(canal), 0.1)
+                except asyncio.TimeoutError:
+                    recibidos[usuario_id] = None
+            return recibidos
+
+        return async_to_sync(ejecutar)()
+
+    def test_enviar_notificaciones(self):
+        notificaciones = []
+        for usuario_id in (1, 2):
+            notificacion = Notificacion(usuario_id=usuario_id, tipo='mensaje_sistema', titulo='t', mensaje='m')
+            notificacion.save()
+            notificaciones.append(notificacion)
+
+        recibidos = self._recibir(lambda: enviar_notificaciones(notificaciones))
+
+        self.assertEqual(recibidos[1]['type'], 'notificacion_mensaje')
+        self.assertEqual(recibidos[1]['id'], str(notificaciones[0].id))
+        self.assertIsNone(recibidos[2])
+
+    def test_publicar_contadores(self):
+        recibidos = self._recibir(lambda: contador.publicar_contadores({1: 3, 2: 5}))
+
+        self.assertEqual(recibidos[1]['type'], 'contador_actualizado')
+        self.assertEqual(ujson.loads(recibidos[1]['texto']), {'tipo': 'contador', 'no_leidas': 3})
+        self.assertIsNone(recibidos[2])
+
+    @override_settings(NOTIFICACIONES_PRESENCIA=False)
+    def test_sin_presencia_envia_a_todos(self):
+        recibidos = self._recibir(lambda: contador.publicar_contadores({1: 3, 2: 5}))
+        self.assertIsNotNone(recibidos[1])
+        self.assertIsNotNone(recibidos[2])
+
+
+class ShardedChannelLayerTest(SimpleTestCase):
+    """Capa en memoria repartida en shards (stand-in de varios Redis)"""
+
+    def test_group_send_entrega_en_el_shard_de_cada_canal(self):
+        capa = ShardedInMemoryChannelLayer(shards=4)
+
+        async def enviar_y_recibir():
+            canales = {}
+            for usuario_id in range(1, 21):
+                canal = await capa.new_channel()
+                await capa.group_add(f'notificaciones_user_{usuario_id}', canal)
+                canales[usuario_id] = canal
+            for usuario_id in canales:
+                await capa.group_send(f'notificaciones_user_{usuario_id}', {'type': 'prueba', 'usuario': usuario_id})
+            return {usuario_id: (await capa.receive(canal))['usuario'] for usuario_id, canal in canales.items()}
+
+        recibidos = async_to_sync(enviar_y_recibir)()
+        self.assertEqual(recibidos, {usuario_id: usuario_id for usuario_id in range(1, 21)})
+
+        estadisticas = capa.estadisticas()
+        self.assertEqual(sum(shard['grupos'] for shard in estadisticas), 20)
+        self.assertEqual(sum(shard['mensajes'] for shard in estadisticas), 20)
+        self.assertGreater(len([shard for shard in estadisticas if shard['grupos']]), 1)
+
+
+class NotificacionPaginacionTest(MongoMockMixin, APITestCase):
+    """Paginación por cursor de GET /api/notificaciones/"""
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user(
+            username='estudiante', email='estudiante@example.com', password='testpass123'
+        )
+        self.client.force_authenticate(self.usuario)
+        # Varias con la misma fecha: el desempate es el id
+        fecha = datetime(2025, 1, 31, 12)
+        self.ids = []
+        for i in range(5):
+            notificacion = Notificacion(
+                usuario_id=self.usuario.id,
+                tipo='mensaje_sistema',
+                titulo=f'Notificación {i}',
+                mensaje='Mensaje',
+                fecha_creacion=fecha if i < 4 else datetime(2025, 1, 30),
+            )
+            notificacion.save()
+            self.ids.append(str(notificacion.id))
+        Notificacion(usuario_id=self.usuario.id + 1, tipo='mensaje_sistema', titulo='Ajena', mensaje='m').save()
+
+    def test_recorre_todas_sin_duplicados_ni_saltos(self):
+        vistos = []
+        url = '/api/notificaciones/?page_size=2'
+        paginas = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            vistos += [notificacion['id'] for notificacion in response.data['results']]
+            url = response.data['next']
+            paginas += 1
+
+        self.assertEqual(paginas, 3)
+        # Mismas fechas en orden de id descendente y después la más antigua
+        self.assertEqual(vistos, self.ids[3::-1] + [self.ids[4]])
+
+    def test_forma_de_la_respuesta(self):
+        response = self.client.get('/api/notificaciones/', {'page_size': 2})
+        self.assertEqual(set(response.data), {'next', 'results'})
+
+        response = self.client.get('/api/notificaciones/', {'page_size': 2, 'count': 'true'})
+        self.assertEqual(response.data['count'], 5)
+        # El total no se vuelve a pedir en las páginas siguientes
+        self.assertNotIn('count=', response.data['next'])
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/notificaciones/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MarcarLeidasTest(MongoMockMixin, APITestCase):
+    """Marcado masivo de notificaciones y su efecto en los contadores"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.usuario = User.objects.create_user(
+            username='estudiante', email='estudiante@example.com', password='testpass123'
+        )
+        self.otro = User.objects.create_user(
+            username='otro', email='otro@example.com', password='testpass123'
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='testpass123', perfil='administrador'
+        )
+        self.propias = [self._crear(self.usuario) for _ in range(3)]
+        self.ajenas = [self._crear(self.otro) for _ in range(2)]
+
+    def _crear(self, usuario):
+        notificacion = Notificacion(usuario_id=usuario.id, tipo='mensaje_sistema', titulo='t', mensaje='m')
+        notificacion.save()
+        return notificacion
+
+    def test_por_ids_solo_marca_las_propias(self):
+        self.client.force_authenticate(self.usuario)
+        ids = [str(self.propias[0].id), str(self.propias[1].id), str(self.ajenas[0].id)]
+
+        response = self.client.post('/api/notificaciones/marcar_leidas/', {'ids': ids}, format='json')
+
+        self.assertEqual(response.data['total'], 2)
+        self.assertFalse(Notificacion.objects.get(id=self.ajenas[0].id).leida)
+        self.assertEqual(self.client.get('/api/notificaciones/contador/').data['no_leidas'], 1)
+
+    def test_ids_invalidos(self):
+        self.client.force_authenticate(self.usuario)
+        response = self.client.post('/api/notificaciones/marcar_leidas/', {'ids': ['x']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/notificaciones/marcar_leidas/', {'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_descarta_los_contadores_afectados(self):
+        self.assertEqual(contador.obtener(self.usuario.id), 3)
+        self.assertEqual(contador.obtener(self.otro.id), 2)
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.post('/api/notificaciones/marcar_todas_leidas/')
+
+        self.assertEqual(response.data['total'], 5)
+        self.assertIsNone(cache.get(contador._clave(self.usuario.id)))
+        self.assertIsNone(cache.get(contador._clave(self.otro.id)))
+        self.assertEqual(contador.obtener(self.usuario.id), 0)
+        self.assertEqual(contador.obtener(self.otro.id), 0)
+
+
+class ContadorNoLeidasTest(MongoMockMixin, SimpleTestCase):
+    """Contador de no leídas en caché mantenido por las señales"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _crear(self, usuario_id=1, leida=False):
+        notificacion = Notificacion(usuario_id=usuario_id, tipo='mensaje_sistema', titulo='t', mensaje='m', leida=leida)
+        notificacion.save()
+        return notificacion
+
+    def test_crear_incrementa(self):
+        self._crear()
+        self._crear()
+        self._crear(leida=True)
+        self.assertEqual(cache.get(contador._clave(1)), 2)
+
+    def test_leer_y_eliminar_decrementan(self):
+        primera, segunda, tercera = self._crear(), self._crear(), self._crear()
+        primera.marcar_como_leida()
+        segunda.delete()
+        self.assertEqual(contador.obtener(1), 1)
+        # Eliminar una ya leída no vuelve a restar
+        primera.delete()
+        self.assertEqual(contador.obtener(1), 1)
+
+    def test_sin_clave_reconcilia_con_count(self):
+        self._crear()
+        self._crear()
+        cache.delete(contador._clave(1))
+        self.assertEqual(contador.obtener(1), 2)
+        self.assertEqual(cache.get(contador._clave(1)), 2)
+
+    def test_nunca_negativo(self):
+        self._crear()
+        cache.set(contador._clave(1), 0)
+        self.assertEqual(contador.ajustar(1, -5), 1)
+
+    def test_lote_solo_ajusta_contadores_en_cache(self):
+        self._crear(usuario_id=1)
+        Notificacion.objects.insert([
+            Notificacion(usuario_id=usuario_id, tipo='mensaje_sistema', titulo='t', mensaje='m')
+            for usuario_id in (1, 1, 2)
+        ])
+        self.assertEqual(cache.get(contador._clave(1)), 3)
+        self.assertIsNone(cache.get(contador._clave(2)))
+        self.assertEqual(contador.obtener(2), 1)
+
+
+class TareasIdempotentesTest(MongoMockMixin, TestCase):
+    """Reintentos de las tareas que crean varias notificaciones"""
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = User.objects.create_user(
+            username='instructor', email='instructor@example.com', password='testpass123', perfil='instructor'
+        )
+        self.estudiante = User.objects.create_user(
+            username='estudiante', email='estudiante@example.com', password='testpass123'
+        )
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=self.instructor,
+            precio=10
+        )
+        self.inscripcion = Inscripcion.objects.create(usuario=self.estudiante, curso=self.curso)
+
+    def test_reintento_no_duplica_las_ya_creadas(self):
+        tareas.notificar_nueva_inscripcion(self.inscripcion.id)
+        # Primer intento interrumpido antes de la bienvenida del estudiante
+        Notificacion.objects(usuario_id=self.estudiante.id).delete()
+
+        tareas.notificar_nueva_inscripcion(self.inscripcion.id)
+
+        self.assertEqual(Notificacion.objects(usuario_id=self.instructor.id).count(), 1)
+        self.assertEqual(Notificacion.objects(usuario_id=self.estudiante.id).count(), 1)
+
+    def test_claves_por_evento_y_destinatario(self):
+        tareas.notificar_nueva_inscripcion(self.inscripcion.id)
+        tareas.notificar_curso_completado(self.inscripcion.id)
+        tareas.notificar_curso_completado(self.inscripcion.id)
+
+        self.assertEqual(
+            sorted(Notificacion.objects.scalar('clave')),
+            sorted([
+                f'{evento}:{self.inscripcion.id}:{usuario.id}'
+                for evento in ('nueva_inscripcion', 'curso_completado')
+                for usuario in (self.instructor, self.estudiante)
+            ])
+        )
+
+
+class BackendEnMemoria(BaseBackend):
+    """Guarda los trabajos encolados para ejecutarlos desde el test"""
+
+    def __init__(self):
+        super().__init__()
+        self.trabajos = []
+        self.retrasos = []
+
+    def encolar(self, trabajo, retraso=0):
+        self.trabajos.append(trabajo)
+        self.retrasos.append(retraso)
+
+
+class FanoutCursoActualizadoTest(MongoMockMixin, TestCase):
+    """Fan-out de curso_actualizado en un trabajo por lote"""
+
+    def setUp(self):
+        super().setUp()
+        instructor = User.objects.create_user(
+            username='instructor', email='instructor@example.com', password='testpass123', perfil='instructor'
+        )
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=instructor,
+            precio=10
+        )
+        for i in range(6):
+            estudiante = User.objects.create_user(
+                username=f'estudiante{i}', email=f'estudiante{i}@example.com', password='testpass123'
+            )
+            # El último ya completó el curso y no se notifica
+            Inscripcion.objects.create(usuario=estudiante, curso=self.curso, completado=i == 5)
+        self.dispatcher_original = dispatcher_modulo._dispatcher
+        self.backend = dispatcher_modulo._dispatcher = BackendEnMemoria()
+
+    def tearDown(self):
+        dispatcher_modulo._dispatcher = self.dispatcher_original
+        super().tearDown()
+
+    @override_settings(NOTIFICACIONES_FANOUT_LOTE=2)
+    def test_un_trabajo_por_lote(self):
+        tareas.notificar_curso_actualizado(self.curso.id, 'evento-1')
+
+        self.assertEqual([len(trabajo.args[2]) for trabajo in self.backend.trabajos], [2, 2, 1])
+        self.assertEqual({trabajo.args[1] for trabajo in self.backend.trabajos}, {'evento-1'})
+        for trabajo in self.backend.trabajos:
+            trabajo.ejecutar()
+        self.assertEqual(Notificacion.objects(tipo='curso_actualizado').count(), 5)
+
+    @override_settings(NOTIFICACIONES_FANOUT_LOTE=2)
+    def test_reintento_de_un_lote_no_duplica(self):
+        tareas.notificar_curso_actualizado(self.curso.id, 'evento-1')
+        primero = self.backend.trabajos[0]
+        primero.ejecutar()
+        # Lote interrumpido a medias: falta una de sus notificaciones
+        Notificacion.objects(usuario_id=Notificacion.objects.first().usuario_id).delete()
+
+        primero.ejecutar()
+
+        self.assertEqual(Notificacion.objects.count(), 2)
+
+    @override_settings(NOTIFICACIONES_FANOUT_LOTE=0)
+    def test_lote_no_positivo_usa_lotes_de_uno(self):
+        tareas.notificar_curso_actualizado(self.curso.id, 'evento-1')
+        self.assertEqual([len(trabajo.args[2]) for trabajo in self.backend.trabajos], [1] * 5)
+
+    def test_cada_actualizacion_notifica_de_nuevo(self):
+        for evento in ('evento-1', 'evento-2'):
+            tareas.notificar_curso_actualizado(self.curso.id, evento)
+        for trabajo in self.backend.trabajos:
+            trabajo.ejecutar()
+        self.assertEqual(Notificacion.objects.count(), 10)
+
+
+
+@override_settings(NOTIFICACIONES_CURSO_VENTANA=600)
+class AgrupacionCursoActualizadoTest(TestCase):
+    """Ventana de agrupación de las ediciones de un curso (signals/curso_signals.py)"""
+
+    def setUp(self):
+        instructor = User.objects.create_user(
+            username='instructor', email='instructor@example.com', password='testpass123', perfil='instructor'
+        )
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=instructor,
+            precio=10
+        )
+        cache.delete(clave_curso_pendiente(self.curso.id))
+        self.dispatcher_original = dispatcher_modulo._dispatcher
+        self.backend = dispatcher_modulo._dispatcher = BackendEnMemoria()
+        # La señal no actúa con 'test' en sys.argv
+        parche = mock.patch.object(sys, 'argv', ['manage.py'])
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def tearDown(self):
+        dispatcher_modulo._dispatcher = self.dispatcher_original
+        cache.delete(clave_curso_pendiente(self.curso.id))
+
+    def _guardar(self, **campos):
+        for campo, valor in campos.items():
+            setattr(self.curso, campo, valor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curso.save()
+
+    def test_ediciones_en_la_ventana_encolan_un_trabajo(self):
+        self._guardar(titulo='Curso de Python 3')
+        self._guardar(descripcion='Actualizado')
+        self._guardar(nivel='intermedio')
+
+        self.assertEqual(
+            [trabajo.tarea for trabajo in self.backend.trabajos],
+            ['notificaciones.tareas.notificar_curso_actualizado_agrupado']
+        )
+        self.assertEqual(self.backend.retrasos, [600])
+        self.assertEqual(self.backend.trabajos[0].args[0], self.curso.id)
+
+    def test_cambios_sin_contenido_no_encolan(self):
+        self._guardar(activo=False)
+        self._guardar(precio=20)
+        self.assertEqual(self.backend.trabajos, [])
+        self.assertIsNone(cache.get(clave_curso_pendiente(self.curso.id)))
+
+    def test_el_trabajo_libera_la_ventana(self):
+        self._guardar(titulo='Curso de Python 3')
+        agrupado = self.backend.trabajos.pop()
+
+        agrupado.ejecutar()
+
+        self.assertIsNone(cache.get(clave_curso_pendiente(self.curso.id)))
+        # Sin estudiantes no hay lotes; la siguiente edición abre otra ventana
+        self._guardar(titulo='Curso de Python 4')
+        self.assertEqual(
+            [trabajo.tarea for trabajo in self.backend.trabajos],
+            ['notificaciones.tareas.notificar_curso_actualizado_agrupado']
+        )
+
+    @override_settings(NOTIFICACIONES_CURSO_VENTANA=0)
+    def test_sin_ventana_notifica_cada_edicion(self):
+        self._guardar(titulo='Curso de Python 3')
+        self._guardar(titulo='Curso de Python 4')
+        self.assertEqual(
+            [trabajo.tarea for trabajo in self.backend.trabajos],
+            ['notificaciones.tareas.notificar_curso_actualizado'] * 2
+        )
+        self.assertNotEqual(self.backend.trabajos[0].args[1], self.backend.trabajos[1].args[1])
+
+
+class CodificacionWebSocketTest(MongoMockMixin, SimpleTestCase):
+    """Frames JSON/msgpack y negociación del subprotocolo"""
+
+    datos = {'tipo': 'notificacion', 'data': {'titulo': 'Reseña en "Año 1"', 'url': '/cursos/1/'}}
+
+    def test_solo_json_sin_msgpack(self):
+        with override_settings(NOTIFICACIONES_WS_MSGPACK=False):
+            frames = codificar(self.datos)
+        self.assertEqual(set(frames), {'texto'})
+        self.assertEqual(ujson.loads(frames['texto']), self.datos)
+        # Sin escapar no-ASCII ni barras
+        self.assertIn('Año', frames['texto'])
+        self.assertIn('/cursos/1/', frames['texto'])
+
+    @override_settings(NOTIFICACIONES_WS_MSGPACK=True)
+    def test_ida_y_vuelta_en_ambos_formatos(self):
+        frames = codificar(self.datos)
+        self.assertEqual(ujson.loads(frames['texto']), self.datos)
+        self.assertEqual(msgpack.unpackb(frames['binario'], raw=False), self.datos)
+
+    def _conectar(self, subprotocolos):
+        async def conectar():
+            comunicador = WebsocketCommunicator(
+                NotificacionConsumer.as_asgi(), '/ws/notificaciones/', subprotocols=subprotocolos
+            )
+            comunicador.scope['user'] = User(id=1, username='estudiante')
+            conectado, subprotocolo = await comunicador.connect()
+            bienvenida = await comunicador.receive_output()
+            await comunicador.disconnect()
+            return conectado, subprotocolo, bienvenida
+        return async_to_sync(conectar)()
+
+    @override_settings(NOTIFICACIONES_WS_MSGPACK=True)
+    def test_negocia_msgpack(self):
+        conectado, subprotocolo, bienvenida = self._conectar([SUBPROTOCOLO_MSGPACK])
+        self.assertTrue(conectado)
+        self.assertEqual(subprotocolo, SUBPROTOCOLO_MSGPACK)
+        self.assertEqual(msgpack.unpackb(bienvenida['bytes'], raw=False)['formato'], 'msgpack')
+
+    @override_settings(NOTIFICACIONES_WS_MSGPACK=True)
+    def test_sin_subprotocolo_usa_json(self):
+        _, subprotocolo, bienvenida = self._conectar([])
+        self.assertIsNone(subprotocolo)
+        self.assertEqual(ujson.loads(bienvenida['text'])['formato'], 'json')
+
+    @override_settings(NOTIFICACIONES_WS_MSGPACK=False)
+    def test_msgpack_desactivado_ignora_el_subprotocolo(self):
+        _, subprotocolo, bienvenida = self._conectar([SUBPROTOCOLO_MSGPACK])
+        self.assertIsNone(subprotocolo)
+        self.assertEqual(ujson.loads(bienvenida['text'])['formato'], 'json')
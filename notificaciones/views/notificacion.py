@@ -9,10 +9,16 @@ import logging
 from notificaciones.models import Notificacion
 from notificaciones.serializers import NotificacionSerializer
 from notificaciones.permissions import IsOwnerOrAdmin, IsAdminUser
-from notificaciones.pagination import NotificacionPagination
+from notificaciones.pagination import NotificacionCursorPagination
+from notificaciones import contador as contador_no_leidas
+from notificaciones import presencia
+from notificaciones.websocket import enviar_notificacion
 
 logger = logging.getLogger('notificaciones')
 
+# Límite de IDs aceptados por marcar_leidas
+MAX_IDS_MARCAR_LEIDAS = 500
+
 
 class NotificacionViewSet(viewsets.ViewSet):
     """
@@ -27,17 +33,19 @@ class NotificacionViewSet(viewsets.ViewSet):
     - GET /api/notificaciones/no_leidas/ - Listar solo no leídas
     - POST /api/notificaciones/marcar_leida/<id>/ - Marcar una como leída
     - POST /api/notificaciones/marcar_todas_leidas/ - Marcar todas como leídas
+    - POST /api/notificaciones/marcar_leidas/ - Marcar como leídas una lista de IDs
     - GET /api/notificaciones/contador/ - Contador de no leídas
+    - GET /api/notificaciones/conexiones/ - Conexiones WebSocket activas (solo admin)
     """
     
-    pagination_class = NotificacionPagination
+    pagination_class = NotificacionCursorPagination
     
     def get_permissions(self):
         """
         Define permisos según la acción.
         Solo administradores pueden crear notificaciones manualmente.
         """
-        if self.action == 'create':
+        if self.action in ('create', 'conexiones'):
             # PRODUCCIÓN: Solo administradores pueden crear notificaciones
             return [IsAdminUser()]
         return [IsAuthenticated()]
@@ -54,6 +62,13 @@ class NotificacionViewSet(viewsets.ViewSet):
         
         return Notificacion.objects.filter(usuario_id=user.id)
     
+    def _usuario_propio(self):
+        """ID del usuario si get_queryset se limita a sus notificaciones (None para admin)"""
+        user = self.request.user
+        if hasattr(user, 'perfil') and user.perfil == 'administrador':
+            return None
+        return user.id
+    
     def list(self, request):
         """
         Lista notificaciones del usuario autenticado.
@@ -61,16 +76,11 @@ class NotificacionViewSet(viewsets.ViewSet):
         """
         queryset = self.get_queryset()
         
-        # Aplicar paginación
+        # Paginación por cursor (?cursor=..., ?count=true para incluir el total)
         paginator = self.pagination_class()
-        page = paginator.paginate_queryset(list(queryset), request)
-        
-        if page is not None:
-            serializer = NotificacionSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        
-        serializer = NotificacionSerializer(queryset, many=True)
-        return Response(serializer.data)
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = NotificacionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     def create(self, request):
         """
@@ -228,16 +238,11 @@ class NotificacionViewSet(viewsets.ViewSet):
         """
         queryset = self.get_queryset().filter(leida=False)
         
-        # Aplicar paginación
+        # Paginación por cursor (?cursor=..., ?count=true para incluir el total)
         paginator = self.pagination_class()
-        page = paginator.paginate_queryset(list(queryset), request)
-        
-        if page is not None:
-            serializer = NotificacionSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        
-        serializer = NotificacionSerializer(queryset, many=True)
-        return Response(serializer.data)
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = NotificacionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def marcar_leida(self, request, pk=None):
@@ -274,12 +279,44 @@ class NotificacionViewSet(viewsets.ViewSet):
         Marca todas las notificaciones del usuario como leídas.
         POST /api/notificaciones/marcar_todas_leidas/
         """
-        queryset = self.get_queryset().filter(leida=False)
+        contador = Notificacion.marcar_leidas(self.get_queryset(), self._usuario_propio())
         
-        contador = 0
-        for notificacion in queryset:
-            notificacion.marcar_como_leida()
-            contador += 1
+        return Response({
+            'mensaje': f'{contador} notificaciones marcadas como leídas',
+            'total': contador
+        })
+    
+    @action(detail=False, methods=['post'])
+    def marcar_leidas(self, request):
+        """
+        Marca como leídas las notificaciones indicadas.
+        POST /api/notificaciones/marcar_leidas/  {"ids": ["<id>", ...]}
+        Solo se modifican las que pertenecen al usuario (admin: cualquiera).
+        """
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {'error': 'Se requiere una lista "ids" no vacía'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > MAX_IDS_MARCAR_LEIDAS:
+            return Response(
+                {'error': f'Máximo {MAX_IDS_MARCAR_LEIDAS} notificaciones por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            object_ids = [ObjectId(notificacion_id) for notificacion_id in ids]
+        except (InvalidId, TypeError):
+            return Response(
+                {'error': 'Alguno de los IDs no es válido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        contador = Notificacion.marcar_leidas(
+            self.get_queryset().filter(id__in=object_ids),
+            self._usuario_propio()
+        )
         
         return Response({
             'mensaje': f'{contador} notificaciones marcadas como leídas',
@@ -291,31 +328,29 @@ class NotificacionViewSet(viewsets.ViewSet):
         """
         Retorna el número de notificaciones no leídas.
         GET /api/notificaciones/contador/
+        El valor del usuario sale de la caché y también se envía por WebSocket
+        ('contador') cada vez que cambia.
         """
-        count = self.get_queryset().filter(leida=False).count()
+        usuario_id = self._usuario_propio()
+        if usuario_id is None:
+            count = self.get_queryset().filter(leida=False).count()
+        else:
+            count = contador_no_leidas.obtener(usuario_id)
         
         return Response({
             'no_leidas': count
         })
     
+    @action(detail=False, methods=['get'])
+    def conexiones(self, request):
+        """
+        Métricas de presencia del WebSocket (solo admin).
+        GET /api/notificaciones/conexiones/
+        """
+        return Response(presencia.metricas())
+    
     def _enviar_por_websocket(self, notificacion):
         """
         Envía la notificación por WebSocket al usuario correspondiente.
         """
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-        
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            # Nombre del grupo: notificaciones_user_{user_id}
-            group_name = f"notificaciones_user_{notificacion.usuario_id}"
-            
-            serializer = NotificacionSerializer(notificacion)
-            
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    'type': 'notificacion_mensaje',
-                    'notificacion': serializer.data
-                }
-            )
+        enviar_notificacion(notificacion)
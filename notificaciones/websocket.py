@@ -0,0 +1,94 @@
+"""
+Envío de notificaciones a los grupos WebSocket de los usuarios.
+
+Cada mensaje se codifica una sola vez aquí (JSON con ujson y, si
+NOTIFICACIONES_WS_MSGPACK está activo, también msgpack). El consumer
+reenvía el frame ya codificado a cada socket del grupo sin volver a
+serializar.
+"""
+import asyncio
+import msgpack
+import ujson
+from channels.layers import get_channel_layer
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from notificaciones import presencia
+
+# Subprotocolo WebSocket para recibir los frames en binario (msgpack)
+SUBPROTOCOLO_MSGPACK = 'msgpack'
+
+
+def nombre_grupo(usuario_id):
+    return f"notificaciones_user_{usuario_id}"
+
+
+def codificar(datos):
+    """Frames del mensaje: {'texto': JSON} y, con msgpack activo, {'binario': bytes}"""
+    frames = {'texto': ujson.dumps(datos, ensure_ascii=False, escape_forward_slashes=False)}
+    if settings.NOTIFICACIONES_WS_MSGPACK:
+        frames['binario'] = msgpack.packb(datos, use_bin_type=True)
+    return frames
+
+
+def evento(handler, datos):
+    """Mensaje del channel layer para `handler` del consumer con el frame ya codificado"""
+    return {'type': handler, **codificar(datos)}
+
+
+def enviar_a_grupos(mensajes):
+    """
+    Envía [(grupo, mensaje), ...] al channel layer con una sola llamada
+    async_to_sync; los group_send se lanzan concurrentemente.
+    """
+    channel_layer = get_channel_layer()
+    if not channel_layer or not mensajes:
+        return
+
+    async def enviar():
+        await asyncio.gather(*(
+            channel_layer.group_send(grupo, mensaje) for grupo, mensaje in mensajes
+        ))
+
+    async_to_sync(enviar)()
+
+
+def evento_notificacion(notificacion, serializer=None):
+    """
+    Mensaje notificacion_mensaje ya codificado. Lleva el id para que el
+    consumer descarte lo que ya reenvió al reconectar (reenvio.py).
+    """
+    if serializer is None:
+        from notificaciones.serializers import NotificacionSerializer
+        serializer = NotificacionSerializer()
+    mensaje = evento('notificacion_mensaje', {
+        'tipo': 'notificacion',
+        'data': serializer.to_representation(notificacion)
+    })
+    mensaje['id'] = str(notificacion.id)
+    return mensaje
+
+
+def _mensajes_notificaciones(notificaciones):
+    """Mensajes de las notificaciones cuyos destinatarios tienen un socket abierto"""
+    from notificaciones.serializers import NotificacionSerializer
+
+    en_linea = presencia.conectados(notificacion.usuario_id for notificacion in notificaciones)
+    serializer = NotificacionSerializer()
+    return [
+        (nombre_grupo(notificacion.usuario_id), evento_notificacion(notificacion, serializer))
+        for notificacion in notificaciones
+        if notificacion.usuario_id in en_linea
+    ]
+
+
+def enviar_notificacion(notificacion):
+    """
+    Envía la notificación por WebSocket al usuario correspondiente.
+    """
+    enviar_a_grupos(_mensajes_notificaciones([notificacion]))
+
+
+def enviar_notificaciones(notificaciones):
+    """Envía un lote de notificaciones (cada una a su usuario) en una sola pasada"""
+    enviar_a_grupos(_mensajes_notificaciones(notificaciones))
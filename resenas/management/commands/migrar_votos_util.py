@@ -0,0 +1,116 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from resenas.models import Resena, VotoUtil
+
+# Código de error de MongoDB para claves duplicadas
+CLAVE_DUPLICADA = 11000
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los arrays usuarios_util de las reseñas a la colección resenas_votos_util, '
+        'ajusta util_count al número de votos y elimina el array del documento'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Reseñas procesadas por lote'
+        )
+        parser.add_argument(
+            '--recontar',
+            action='store_true',
+            help='Además, recalcula util_count de todas las reseñas desde resenas_votos_util'
+        )
+
+    def handle(self, *args, **options):
+        # Se trabaja sobre las colecciones de pymongo: el modelo ya no declara usuarios_util
+        VotoUtil.ensure_indexes()
+        resenas = Resena._get_collection()
+        votos = VotoUtil._get_collection()
+        tamano_lote = options['lote']
+
+        migradas = insertados = 0
+        lote = []
+        pendientes = resenas.find({'usuarios_util': {'$exists': True}}, {'usuarios_util': 1})
+        for documento in pendientes.batch_size(tamano_lote):
+            lote.append(documento)
+            if len(lote) >= tamano_lote:
+                insertados += self._migrar(resenas, votos, lote)
+                migradas += len(lote)
+                lote = []
+        if lote:
+            insertados += self._migrar(resenas, votos, lote)
+            migradas += len(lote)
+        self.stdout.write(f'  {migradas} reseñas migradas, {insertados} votos copiados')
+
+        if options['recontar']:
+            corregidas = self._recontar(resenas, votos, tamano_lote)
+            self.stdout.write(f'  util_count corregido en {corregidas} reseñas')
+
+        self.stdout.write(self.style.SUCCESS('✓ Votos útiles migrados'))
+
+    def _migrar(self, resenas, votos, lote):
+        ahora = datetime.utcnow()
+        nuevos = [
+            {'resena_id': documento['_id'], 'usuario_id': usuario_id, 'fecha': ahora}
+            for documento in lote
+            for usuario_id in set(documento.get('usuarios_util') or [])
+        ]
+        insertados = len(nuevos)
+        if nuevos:
+            try:
+                votos.insert_many(nuevos, ordered=False)
+            except BulkWriteError as e:
+                # Votos ya copiados en una ejecución anterior (índice único)
+                errores = e.details.get('writeErrors', [])
+                if any(error.get('code') != CLAVE_DUPLICADA for error in errores):
+                    raise
+                insertados -= len(errores)
+
+        cuentas = self._contar(votos, [documento['_id'] for documento in lote])
+        resenas.bulk_write([
+            UpdateOne(
+                {'_id': documento['_id']},
+                {'$set': {'util_count': cuentas.get(documento['_id'], 0)}, '$unset': {'usuarios_util': ''}}
+            )
+            for documento in lote
+        ], ordered=False)
+        return insertados
+
+    def _recontar(self, resenas, votos, tamano_lote):
+        corregidas = 0
+        lote = []
+        for documento in resenas.find({}, {'util_count': 1}).batch_size(tamano_lote):
+            lote.append(documento)
+            if len(lote) >= tamano_lote:
+                corregidas += self._corregir(resenas, votos, lote)
+                lote = []
+        if lote:
+            corregidas += self._corregir(resenas, votos, lote)
+        return corregidas
+
+    def _corregir(self, resenas, votos, lote):
+        cuentas = self._contar(votos, [documento['_id'] for documento in lote])
+        cambios = [
+            UpdateOne({'_id': documento['_id']}, {'$set': {'util_count': cuentas.get(documento['_id'], 0)}})
+            for documento in lote
+            if documento.get('util_count', 0) != cuentas.get(documento['_id'], 0)
+        ]
+        if cambios:
+            resenas.bulk_write(cambios, ordered=False)
+        return len(cambios)
+
+    def _contar(self, votos, resena_ids):
+        """{resena_id: número de votos} con una agregación por lote"""
+        return {
+            fila['_id']: fila['total']
+            for fila in votos.aggregate([
+                {'$match': {'resena_id': {'$in': resena_ids}}},
+                {'$group': {'_id': '$resena_id', 'total': {'$sum': 1}}},
+            ])
+        }
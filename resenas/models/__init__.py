@@ -1,3 +1,4 @@
 from .resenas import Resena, Respuesta
+from .voto_util import VotoUtil
 
-__all__ = ['Resena', 'Respuesta']
\ No newline at end of file
+__all__ = ['Resena', 'Respuesta', 'VotoUtil']
\ No newline at end of file
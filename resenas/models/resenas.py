@@ -1,4 +1,4 @@
-from mongoengine import Document, EmbeddedDocument, fields
+from mongoengine import Document, EmbeddedDocument, NotUniqueError, fields
 from datetime import datetime
 
 
@@ -31,9 +31,8 @@ class Resena(Document):
     # Validación
     verificado_compra = fields.BooleanField(default=False)
     
-    # Interacciones
+    # Interacciones (los votantes están en VotoUtil)
     util_count = fields.IntField(default=0)
-    usuarios_util = fields.ListField(fields.IntField())
     
     # Respuestas anidadas
     respuestas = fields.ListField(fields.EmbeddedDocumentField(Respuesta))
@@ -44,21 +43,88 @@ class Resena(Document):
     
     meta = {
         'collection': 'resenas',
+        # Las reseñas aún no migradas con `python manage.py migrar_votos_util`
+        # conservan el antiguo array usuarios_util
+        'strict': False,
         'indexes': [
-            'curso_id',
             'usuario_id',
-            '-fecha_creacion',
             'rating',
             {
                 'fields': ['usuario_id', 'curso_id'],
                 'unique': True  # Una reseña por usuario por curso
+            },
+            # Órdenes de la paginación por cursor (resenas/pagination.py);
+            # los compuestos por curso cubren también los filtros por curso_id
+            {
+                'fields': ['-fecha_creacion', '-id'],
+                'name': 'fecha_idx'
+            },
+            {
+                'fields': ['-util_count', '-id'],
+                'name': 'util_idx'
+            },
+            {
+                'fields': ['curso_id', '-fecha_creacion', '-id'],
+                'name': 'curso_fecha_idx'
+            },
+            {
+                'fields': ['curso_id', '-util_count', '-id'],
+                'name': 'curso_util_idx'
             }
         ]
     }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Rating persistido en MongoDB, para que las señales post_save
+        # puedan calcular la diferencia cuando el rating cambia
+        self._rating_guardado = self.rating if self.pk else None
+    
     def __str__(self):
         return f"Reseña de usuario {self.usuario_id} en curso {self.curso_id}"
     
+    def save(self, *args, **kwargs):
+        resultado = super().save(*args, **kwargs)
+        self._rating_guardado = self.rating
+        return resultado
+    
+    @classmethod
+    def alternar_util(cls, resena_id, usuario_id):
+        """
+        Marca o desmarca la reseña como útil para el usuario: inserta su
+        VotoUtil (o lo elimina si ya existía, por el índice único) y ajusta
+        util_count con $inc, sin leer ni reescribir la reseña.
+        Retorna (marcada, util_count). Lanza DoesNotExist si no existe.
+        Son dos escrituras sin transacción: si el proceso muere entre ambas,
+        util_count queda desfasado en uno respecto a VotoUtil. Se repara con
+        `python manage.py migrar_votos_util --recontar`.
+        """
+        from .voto_util import VotoUtil
+        
+        resenas = cls.objects(id=resena_id).only('util_count')
+        votos = VotoUtil.objects(resena=resena_id, usuario_id=usuario_id)
+        # Un voto simultáneo del mismo usuario puede borrar el voto entre
+        # los dos pasos; se reintenta con el estado nuevo
+        for _ in range(3):
+            try:
+                VotoUtil(resena=resena_id, usuario_id=usuario_id).save(force_insert=True)
+            except NotUniqueError:
+                if votos.delete():
+                    resena = resenas.modify(dec__util_count=1, new=True)
+                    if resena is None:
+                        raise cls.DoesNotExist(f'Reseña {resena_id} no encontrada')
+                    return False, resena.util_count
+                continue
+            resena = resenas.modify(inc__util_count=1, new=True)
+            if resena is None:
+                votos.delete()
+                raise cls.DoesNotExist(f'Reseña {resena_id} no encontrada')
+            return True, resena.util_count
+        resena = resenas.first()
+        if resena is None:
+            raise cls.DoesNotExist(f'Reseña {resena_id} no encontrada')
+        return votos.first() is not None, resena.util_count
+    
     def clean(self):
         """Validación adicional antes de guardar"""
         if self.rating < 1.0 or self.rating > 5.0:
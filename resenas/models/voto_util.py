@@ -0,0 +1,34 @@
+from mongoengine import Document, fields, CASCADE
+from datetime import datetime
+from .resenas import Resena
+
+
+class VotoUtil(Document):
+    """
+    Voto "útil" de un usuario a una reseña. Los votantes viven en su propia
+    colección para que el documento de la reseña solo guarde util_count.
+    """
+    resena = fields.ReferenceField(Resena, required=True, db_field='resena_id', reverse_delete_rule=CASCADE)
+    usuario_id = fields.IntField(required=True)
+    fecha = fields.DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'resenas_votos_util',
+        'indexes': [
+            {
+                'fields': ['resena', 'usuario_id'],
+                'unique': True  # Un voto por usuario por reseña
+            }
+        ]
+    }
+
+    def __str__(self):
+        return f"Voto útil de usuario {self.usuario_id} en reseña {self.resena.pk}"
+
+    @classmethod
+    def resenas_votadas(cls, usuario_id, resena_ids):
+        """IDs (str) de las reseñas de `resena_ids` que el usuario marcó como útiles"""
+        if not resena_ids:
+            return set()
+        votos = cls.objects(usuario_id=usuario_id, resena__in=list(resena_ids)).only('resena').as_pymongo()
+        return {str(voto['resena_id']) for voto in votos}
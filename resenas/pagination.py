@@ -1,6 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+from curso_online_project.paginacion import MongoCursorPagination
 
-class AvisoPagination(PageNumberPagination):
-    page_size = 25
-    page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+
+class ResenaCursorPagination(MongoCursorPagination):
+    """
+    Paginación por cursor de las reseñas, con el orden elegido con ?orden=:
+    - recientes (por defecto): (-fecha_creacion, -id)
+    - utiles: (-util_count, -id)
+    """
+    ordenes = {
+        'recientes': ('fecha_creacion', datetime.fromisoformat),
+        'utiles': ('util_count', int),
+    }
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from ..models import Resena, Respuesta
+from ..models import Resena, Respuesta, VotoUtil
 from inscripciones.models import Inscripcion
 from django.contrib.auth import get_user_model
 
@@ -25,7 +25,6 @@ class ResenaSerializer(serializers.Serializer):
     fecha_modificacion = serializers.DateTimeField(read_only=True)
     verificado_compra = serializers.BooleanField(read_only=True)
     util_count = serializers.IntegerField(read_only=True)
-    usuarios_util = serializers.ListField(child=serializers.IntegerField(), read_only=True)
     respuestas = RespuestaSerializer(many=True, read_only=True)
     imagenes = serializers.ListField(child=serializers.URLField(), required=False)
     tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
@@ -34,23 +33,57 @@ class ResenaSerializer(serializers.Serializer):
     nombre_usuario = serializers.SerializerMethodField()
     titulo_curso = serializers.SerializerMethodField()
     es_mia = serializers.SerializerMethodField()
+    es_util_para_mi = serializers.SerializerMethodField()
+    
+    @classmethod
+    def contexto_lista(cls, resenas, request):
+        """
+        Contexto para serializar una lista: resuelve los usuarios y cursos de
+        todas las reseñas con un in_bulk cada uno en lugar de dos consultas
+        a PostgreSQL por reseña.
+        """
+        from cursos.models import Curso
+        
+        usuario_ids = {resena.usuario_id for resena in resenas}
+        curso_ids = {resena.curso_id for resena in resenas}
+        contexto = {
+            'request': request,
+            'usuarios': User.objects.only('first_name', 'last_name', 'username').in_bulk(usuario_ids),
+            'cursos': Curso.objects.only('titulo').in_bulk(curso_ids),
+        }
+        if request is not None and request.user.is_authenticated:
+            # Votos útiles del usuario en la página: una consulta a MongoDB
+            contexto['votos_util'] = VotoUtil.resenas_votadas(
+                request.user.id, [resena.pk for resena in resenas]
+            )
+        return contexto
+    
+    def _usuario(self, usuario_id):
+        usuarios = self.context.get('usuarios')
+        if usuarios is not None:
+            return usuarios.get(usuario_id)
+        return User.objects.filter(id=usuario_id).first()
+    
+    def _curso(self, curso_id):
+        cursos = self.context.get('cursos')
+        if cursos is not None:
+            return cursos.get(curso_id)
+        from cursos.models import Curso
+        return Curso.objects.filter(id=curso_id).first()
     
     def get_nombre_usuario(self, obj):
-        """Obtener nombre del usuario desde PostgreSQL"""
-        try:
-            user = User.objects.get(id=obj.usuario_id)
-            return f"{user.first_name} {user.last_name}".strip() or user.username
-        except User.DoesNotExist:
+        """Obtener nombre del usuario desde PostgreSQL (o del contexto de la lista)"""
+        user = self._usuario(obj.usuario_id)
+        if user is None:
             return "Usuario desconocido"
+        return f"{user.first_name} {user.last_name}".strip() or user.username
     
     def get_titulo_curso(self, obj):
-        """Obtener título del curso desde PostgreSQL"""
-        try:
-            from cursos.models import Curso
-            curso = Curso.objects.get(id=obj.curso_id)
-            return curso.titulo
-        except:
+        """Obtener título del curso desde PostgreSQL (o del contexto de la lista)"""
+        curso = self._curso(obj.curso_id)
+        if curso is None:
             return f"Curso {obj.curso_id}"
+        return curso.titulo
     
     def get_es_mia(self, obj):
         """Verificar si la reseña es del usuario actual"""
@@ -59,6 +92,16 @@ class ResenaSerializer(serializers.Serializer):
             return obj.usuario_id == request.user.id
         return False
     
+    def get_es_util_para_mi(self, obj):
+        """Si el usuario actual marcó la reseña como útil"""
+        request = self.context.get('request')
+        if not (request and request.user.is_authenticated):
+            return False
+        votos = self.context.get('votos_util')
+        if votos is not None:
+            return str(obj.pk) in votos
+        return VotoUtil.objects(resena=obj.pk, usuario_id=request.user.id).first() is not None
+    
     def validate(self, data):
         """Validaciones personalizadas"""
         request = self.context.get('request')
@@ -1,3 +1,312 @@
+from datetime import datetime
+from io import StringIO
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from rest_framework.test import APIRequestFactory, APITestCase
+from curso_online_project.pruebas_mongo import MongoMockMixin
+from cursos.models import Curso, CursoEstadisticas
+from .models import Resena, VotoUtil
+from .serializers import ResenaSerializer
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ResenaSerializerTest(TestCase):
+    """Tests para ResenaSerializer"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        self.cursos = [
+            Curso.objects.create(
+                titulo=f'Curso {i}',
+                descripcion='Descripción',
+                categoria='programacion',
+                nivel='principiante',
+                instructor=self.instructor,
+                precio=10
+            )
+            for i in range(3)
+        ]
+        self.estudiantes = [
+            User.objects.create_user(
+                username=f'estudiante{i}',
+                email=f'estudiante{i}@example.com',
+                password='testpass123',
+                first_name=f'Nombre{i}'
+            )
+            for i in range(3)
+        ]
+        # Reseñas sin guardar: el serializer solo consulta PostgreSQL
+        self.resenas = [
+            Resena(
+                curso_id=curso.id,
+                usuario_id=estudiante.id,
+                rating=4.0,
+                titulo='Buen curso',
+                comentario='Muy recomendable'
+            )
+            for curso in self.cursos
+            for estudiante in self.estudiantes
+        ]
+
+    def test_lista_resuelve_usuarios_y_cursos_en_dos_consultas(self):
+        """Test de que la lista no hace consultas por reseña"""
+        with self.assertNumQueries(2):
+            contexto = ResenaSerializer.contexto_lista(self.resenas, None)
+            data = ResenaSerializer(self.resenas, many=True, context=contexto).data
+
+        self.assertEqual(len(data), 9)
+        self.assertEqual(data[0]['titulo_curso'], 'Curso 0')
+        self.assertEqual(data[0]['nombre_usuario'], 'Nombre0')
+
+    def test_sin_contexto_de_lista_consulta_cada_resena(self):
+        """Test del detalle sin mapas en el contexto"""
+        resena = Resena(curso_id=999, usuario_id=999, rating=3.0, titulo='t', comentario='c')
+        data = ResenaSerializer(resena).data
+        self.assertEqual(data['titulo_curso'], 'Curso 999')
+        self.assertEqual(data['nombre_usuario'], 'Usuario desconocido')
+
+
+class EstadisticasCursoTest(MongoMockMixin, APITestCase):
+    """Tests del endpoint estadisticas_curso"""
+
+    def setUp(self):
+        super().setUp()
+        instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            perfil='instructor'
+        )
+        self.curso = Curso.objects.create(
+            titulo='Curso de Python',
+            descripcion='Aprende Python desde cero',
+            categoria='programacion',
+            nivel='principiante',
+            instructor=instructor,
+            precio=10
+        )
+        CursoEstadisticas.objects.filter(pk=self.curso.pk).update(
+            total_resenas=3, suma_ratings=13.0, ratings_5=1, ratings_4=2
+        )
+
+    def test_lee_el_resumen_materializado(self):
+        """Test de que el resumen sale de una sola lectura"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/resenas/estadisticas_curso/', {'curso_id': self.curso.pk})
+
+        self.assertEqual(response.data, {
+            'total_resenas': 3,
+            'rating_promedio': 4.33,
+            'distribucion': {'5': 1, '4': 2, '3': 0, '2': 0, '1': 0},
+        })
+
+    def test_curso_inexistente(self):
+        """Test de curso sin reseñas ni fila de estadísticas"""
+        response = self.client.get('/api/resenas/estadisticas_curso/', {'curso_id': 9999})
+        self.assertEqual(response.data['total_resenas'], 0)
+        self.assertEqual(response.data['rating_promedio'], 0)
+        self.assertFalse(CursoEstadisticas.objects.filter(pk=9999).exists())
+
+    def test_sin_fila_reconstruye_una_vez(self):
+        """Test de un curso anterior a la tabla: la reseña nueva no se pierde"""
+        CursoEstadisticas.objects.filter(pk=self.curso.pk).delete()
+        Resena(curso_id=self.curso.pk, usuario_id=999, rating=5.0, titulo='t', comentario='c').save()
+
+        response = self.client.get('/api/resenas/estadisticas_curso/', {'curso_id': self.curso.pk})
+
+        self.assertEqual(response.data['total_resenas'], 1)
+        self.assertEqual(response.data['distribucion']['5'], 1)
+        self.assertTrue(CursoEstadisticas.objects.filter(pk=self.curso.pk).exists())
+        with self.assertNumQueries(1):
+            self.client.get('/api/resenas/estadisticas_curso/', {'curso_id': self.curso.pk})
+
+
+class MarcarUtilTest(MongoMockMixin, APITestCase):
+    """Tests del voto "útil" (POST /api/resenas/<id>/marcar_util/)"""
+
+    def setUp(self):
+        super().setUp()
+        self.usuarios = [
+            User.objects.create_user(
+                username=f'usuario{i}',
+                email=f'usuario{i}@example.com',
+                password='testpass123'
+            )
+            for i in range(2)
+        ]
+        self.resena = Resena(curso_id=1, usuario_id=999, rating=4.0, titulo='t', comentario='c')
+        self.resena.save()
+        self.url = f'/api/resenas/{self.resena.id}/marcar_util/'
+
+    def test_alterna_el_voto(self):
+        """Test de que el segundo voto del mismo usuario lo retira"""
+        self.client.force_authenticate(self.usuarios[0])
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {'message': 'Marcado como útil', 'util_count': 1})
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {'message': 'Voto removido', 'util_count': 0})
+        self.assertEqual(Resena.objects.get(id=self.resena.id).util_count, 0)
+
+    def test_un_voto_por_usuario(self):
+        """Test de votos de varios usuarios"""
+        for usuario in self.usuarios:
+            self.client.force_authenticate(usuario)
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.data['util_count'], 2)
+
+    def test_resena_inexistente(self):
+        """Test de voto sobre una reseña que no existe"""
+        self.client.force_authenticate(self.usuarios[0])
+        response = self.client.post('/api/resenas/000000000000000000000000/marcar_util/')
+        self.assertEqual(response.status_code, 404)
+
+
+class VotoUtilTest(MongoMockMixin, TestCase):
+    """Tests de los votos útiles en la colección resenas_votos_util"""
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user(
+            username='votante',
+            email='votante@example.com',
+            password='testpass123'
+        )
+        self.resenas = []
+        for i in range(3):
+            resena = Resena(curso_id=1, usuario_id=100 + i, rating=4.0, titulo='t', comentario='c')
+            resena.save()
+            self.resenas.append(resena)
+
+    def test_util_count_coincide_con_los_votos(self):
+        """Test de que util_count sigue al número de VotoUtil tras alternar"""
+        resena = self.resenas[0]
+        for usuario_id in (1, 2, 3, 2, 4, 1, 2):
+            Resena.alternar_util(resena.id, usuario_id)
+
+        self.assertEqual(
+            sorted(VotoUtil.objects(resena=resena.id).scalar('usuario_id')),
+            [2, 3, 4]
+        )
+        self.assertEqual(Resena.objects.get(id=resena.id).util_count, 3)
+
+    def test_marcar_y_desmarcar(self):
+        """Test del valor devuelto al alternar"""
+        self.assertEqual(Resena.alternar_util(self.resenas[0].id, 1), (True, 1))
+        self.assertEqual(Resena.alternar_util(self.resenas[0].id, 1), (False, 0))
+        self.assertFalse(VotoUtil.objects(resena=self.resenas[0].id).count())
+
+    def test_es_util_para_mi(self):
+        """Test del campo es_util_para_mi con y sin contexto de lista"""
+        Resena.alternar_util(self.resenas[1].id, self.usuario.id)
+        request = APIRequestFactory().get('/api/resenas/')
+        request.user = self.usuario
+
+        contexto = ResenaSerializer.contexto_lista(self.resenas, request)
+        self.assertEqual(contexto['votos_util'], {str(self.resenas[1].id)})
+        data = ResenaSerializer(self.resenas, many=True, context=contexto).data
+        self.assertEqual([resena['es_util_para_mi'] for resena in data], [False, True, False])
+
+        detalle = ResenaSerializer(self.resenas[1], context={'request': request}).data
+        self.assertTrue(detalle['es_util_para_mi'])
+
+        request.user = AnonymousUser()
+        self.assertFalse(ResenaSerializer(self.resenas[1], context={'request': request}).data['es_util_para_mi'])
+
+    def test_migracion_idempotente(self):
+        """Test de que migrar_votos_util puede ejecutarse varias veces"""
+        coleccion = Resena._get_collection()
+        coleccion.update_one({'_id': self.resenas[0].id}, {'$set': {'usuarios_util': [1, 2, 2], 'util_count': 3}})
+        coleccion.update_one({'_id': self.resenas[1].id}, {'$set': {'usuarios_util': [3], 'util_count': 1}})
+
+        call_command('migrar_votos_util', stdout=StringIO())
+        # Segunda ejecución tras una interrupción: el array vuelve a estar
+        coleccion.update_one({'_id': self.resenas[1].id}, {'$set': {'usuarios_util': [3]}})
+        salida = StringIO()
+        call_command('migrar_votos_util', stdout=salida)
+
+        self.assertIn('0 votos copiados', salida.getvalue())
+        self.assertEqual(VotoUtil.objects.count(), 3)
+        self.assertEqual(coleccion.count_documents({'usuarios_util': {'$exists': True}}), 0)
+        self.assertEqual(
+            [Resena.objects.get(id=resena.id).util_count for resena in self.resenas],
+            [2, 1, 0]
+        )
+
+    def test_recontar_corrige_el_desfase(self):
+        """Test de --recontar tras un util_count desfasado"""
+        Resena.alternar_util(self.resenas[0].id, 1)
+        Resena.objects(id=self.resenas[0].id).update_one(inc__util_count=1)
+
+        call_command('migrar_votos_util', '--recontar', stdout=StringIO())
+
+        self.assertEqual(Resena.objects.get(id=self.resenas[0].id).util_count, 1)
+
+
+class ResenaPaginacionTest(MongoMockMixin, APITestCase):
+    """Tests de la paginación por cursor de GET /api/resenas/"""
+
+    def setUp(self):
+        super().setUp()
+        # Fechas y util_count repetidos: el desempate es el id
+        self.resenas = []
+        for i in range(5):
+            resena = Resena(
+                curso_id=1,
+                usuario_id=i,
+                rating=4.0,
+                titulo='t',
+                comentario='c',
+                fecha_creacion=datetime(2025, 1, 31) if i % 2 else datetime(2025, 1, 30),
+                util_count=3 if i < 3 else 1
+            )
+            resena.save()
+            self.resenas.append(str(resena.id))
+
+    def _recorrer(self, parametros):
+        vistos = []
+        url = f'/api/resenas/?page_size=2&{parametros}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            vistos += [resena['id'] for resena in response.data['results']]
+            url = response.data['next']
+        return vistos
+
+    def test_recientes_sin_duplicados_ni_saltos(self):
+        """Test de recorrer todas las páginas por fecha"""
+        r = self.resenas
+        self.assertEqual(self._recorrer('orden=recientes'), [r[3], r[1], r[4], r[2], r[0]])
+
+    def test_utiles_sin_duplicados_ni_saltos(self):
+        """Test de recorrer todas las páginas por util_count"""
+        r = self.resenas
+        self.assertEqual(self._recorrer('orden=utiles&curso_id=1'), [r[2], r[1], r[0], r[4], r[3]])
+
+    def test_utiles_sin_curso_usa_indice(self):
+        """Test de orden por util_count en todas las reseñas"""
+        r = self.resenas
+        self.assertEqual(self._recorrer('orden=utiles'), [r[2], r[1], r[0], r[4], r[3]])
+        indices = Resena._get_collection().index_information()
+        self.assertEqual(indices['util_idx']['key'], [('util_count', -1), ('_id', -1)])
+
+    def test_cursor_invalido(self):
+        """Test de cursor mal formado"""
+        for cursor in ('no-es-un-cursor', 'bm8tZmVjaGF8eA=='):
+            response = self.client.get('/api/resenas/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_orden_invalido(self):
+        """Test de orden desconocido"""
+        response = self.client.get('/api/resenas/', {'orden': 'rating'})
+        self.assertEqual(response.status_code, 400)
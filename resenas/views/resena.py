@@ -5,12 +5,15 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from ..models import Resena, Respuesta
 from ..serializers import ResenaSerializer
 from ..permissions import IsOwnerOrReadOnly
+from ..pagination import ResenaCursorPagination
 from datetime import datetime
 
 
 class ResenaViewSet(viewsets.ViewSet):
     """ViewSet para gestionar reseñas de cursos"""
     
+    pagination_class = ResenaCursorPagination
+    
     def get_permissions(self):
         """Permisos según la acción"""
         if self.action in ['list', 'retrieve', 'estadisticas_curso']:
@@ -24,27 +27,27 @@ class ResenaViewSet(viewsets.ViewSet):
         return [IsAuthenticated()]
     
     def list(self, request):
-        """Listar reseñas (con filtro por curso)"""
+        """
+        Listar reseñas (con filtro por curso).
+        Paginación por cursor: ?cursor=..., ?orden=recientes|utiles,
+        ?count=true para incluir el total.
+        """
         curso_id = request.query_params.get('curso_id')
         
         if curso_id:
-            resenas = Resena.objects(curso_id=int(curso_id)).order_by('-fecha_creacion')
+            resenas = Resena.objects(curso_id=int(curso_id))
         else:
-            resenas = Resena.objects.all().order_by('-fecha_creacion')
-        
-        # Paginación simple
-        page = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', 20))
-        start = (page - 1) * page_size
-        end = start + page_size
+            resenas = Resena.objects.all()
         
-        resenas_page = list(resenas[start:end])
-        serializer = ResenaSerializer(resenas_page, many=True, context={'request': request})
+        paginator = self.pagination_class()
+        resenas_page = paginator.paginate_queryset(resenas, request)
+        serializer = ResenaSerializer(
+            resenas_page,
+            many=True,
+            context=ResenaSerializer.contexto_lista(resenas_page, request)
+        )
         
-        return Response({
-            'count': resenas.count(),
-            'results': serializer.data
-        })
+        return paginator.get_paginated_response(serializer.data)
     
     def create(self, request):
         """Crear nueva reseña"""
@@ -152,34 +155,19 @@ class ResenaViewSet(viewsets.ViewSet):
     
     @action(detail=True, methods=['post'])
     def marcar_util(self, request, pk=None):
-        """Marcar reseña como útil"""
+        """Marcar reseña como útil (o quitar el voto si ya estaba marcada)"""
         try:
-            resena = Resena.objects.get(pk=pk)
-            usuario_id = request.user.id
-            
-            if usuario_id in resena.usuarios_util:
-                # Ya marcó como útil, quitar voto
-                resena.usuarios_util.remove(usuario_id)
-                resena.util_count = max(0, resena.util_count - 1)
-                mensaje = 'Voto removido'
-            else:
-                # Agregar voto
-                resena.usuarios_util.append(usuario_id)
-                resena.util_count += 1
-                mensaje = 'Marcado como útil'
-            
-            resena.save()
-            
-            return Response({
-                'message': mensaje,
-                'util_count': resena.util_count
-            })
-        
+            marcada, util_count = Resena.alternar_util(pk, request.user.id)
         except Resena.DoesNotExist:
             return Response(
                 {'error': 'Reseña no encontrada'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        return Response({
+            'message': 'Marcado como útil' if marcada else 'Voto removido',
+            'util_count': util_count
+        })
     
     @action(detail=True, methods=['post'])
     def responder(self, request, pk=None):
@@ -232,12 +220,24 @@ class ResenaViewSet(viewsets.ViewSet):
             # Para estudiantes: obtener sus propias reseñas
             resenas = Resena.objects(usuario_id=request.user.id).order_by('-fecha_creacion')
         
-        serializer = ResenaSerializer(list(resenas), many=True, context={'request': request})
+        resenas = list(resenas)
+        serializer = ResenaSerializer(
+            resenas,
+            many=True,
+            context=ResenaSerializer.contexto_lista(resenas, request)
+        )
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def estadisticas_curso(self, request):
-        """Estadísticas de reseñas de un curso"""
+        """
+        Estadísticas de reseñas de un curso.
+        Se leen del resumen materializado CursoEstadisticas, que las señales de
+        Resena mantienen al crear, editar el rating o eliminar una reseña
+        (reconstrucción: python manage.py recalcular_estadisticas_cursos).
+        """
+        from cursos.models import Curso, CursoEstadisticas
+        
         curso_id = request.query_params.get('curso_id')
         
         if not curso_id:
@@ -246,30 +246,19 @@ class ResenaViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        resenas = list(Resena.objects(curso_id=int(curso_id)))
-        
-        if not resenas:
-            return Response({
-                'total_resenas': 0,
-                'rating_promedio': 0,
-                'distribucion': {
-                    '5': 0, '4': 0, '3': 0, '2': 0, '1': 0
-                }
-            })
-        
-        # Calcular estadísticas
-        total = len(resenas)
-        suma_ratings = sum(r.rating for r in resenas)
-        promedio = round(suma_ratings / total, 2)
+        try:
+            curso_id = int(curso_id)
+        except ValueError:
+            return Response(
+                {'error': 'curso_id debe ser un número'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Distribución por estrellas
-        distribucion = {'5': 0, '4': 0, '3': 0, '2': 0, '1': 0}
-        for resena in resenas:
-            star = str(int(resena.rating))
-            distribucion[star] = distribucion.get(star, 0) + 1
+        estadisticas = CursoEstadisticas.objects.filter(pk=curso_id).first()
+        if estadisticas is None:
+            # Curso creado antes de la tabla de estadísticas: se construye su
+            # fila una sola vez. Un curso inexistente no crea nada (todo en cero)
+            curso = Curso.objects.filter(pk=curso_id).first()
+            estadisticas = CursoEstadisticas.obtener(curso) if curso else CursoEstadisticas()
         
-        return Response({
-            'total_resenas': total,
-            'rating_promedio': promedio,
-            'distribucion': distribucion
-        })
\ No newline at end of file
+        return Response(estadisticas.resumen_resenas())